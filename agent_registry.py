@@ -0,0 +1,130 @@
+"""
+Lazy Agent Registry
+
+Agents, agent tools and function tools are declared as plain data and built
+on first use, so importing a script doesn't construct its whole graph or
+import the Agents SDK.
+
+- `AgentSpec`: instructions, model, tools and handoffs of one agent, with
+  tools and handoffs referring to other registry entries by name
+- `AgentToolSpec`: an agent exposed as a tool through `agent_tool()`
+- Function tools are registered as factories (functions returning the tool)
+  so their SDK imports and decorators run only when an agent needs them
+- Everything is built once and reused; `stats()` reports what was built
+  and how long it took
+
+Usage:
+    registry.add_agent("writer", AgentSpec(name="Writer", instructions="...", tools=("send",)))
+    registry.add_tool("send", make_send_tool)
+    agent = registry.agent("writer")
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+
+@dataclass(frozen=True)
+class AgentSpec:
+    """Declarative configuration of one agent."""
+    name: str
+    instructions: str
+    model: str = "gpt-4o-mini"
+    tools: Tuple[str, ...] = ()
+    handoffs: Tuple[str, ...] = ()
+    handoff_description: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class AgentToolSpec:
+    """An agent (by registry name) exposed as a tool, see `agent_runtime.agent_tool`."""
+    agent: str
+    description: str
+    cacheable: bool = False
+    hedge: bool = False
+
+
+ToolFactory = Callable[[], Any]
+
+
+class AgentRegistry:
+    """Named agent and tool declarations, built lazily and cached."""
+
+    def __init__(self):
+        self._agent_specs: Dict[str, AgentSpec] = {}
+        self._tool_specs: Dict[str, Union[AgentToolSpec, ToolFactory]] = {}
+        self._agents: Dict[str, Any] = {}
+        self._tools: Dict[str, Any] = {}
+        self.build_seconds = 0.0
+
+    def add_agent(self, key: str, spec: AgentSpec) -> None:
+        self._agent_specs[key] = spec
+        self._agents.pop(key, None)
+
+    def add_tool(self, name: str, spec: Union[AgentToolSpec, ToolFactory]) -> None:
+        """Register an agent tool spec, or a factory returning a function tool."""
+        self._tool_specs[name] = spec
+        self._tools.pop(name, None)
+
+    def spec(self, key: str) -> AgentSpec:
+        return self._agent_specs[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._agent_specs or key in self._tool_specs
+
+    # ------------------------------------------------------------------------
+    # BUILDING
+    # ------------------------------------------------------------------------
+
+    def agent(self, key: str) -> Any:
+        """The agent registered as `key`, building it (and its tools and handoffs) on first use."""
+        agent = self._agents.get(key)
+        if agent is None:
+            from agents import Agent
+
+            spec = self._agent_specs[key]
+            tools = [self.tool(name) for name in spec.tools]
+            handoffs = [self.agent(name) for name in spec.handoffs]
+            start = time.perf_counter()
+            agent = Agent(
+                name=spec.name,
+                instructions=spec.instructions,
+                model=spec.model,
+                tools=tools,
+                handoffs=handoffs,
+                handoff_description=spec.handoff_description,
+            )
+            self.build_seconds += time.perf_counter() - start
+            self._agents[key] = agent
+        return agent
+
+    def tool(self, name: str) -> Any:
+        """The tool registered as `name`, building it on first use."""
+        tool = self._tools.get(name)
+        if tool is None:
+            spec = self._tool_specs[name]
+            if isinstance(spec, AgentToolSpec):
+                from agent_runtime import agent_tool
+
+                agent = self.agent(spec.agent)
+                start = time.perf_counter()
+                tool = agent_tool(agent, tool_name=name, tool_description=spec.description,
+                                  cacheable=spec.cacheable, hedge=spec.hedge)
+            else:
+                start = time.perf_counter()
+                tool = spec()
+            self.build_seconds += time.perf_counter() - start
+            self._tools[name] = tool
+        return tool
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "agents_declared": len(self._agent_specs),
+            "agents_built": len(self._agents),
+            "tools_declared": len(self._tool_specs),
+            "tools_built": len(self._tools),
+            "build_seconds": self.build_seconds,
+        }
+
+
+registry = AgentRegistry()
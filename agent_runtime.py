@@ -0,0 +1,225 @@
+"""
+Agent Runtime Helpers
+
+A thin layer over `Runner.run` shared by all of the scripts, so cross-cutting
+behaviour is applied in one place:
+- `run_agent()` runs an agent, serving cacheable drafts from the draft cache
+  and using the record/replay model provider when MODEL_MODE selects one
+- Every model call (including handoffs and nested agent tools) is paced by
+  the shared rate-limit scheduler
+- Side-effect free runs can opt into hedging (see hedging.py)
+- Latency, token and cost metrics are recorded for every run (see metrics.py)
+- `stream_agent()` is the streaming counterpart of `run_agent()`
+- `agent_tool()` exposes an agent as a tool (like `Agent.as_tool`) whose
+  nested runs go through `run_agent()` as well
+"""
+
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional
+from agents import Agent, Runner, RunConfig, RunContextWrapper, function_tool
+from agents.items import ModelResponse
+from agents.models.interface import Model, ModelProvider
+from agents.models.multi_provider import MultiProvider
+
+from draft_cache import draft_key, get_draft_cache
+from hedging import get_hedging_policy
+from metrics import MetricsProvider, get_metrics, get_metrics_hooks
+from model_replay import get_model_provider
+from rate_limit import RateLimitScheduler, get_scheduler
+
+
+# Output tokens reserved per call when the model settings don't cap them
+DEFAULT_OUTPUT_RESERVE = 1024
+
+
+# ============================================================================
+# RATE-LIMITED MODELS
+# ============================================================================
+
+def estimate_tokens(system_instructions: Optional[str], input: Any, model_settings: Any) -> int:
+    """Rough token estimate (~4 characters per token) used to reserve TPM budget."""
+    text = (system_instructions or "") + json.dumps(input, default=str)
+    reserve = getattr(model_settings, "max_tokens", None) or DEFAULT_OUTPUT_RESERVE
+    return len(text) // 4 + reserve
+
+
+class RateLimitedModel(Model):
+    """
+    Paces a model's calls through the shared scheduler and retries on 429.
+
+    A streamed call is retried only until its first event: a failure after
+    output has been yielded can't be undone, so it propagates.
+    """
+
+    def __init__(self, inner: Model, scheduler: RateLimitScheduler):
+        self.inner = inner
+        self.scheduler = scheduler
+
+    async def get_response(self, system_instructions, input, model_settings, tools,
+                           output_schema, handoffs, tracing, **kwargs) -> ModelResponse:
+        estimate = estimate_tokens(system_instructions, input, model_settings)
+        response = await self.scheduler.call(
+            lambda: self.inner.get_response(
+                system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+            ),
+            {"model_requests": 1, "model_tokens": estimate},
+        )
+        # Settle the token budget with what the call actually used
+        self.scheduler.buckets["model_tokens"].adjust(response.usage.total_tokens - estimate)
+        return response
+
+    async def stream_response(self, system_instructions, input, model_settings, tools,
+                              output_schema, handoffs, tracing, **kwargs) -> AsyncIterator[Any]:
+        estimate = estimate_tokens(system_instructions, input, model_settings)
+
+        async def open_stream():
+            # The request is made (and a 429 raised) when the first event is awaited
+            stream = self.inner.stream_response(
+                system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+            )
+            try:
+                return stream, await stream.__anext__()
+            except StopAsyncIteration:
+                return stream, None
+            except BaseException:
+                await stream.aclose()
+                raise
+
+        stream, first = await self.scheduler.call(
+            open_stream, {"model_requests": 1, "model_tokens": estimate}
+        )
+
+        def settle(event: Any) -> Any:
+            # Settle the token budget with what the call actually used
+            if getattr(event, "type", None) == "response.completed" and event.response.usage:
+                self.scheduler.buckets["model_tokens"].adjust(event.response.usage.total_tokens - estimate)
+            return event
+
+        try:
+            if first is None:
+                return
+            yield settle(first)
+            async for event in stream:
+                yield settle(event)
+        finally:
+            await stream.aclose()
+
+
+class RateLimitedProvider(ModelProvider):
+    """Wraps another provider so all of its models share the scheduler's budgets."""
+
+    def __init__(self, inner: ModelProvider, scheduler: RateLimitScheduler):
+        self.inner = inner
+        self.scheduler = scheduler
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return RateLimitedModel(self.inner.get_model(model_name), self.scheduler)
+
+
+_run_config: Optional[RunConfig] = None
+
+
+def get_run_config() -> RunConfig:
+    """RunConfig shared by every run: record/replay or live models behind the scheduler."""
+    global _run_config
+    if _run_config is None:
+        provider = get_model_provider() or MultiProvider()
+        metrics = get_metrics()
+        if metrics is not None:
+            # Inside the rate limiter, so time-to-first-token excludes queueing
+            provider = MetricsProvider(provider, metrics)
+        _run_config = RunConfig(model_provider=RateLimitedProvider(provider, get_scheduler()))
+    return _run_config
+
+
+def set_run_config(config: Optional[RunConfig]) -> None:
+    """Replace the shared RunConfig; None rebuilds it from the current provider, metrics and scheduler."""
+    global _run_config
+    _run_config = config
+
+
+# ============================================================================
+# RUNNING AGENTS
+# ============================================================================
+
+@dataclass
+class CachedResult:
+    """Stand-in for a RunResult when a draft is served from the cache."""
+    final_output: Any
+    last_agent: Agent
+
+
+async def _run(agent: Agent, input: Any, hedge: bool, kwargs: Dict[str, Any]) -> Any:
+    policy = get_hedging_policy() if hedge else None
+    metrics = get_metrics()
+    start = time.perf_counter()
+    if policy is None:
+        result = await Runner.run(agent, input, **kwargs)
+    else:
+        result = await policy.run(agent.name, lambda: Runner.run(agent, input, **kwargs))
+    if metrics is not None:
+        metrics.observe("agent_run_seconds", (("agent", agent.name),), time.perf_counter() - start)
+    return result
+
+
+async def run_agent(agent: Agent, input: Any, cacheable: bool = False, hedge: bool = False,
+                    **kwargs: Any) -> Any:
+    """
+    Run an agent through the shared runtime.
+
+    Args:
+        agent: Agent to run
+        input: User input (string or list of input items)
+        cacheable: Whether the output may be served from / stored in the draft
+            cache. Only use for side-effect free agents such as draft writers.
+        hedge: Whether a slow run may be duplicated when hedging is enabled.
+            Only use for side-effect free agents.
+        **kwargs: Passed through to `Runner.run` (context, max_turns, ...)
+
+    Returns:
+        The RunResult, or a CachedResult exposing the same `final_output`
+    """
+    if kwargs.get("run_config") is None:
+        kwargs["run_config"] = get_run_config()
+    if kwargs.get("hooks") is None:
+        kwargs["hooks"] = get_metrics_hooks()
+
+    cache = get_draft_cache() if cacheable else None
+    if cache is None:
+        return await _run(agent, input, hedge, kwargs)
+
+    key = draft_key(agent, input)
+    cached = cache.get(key)
+    if cached is not None:
+        return CachedResult(final_output=cached, last_agent=agent)
+
+    result = await _run(agent, input, hedge, kwargs)
+    if isinstance(result.final_output, str):
+        cache.put(key, result.final_output)
+    return result
+
+
+def stream_agent(agent: Agent, input: Any, **kwargs: Any) -> Any:
+    """Start a streamed run through the shared runtime (see `Runner.run_streamed`)."""
+    if kwargs.get("run_config") is None:
+        kwargs["run_config"] = get_run_config()
+    if kwargs.get("hooks") is None:
+        kwargs["hooks"] = get_metrics_hooks()
+    return Runner.run_streamed(agent, input, **kwargs)
+
+
+def agent_tool(agent: Agent, tool_name: str, tool_description: str, cacheable: bool = False,
+               hedge: bool = False):
+    """Expose an agent as a function tool whose runs go through `run_agent()`."""
+
+    async def run_agent_tool(ctx: RunContextWrapper[Any], input: str) -> str:
+        result = await run_agent(agent, input, cacheable=cacheable, hedge=hedge, context=ctx.context)
+        return str(result.final_output)
+
+    return function_tool(
+        run_agent_tool,
+        name_override=tool_name,
+        description_override=tool_description,
+    )
@@ -9,15 +9,24 @@ This script implements a complete automated SDR system using:
 
 This demonstrates advanced agentic patterns including planning,
 tool use, and agent collaboration.
+
+The agent graph is declared in the agent registry (see agent_registry.py) and
+built on first use, so importing this module stays cheap for paths that never
+run an agent.
 """
 
 import os
+import re
+import json
 import asyncio
-from typing import Dict
+import functools
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
-import sendgrid
-from sendgrid.helpers.mail import Mail, Email, To, Content
-from agents import Agent, Runner, trace, function_tool
+
+from agent_registry import AgentSpec, AgentToolSpec, registry
+from html_render import UnrenderableEmailError, render_email_html
+from racing import race
 
 
 # Load environment variables
@@ -47,6 +56,10 @@ HTML_INSTRUCTIONS = """You can convert a text email body to an HTML email body.
 You are given a text email body which might have some markdown \
 and you need to convert it to an HTML email body with simple, clear, compelling layout and design."""
 
+SELECTOR_INSTRUCTIONS = """You pick the best cold sales email from the given options. \
+Imagine you are a customer and pick the one you are most likely to respond to. \
+Do not give an explanation; reply with the selected email only."""
+
 EMAILER_INSTRUCTIONS = """You are an email formatter and sender. You receive the body of an email to be sent. \
 You first use the subject_writer tool to write a subject for the email, then use the html_converter tool to convert the body to HTML. \
 Finally, you use the send_html_email tool to send the email with the subject and HTML body."""
@@ -67,39 +80,130 @@ Crucial Rules:
 - You must hand off exactly ONE email to the Email Manager — never more than one.
 """
 
+FANOUT_MANAGER_INSTRUCTIONS = """
+You are a Sales Manager at ComplAI. Your goal is to send the single best cold sales email.
+
+You are given the original request followed by the email drafts written by your sales agents.
+
+Follow these steps carefully:
+1. Evaluate and Select: Review the drafts and choose the single best email using your judgment of which one is most effective.
+
+2. Handoff for Sending: Pass ONLY the winning email draft to the 'Email Manager' agent. The Email Manager will take care of formatting and sending.
+
+Crucial Rules:
+- Do not rewrite the drafts — pick one of them.
+- You must hand off exactly ONE email to the Email Manager — never more than one.
+"""
+
 
 # ============================================================================
 # TOOLS - Function Decorators
 # ============================================================================
-
-@function_tool
-def send_email(body: str) -> Dict[str, str]:
-    """Send out an email with the given body to all sales prospects."""
-    sender_email = os.environ.get('SENDER_EMAIL')
-    recipient_email = os.environ.get('RECIPIENT_EMAIL')
-    
-    sg = sendgrid.SendGridAPIClient(api_key=os.environ.get('SENDGRID_API_KEY'))
-    from_email = Email(sender_email)
-    to_email = To(recipient_email)
-    content = Content("text/plain", body)
-    mail = Mail(from_email, to_email, "Sales email", content).get()
-    sg.client.mail.send.post(request_body=mail)
-    return {"status": "success"}
-
-
-@function_tool
-def send_html_email(subject: str, html_body: str) -> Dict[str, str]:
-    """Send out an email with the given subject and HTML body to all sales prospects."""
-    sender_email = os.environ.get('SENDER_EMAIL')
-    recipient_email = os.environ.get('RECIPIENT_EMAIL')
-    
-    sg = sendgrid.SendGridAPIClient(api_key=os.environ.get('SENDGRID_API_KEY'))
-    from_email = Email(sender_email)
-    to_email = To(recipient_email)
-    content = Content("text/html", html_body)
-    mail = Mail(from_email, to_email, subject, content).get()
-    sg.client.mail.send.post(request_body=mail)
-    return {"status": "success"}
+# Tools are registered as factories: the SDK import and the decorators run
+# the first time an agent that uses the tool is built
+
+def _send_email_tool():
+    from agents import function_tool
+    from email_transport import EmailMessage, get_transport
+    from tool_cache import side_effects
+
+    @function_tool
+    @side_effects
+    async def send_email(body: str) -> Dict[str, str]:
+        """Send out an email with the given body to all sales prospects."""
+        message = EmailMessage(
+            sender=os.environ.get('SENDER_EMAIL'),
+            recipient=os.environ.get('RECIPIENT_EMAIL'),
+            subject="Sales email",
+            content=body,
+        )
+        result = await get_transport().send(message)
+        return result.as_tool_result()
+
+    return send_email
+
+
+def _send_html_email_tool():
+    from agents import RunContextWrapper, function_tool
+    from email_transport import EmailMessage, get_transport
+    from tool_cache import side_effects
+
+    @function_tool
+    @side_effects
+    async def send_html_email(ctx: RunContextWrapper[Any], subject: str, html_body: str) -> Dict[str, str]:
+        """Send out an email with the given subject and HTML body to all sales prospects."""
+        message = EmailMessage(
+            sender=os.environ.get('SENDER_EMAIL'),
+            # Campaign runs pass the current prospect as run context; demos fall back to .env
+            recipient=getattr(ctx.context, 'email', None) or os.environ.get('RECIPIENT_EMAIL'),
+            subject=subject,
+            content=html_body,
+            content_type="text/html",
+        )
+        result = await get_transport().send(message)
+        return result.as_tool_result()
+
+    return send_html_email
+
+
+async def write_subject(body: str) -> str:
+    """
+    Subject line for an email body. During campaigns, concurrent requests are
+    coalesced into batched calls; anything the batch can't answer falls back
+    to the subject writer agent.
+    """
+    from agent_runtime import run_agent
+    from subject_batch import get_subject_batcher
+
+    batcher = get_subject_batcher()
+    if batcher is not None:
+        subject = await batcher.submit(body)
+        if subject:
+            return subject
+    result = await run_agent(registry.agent("subject_writer"), body, hedge=True)
+    return result.final_output
+
+
+async def convert_to_html(body: str) -> str:
+    """
+    HTML version of an email body, rendered locally in microseconds; only
+    bodies the renderer can't parse go through the HTML converter agent.
+    """
+    try:
+        return render_email_html(body)
+    except UnrenderableEmailError:
+        from agent_runtime import run_agent
+
+        result = await run_agent(registry.agent("html_converter"), body)
+        return result.final_output
+
+
+def _subject_tool():
+    from agents import function_tool
+
+    @function_tool(name_override="subject_writer")
+    async def subject_tool(body: str) -> str:
+        """Write a subject for a cold sales email."""
+        return await write_subject(body)
+
+    return subject_tool
+
+
+def _html_tool():
+    from agents import function_tool
+
+    @function_tool(name_override="html_converter")
+    async def html_tool(body: str) -> str:
+        """Convert a text email body to an HTML email body."""
+        return await convert_to_html(body)
+
+    return html_tool
+
+
+registry.add_tool("send_email", _send_email_tool)
+registry.add_tool("send_html_email", _send_html_email_tool)
+registry.add_tool("subject_writer", _subject_tool)
+registry.add_tool("html_converter", _html_tool)
 
 
 # ============================================================================
@@ -107,94 +211,479 @@ def send_html_email(subject: str, html_body: str) -> Dict[str, str]:
 # ============================================================================
 
 # Sales Agents
-sales_agent1 = Agent(
+registry.add_agent("sales_agent1", AgentSpec(
     name="Professional Sales Agent",
     instructions=PROFESSIONAL_INSTRUCTIONS,
-    model="gpt-4o-mini"
-)
+))
 
-sales_agent2 = Agent(
+registry.add_agent("sales_agent2", AgentSpec(
     name="Engaging Sales Agent",
     instructions=ENGAGING_INSTRUCTIONS,
-    model="gpt-4o-mini"
-)
+))
 
-sales_agent3 = Agent(
+registry.add_agent("sales_agent3", AgentSpec(
     name="Concise Sales Agent",
     instructions=CONCISE_INSTRUCTIONS,
-    model="gpt-4o-mini"
-)
+))
 
 # Email Formatting Agents
-subject_writer = Agent(
+registry.add_agent("subject_writer", AgentSpec(
     name="Email Subject Writer",
     instructions=SUBJECT_INSTRUCTIONS,
-    model="gpt-4o-mini"
-)
+))
 
-html_converter = Agent(
+registry.add_agent("html_converter", AgentSpec(
     name="HTML Email Body Converter",
     instructions=HTML_INSTRUCTIONS,
-    model="gpt-4o-mini"
-)
+))
+
+# Pipeline mode: decides between drafts the local ranker can't separate
+registry.add_agent("email_picker", AgentSpec(
+    name="Email Selector",
+    instructions=SELECTOR_INSTRUCTIONS,
+))
 
 
 # ============================================================================
 # CONVERT AGENTS TO TOOLS
 # ============================================================================
 
-# Sales agent tools
-tool1 = sales_agent1.as_tool(
-    tool_name="sales_agent1",
-    tool_description="Write a cold sales email"
-)
-
-tool2 = sales_agent2.as_tool(
-    tool_name="sales_agent2",
-    tool_description="Write a cold sales email"
-)
-
-tool3 = sales_agent3.as_tool(
-    tool_name="sales_agent3",
-    tool_description="Write a cold sales email"
-)
-
-# Email formatting tools
-subject_tool = subject_writer.as_tool(
-    tool_name="subject_writer",
-    tool_description="Write a subject for a cold sales email"
-)
-
-html_tool = html_converter.as_tool(
-    tool_name="html_converter",
-    tool_description="Convert a text email body to an HTML email body"
-)
+# Sales agent tools (side-effect free, so drafts may be cached and hedged)
+for _key in ("sales_agent1", "sales_agent2", "sales_agent3"):
+    registry.add_tool(_key, AgentToolSpec(
+        agent=_key,
+        description="Write a cold sales email",
+        cacheable=True,
+        hedge=True,
+    ))
 
 
 # ============================================================================
 # EMAIL MANAGER AGENT (Handoff Target)
 # ============================================================================
 
-emailer_agent = Agent(
+registry.add_agent("emailer_agent", AgentSpec(
     name="Email Manager",
     instructions=EMAILER_INSTRUCTIONS,
-    tools=[subject_tool, html_tool, send_html_email],
-    model="gpt-4o-mini",
-    handoff_description="Convert an email to HTML and send it"
-)
+    tools=("subject_writer", "html_converter", "send_html_email"),
+    handoff_description="Convert an email to HTML and send it",
+))
 
 
 # ============================================================================
 # SALES MANAGER AGENT (Orchestrator)
 # ============================================================================
 
-sales_manager = Agent(
+registry.add_agent("sales_manager", AgentSpec(
     name="Sales Manager",
     instructions=SALES_MANAGER_INSTRUCTIONS,
-    tools=[tool1, tool2, tool3],
-    handoffs=[emailer_agent],
-    model="gpt-4o-mini"
-)
+    tools=("sales_agent1", "sales_agent2", "sales_agent3"),
+    handoffs=("emailer_agent",),
+))
+
+# Fan-out mode: drafts are generated concurrently in code, so the manager only
+# needs a single turn to pick one and hand off
+registry.add_agent("fanout_manager", AgentSpec(
+    name="Sales Manager",
+    instructions=FANOUT_MANAGER_INSTRUCTIONS,
+    handoffs=("emailer_agent",),
+))
+
+DRAFT_AGENTS = ("sales_agent1", "sales_agent2", "sales_agent3")
+
+# Names the graph used to be importable under; built on first access
+_AGENT_ATTRIBUTES = {
+    "sales_agent1", "sales_agent2", "sales_agent3", "subject_writer", "html_converter",
+    "emailer_agent", "sales_manager", "fanout_manager",
+}
+_TOOL_ATTRIBUTES = {
+    "tool1": "sales_agent1", "tool2": "sales_agent2", "tool3": "sales_agent3",
+    "send_email": "send_email", "send_html_email": "send_html_email",
+    "subject_tool": "subject_writer", "html_tool": "html_converter",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _AGENT_ATTRIBUTES:
+        return registry.agent(name)
+    if name in _TOOL_ATTRIBUTES:
+        return registry.tool(_TOOL_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_ranker = None
+
+
+def _get_ranker():
+    global _ranker
+    if _ranker is None:
+        from email_ranker import EmailRanker
+        _ranker = EmailRanker()
+    return _ranker
+
+
+async def _draft(tool_name: str, message: str, context: Any) -> str:
+    from agents import function_span
+    from agent_runtime import run_agent
+
+    # Same function span the sales_agent tools produce in agent mode
+    with function_span(tool_name, input=json.dumps({"input": message})) as span:
+        result = await run_agent(registry.agent(tool_name), message, cacheable=True, hedge=True, context=context)
+        span.span_data.output = result.final_output
+    return result.final_output
+
+
+async def _fanout_drafts(message: str, context: Any,
+                         agents: Tuple[str, ...] = DRAFT_AGENTS) -> List[Tuple[str, str]]:
+    """
+    Draft concurrently with `agents`; with DRAFT_QUORUM set, stop once that many
+    drafts pass the local ranker (DRAFT_ACCEPT_SCORE) or DRAFT_DEADLINE seconds elapse.
+    """
+    factories = [
+        lambda tool_name=tool_name: _draft(tool_name, message, context)
+        for tool_name in agents
+    ]
+    quorum = min(int(os.environ.get('DRAFT_QUORUM', len(agents))), len(agents))
+    deadline = os.environ.get('DRAFT_DEADLINE')
+    min_score = float(os.environ.get('DRAFT_ACCEPT_SCORE', 0.5))
+    terms = [getattr(context, attr, "") for attr in ("name", "company", "role")]
+
+    # Without a quorum every draft counts, so the race simply waits for all of them
+    if quorum < len(agents):
+        ranker = _get_ranker()
+        accept = lambda draft: ranker.accepts(draft, min_score, terms)
+    else:
+        accept = lambda draft: True
+
+    outcome = await race(
+        factories,
+        accept=accept,
+        quorum=quorum,
+        deadline=float(deadline) if deadline else None,
+    )
+    if not outcome.accepted and not outcome.rejected:
+        errors = list(outcome.failed.values())
+        if errors:
+            raise errors[0]
+        raise TimeoutError(f"No drafts finished within {deadline}s")
+    # Keep the agents' order so the manager prompt is stable across runs
+    finished = {**outcome.accepted, **outcome.rejected}
+    return [(agents[index], finished[index]) for index in sorted(finished)]
+
+
+def _choose_styles(context: Any) -> Tuple[str, ...]:
+    """Draft agents to run for a prospect: the style bandit's choice, or all of them without one."""
+    from style_bandit import get_style_bandit, segment_of
+
+    bandit = get_style_bandit()
+    return bandit.choose(segment_of(context)) if bandit is not None else DRAFT_AGENTS
+
+
+def _record_style(context: Any, style: str) -> None:
+    """Tell the style bandit which style a prospect was sent, so its outcome can be credited."""
+    from style_bandit import get_style_bandit, segment_of
+
+    bandit = get_style_bandit()
+    email = getattr(context, 'email', None)
+    if bandit is not None and email and style:
+        bandit.record_send(email, segment_of(context), style)
+
+
+def _check_suppressed(context: Any) -> None:
+    """Raise SuppressedError before any draft is written for an address we can't email."""
+    from suppression import SuppressedError, get_suppression_index
+
+    index = get_suppression_index()
+    email = getattr(context, 'email', None)
+    if index is not None and email and email in index:
+        raise SuppressedError(f"{email} is on the suppression list")
+
+
+async def run_sales_manager(message: str, context: Any = None, mode: Optional[str] = None) -> Any:
+    """
+    Run the Sales Manager → Email Manager workflow.
+
+    Args:
+        message: Request for the Sales Manager
+        context: Run context (e.g. the campaign prospect)
+        mode: "agent" lets the manager call the draft tools itself; "fanout"
+            generates the drafts concurrently in code (optionally racing them,
+            see DRAFT_QUORUM) and uses one model turn to pick and hand off;
+            with a style bandit (STYLE_BANDIT_DB), usually only one style is
+            drafted;
+            "template" ignores `message` and renders the email from the
+            prospect's segment template (see `send_templated()`).
+            Defaults to SALES_MANAGER_MODE or "agent". For the staged,
+            backpressured equivalent of "fanout" see `sdr_pipeline()`.
+
+    Returns:
+        The RunResult of the manager run (final output comes from the Email
+        Manager), or the RenderedEmail that was sent in "template" mode
+
+    Raises:
+        SuppressedError: If the prospect in `context` is in the suppression index
+    """
+    from agent_runtime import run_agent
+
+    _check_suppressed(context)
+    mode = mode or os.environ.get('SALES_MANAGER_MODE', 'agent')
+    if mode == "agent":
+        return await run_agent(registry.agent("sales_manager"), message, context=context)
+    if mode == "template":
+        return await send_templated(context)
+    if mode != "fanout":
+        raise ValueError(f"Unknown sales manager mode: {mode}")
+
+    styles = _choose_styles(context)
+    drafts = await _fanout_drafts(message, context, styles)
+    prompt = message + "\n\n" + "\n\n".join(
+        f"Draft from {tool_name}:\n\n{draft}" for tool_name, draft in drafts
+    )
+    result = await run_agent(registry.agent("fanout_manager"), prompt, context=context)
+    # Which of several drafts the manager sent isn't known, so only single-style sends are credited
+    if len(drafts) == 1:
+        _record_style(context, drafts[0][0])
+    return result
+
+
+# ============================================================================
+# STREAMING PIPELINE
+# ============================================================================
+# The fan-out workflow as separate stages with their own worker counts:
+# generate → select → subject → HTML → send. Selection and formatting happen
+# in code, so there is no manager or Email Manager model turn per prospect.
+
+PIPELINE_STAGES = ("generate", "select", "subject", "html", "send")
+
+# Local score gap below which the picker agent decides between drafts
+SELECT_MARGIN = 0.05
+
+
+@dataclass
+class EmailJob:
+    """One prospect's email as it moves through the pipeline."""
+    message: str
+    context: Any = None
+    drafts: List[Tuple[str, str]] = field(default_factory=list)
+    style: str = ""  # Draft agent whose draft was selected
+    body: str = ""
+    subject: str = ""
+    html: str = ""
+    duplicate: bool = False  # The outbox already had an email for this prospect
+
+
+async def pick_draft(drafts: List[str], context: Any = None, margin: float = SELECT_MARGIN) -> str:
+    """Best draft by the local ranker; close calls go to the picker agent."""
+    from agent_runtime import run_agent
+
+    if not drafts:
+        raise ValueError("pick_draft needs at least one draft")
+    if len(drafts) == 1:
+        return drafts[0]
+    terms = [getattr(context, attr, "") for attr in ("name", "company", "role")]
+    ranking = _get_ranker().rank(drafts, terms)
+    if ranking.margin >= margin:
+        return drafts[ranking.best]
+    contenders = [drafts[i] for i in ranking.order if ranking.scores[ranking.best] - ranking.scores[i] < margin]
+    result = await run_agent(registry.agent("email_picker"),
+                             "Cold sales emails:\n\n" + "\n\nEmail:\n\n".join(contenders), hedge=True)
+    return result.final_output
+
+
+async def _generate(job: EmailJob) -> EmailJob:
+    _check_suppressed(job.context)
+    job.drafts = await _fanout_drafts(job.message, job.context, _choose_styles(job.context))
+    return job
+
+
+async def _select(job: EmailJob) -> EmailJob:
+    job.body = await pick_draft([draft for _, draft in job.drafts], job.context)
+    # The picker may quote the winner back with edits; then the style is unknown and not credited
+    job.style = next((style for style, draft in job.drafts if draft == job.body), "")
+    job.drafts = []  # Only the chosen draft travels further
+    return job
+
+
+async def _subject(job: EmailJob) -> EmailJob:
+    job.subject = await write_subject(job.body)
+    return job
+
+
+async def _html(job: EmailJob) -> EmailJob:
+    job.html = await convert_to_html(job.body)
+    return job
+
+
+async def _deliver(context: Any, subject: str, html_body: str, template=None, substitutions=None):
+    """
+    Send an HTML email to the prospect in `context` (or RECIPIENT_EMAIL).
+
+    `template` and `substitutions` describe a templated email (see
+    email_templates.RenderedEmail) so a batching transport can group it.
+
+    Returns:
+        The email_transport.SendResult; `duplicate` is set when an outbox
+        suppressed the send because this campaign already emailed the prospect
+    """
+    from email_transport import EmailMessage, get_transport
+
+    message = EmailMessage(
+        sender=os.environ.get('SENDER_EMAIL'),
+        recipient=getattr(context, 'email', None) or os.environ.get('RECIPIENT_EMAIL'),
+        subject=subject,
+        content=html_body,
+        content_type="text/html",
+        template=template,
+        substitutions=substitutions,
+    )
+    result = await get_transport().send(message)
+    if not result.ok and not result.duplicate:
+        raise RuntimeError(f"Send failed with status {result.status_code}: {result.body[:200]}")
+    return result
+
+
+async def _send(job: EmailJob) -> EmailJob:
+    result = await _deliver(job.context, job.subject, job.html)
+    job.duplicate = result.duplicate
+    if not job.duplicate:
+        _record_style(job.context, job.style)
+    return job
+
+
+def sdr_pipeline(workers: Optional[Dict[str, int]] = None, on_error=None, on_sent=None,
+                 group_id: Optional[str] = None, default_workers: int = 10):
+    """
+    Build the SDR workflow as a backpressured pipeline of EmailJob items.
+
+    Args:
+        workers: Workers per stage name (see PIPELINE_STAGES)
+        on_error: Called with (job, stage name, exception) when a job fails
+        on_sent: Called with each job whose email was accepted
+        group_id: Trace group; each model-calling stage of a job is traced in it
+        default_workers: Workers for stages missing from `workers`
+
+    Returns:
+        A pipeline.Pipeline; feed it EmailJobs with `await pipeline.run(jobs)`
+    """
+    from agents import trace
+    from metrics import get_metrics
+    from pipeline import Pipeline, Stage
+
+    async def send(job: EmailJob) -> EmailJob:
+        await _send(job)
+        if on_sent is not None:
+            on_sent(job)
+        return job
+
+    def traced(name: str, handler):
+        async def run(job: EmailJob) -> EmailJob:
+            with trace(f"Automated SDR Pipeline: {name}", group_id=group_id):
+                return await handler(job)
+        return run
+
+    counts = workers or {}
+    handlers = {"generate": _generate, "select": _select, "subject": _subject, "html": _html, "send": send}
+    unknown = set(counts) - set(handlers)
+    if unknown:
+        raise ValueError(f"Unknown pipeline stages: {', '.join(sorted(unknown))}")
+    stages = [
+        Stage(name, traced(name, handlers[name]) if group_id and name != "send" else handlers[name],
+              workers=counts.get(name, default_workers))
+        for name in PIPELINE_STAGES
+    ]
+    return Pipeline(stages, on_error=on_error, metrics=get_metrics())
+
+
+# ============================================================================
+# TEMPLATES
+# ============================================================================
+# Generate once, personalize many: the sales agents write one template per
+# segment and every prospect's email is rendered from it locally (see
+# email_templates.py), so a segment costs one set of model calls in total.
+
+TEMPLATE_SUBJECT_INSTRUCTIONS = """Write a subject for the cold sales email template below. \
+You may use the merge fields {{first_name}} or {{company}} exactly as written, and no other placeholders. \
+Reply with the subject only."""
+
+
+def _template_request(segment: str, segment_by: Optional[str], audience: Optional[str]) -> str:
+    from email_templates import TEMPLATE_GUIDE
+
+    if audience is None:
+        audience = f"prospects whose {segment_by} is {segment}" if segment_by and segment else "business leaders"
+    return f"Write a cold sales email from Alice to {audience}.\n\n{TEMPLATE_GUIDE}"
+
+
+async def generate_template(segment: str = "", segment_by: Optional[str] = None, audience: Optional[str] = None):
+    """
+    Write the email template for one segment.
+
+    The sales agents draft concurrently (drafts are cached like any other, see
+    DRAFT_CACHE_DIR); drafts that aren't usable templates are discarded, the
+    best remaining one is picked, and the subject writer adds a subject that
+    may use merge fields too.
+
+    Args:
+        segment: Value of `segment_by` shared by the segment's prospects ("" for everyone)
+        segment_by: Prospect field the campaign is segmented by, e.g. "industry"
+        audience: Who the segment is, for the drafting prompt; overrides the
+            description built from `segment` and `segment_by` (see
+            segmentation.ProspectSegmenter.describe)
+
+    Returns:
+        A compiled email_templates.EmailTemplate
+
+    Raises:
+        TemplateError: If none of the drafts is a usable template
+    """
+    from agent_runtime import run_agent
+    from email_templates import TemplateError, compile_email_template, is_valid_template
+
+    drafts = [draft for _, draft in await _fanout_drafts(_template_request(segment, segment_by, audience), None)
+              if is_valid_template(draft)]
+    if not drafts:
+        raise TemplateError(f"No draft for segment {segment or '(all)'!r} was a usable template")
+    body = await pick_draft(drafts)
+    if body not in drafts:
+        # The picker quoted the email back with changes; fall back to the local ranking
+        body = drafts[_get_ranker().rank(drafts).best]
+
+    result = await run_agent(registry.agent("subject_writer"), f"{TEMPLATE_SUBJECT_INSTRUCTIONS}\n\n{body}",
+                             cacheable=True, hedge=True)
+    subject = " ".join(result.final_output.split()).strip('"')
+    try:
+        return compile_email_template(subject, body)
+    except TemplateError:
+        # A subject with an invented placeholder: keep the words, drop the braces
+        return compile_email_template(re.sub(r"\{\{[^{}]*\}\}|[{}\[\]]", "", subject).strip(), body)
+
+
+def _get_template_library():
+    """The configured template library, or a campaign-wide one segmented by TEMPLATE_SEGMENT_BY."""
+    from email_templates import TemplateLibrary, get_template_library, set_template_library
+
+    library = get_template_library()
+    if library is None:
+        segment_by = os.environ.get('TEMPLATE_SEGMENT_BY') or None
+        library = TemplateLibrary(functools.partial(generate_template, segment_by=segment_by), segment_by)
+        set_template_library(library)
+    return library
+
+
+async def send_templated(context: Any):
+    """
+    Send the prospect in `context` its email, rendered from its segment's template.
+
+    Returns:
+        The email_templates.RenderedEmail that was sent
+
+    Raises:
+        SuppressedError: If the prospect is in the suppression index
+    """
+    _check_suppressed(context)
+    email = await _get_template_library().render(context)
+    await _deliver(context, email.subject, email.html, email.template, email.substitutions)
+    return email
 
 
 # ============================================================================
@@ -203,6 +692,9 @@ sales_manager = Agent(
 
 async def demo_basic_tool_usage():
     """Demonstrate basic tool usage with a simple sales manager."""
+    from agents import Agent, trace
+    from agent_runtime import run_agent
+
     print("=" * 60)
     print("Demo 1: Basic Tool Usage")
     print("=" * 60)
@@ -226,14 +718,14 @@ Crucial Rules:
     basic_manager = Agent(
         name="Basic Sales Manager",
         instructions=basic_manager_instructions,
-        tools=[tool1, tool2, tool3, send_email],
+        tools=[registry.tool(name) for name in ("sales_agent1", "sales_agent2", "sales_agent3", "send_email")],
         model="gpt-4o-mini"
     )
     
     message = "Send a cold sales email addressed to 'Dear CEO'"
     
     with trace("Basic Sales Manager"):
-        result = await Runner.run(basic_manager, message)
+        result = await run_agent(basic_manager, message)
     
     print("✅ Email sent using basic tool usage")
     print("ℹ️  Check the trace at: https://platform.openai.com/traces")
@@ -242,6 +734,8 @@ Crucial Rules:
 
 async def demo_full_sdr_system():
     """Demonstrate the full SDR system with handoffs and HTML formatting."""
+    from agents import trace
+
     print("=" * 60)
     print("Demo 2: Full Automated SDR System")
     print("=" * 60)
@@ -250,7 +744,7 @@ async def demo_full_sdr_system():
     message = "Send out a cold sales email addressed to Dear CEO from Alice"
     
     with trace("Automated SDR"):
-        result = await Runner.run(sales_manager, message)
+        result = await run_sales_manager(message)
     
     print("✅ HTML email sent using full SDR system")
     print("ℹ️  Check the trace at: https://platform.openai.com/traces")
@@ -258,8 +752,44 @@ async def demo_full_sdr_system():
     print()
 
 
+async def demo_template_personalization():
+    """Demonstrate one generated template personalized for several prospects."""
+    import time
+    from types import SimpleNamespace
+    from agents import trace
+
+    print("=" * 60)
+    print("Demo 3: Generate Once, Personalize Many")
+    print("=" * 60)
+    print()
+
+    prospects = [
+        SimpleNamespace(name="Maria Lopez", company="Acme Health", role="CTO", industry="Healthcare"),
+        SimpleNamespace(name="Sam Okafor", company="Northwind Bank", role="CISO", industry="Finance"),
+        SimpleNamespace(name="", company="", role="", industry=""),
+    ]
+
+    with trace("Automated SDR Template"):
+        template = await generate_template()
+
+    start = time.perf_counter()
+    emails = [template.render(prospect) for prospect in prospects]
+    elapsed = time.perf_counter() - start
+
+    for prospect, email in zip(prospects, emails):
+        first_line = email.text.strip().splitlines()[0]
+        print(f"👤 {prospect.name or '(no details)'}: {email.subject}")
+        print(f"   {first_line}")
+    print()
+    print(f"✅ One template, {len(emails)} personalized emails rendered in {elapsed * 1e6:.0f}µs (not sent)")
+    print()
+
+
 async def main():
     """Run all demonstrations."""
+    from email_transport import close_transport
+    from metrics import get_metrics
+
     print("\n")
     print("*" * 60)
     print("AUTOMATED SDR SYSTEM")
@@ -284,6 +814,11 @@ async def main():
     
     # Demo 2: Full SDR system
     await demo_full_sdr_system()
+
+    # Demo 3: Template personalization
+    await demo_template_personalization()
+    
+    await close_transport()
     
     print("*" * 60)
     print("All demonstrations completed!")
@@ -293,8 +828,14 @@ async def main():
     print("- Tools: Agents and functions can be converted to tools")
     print("- Handoffs: Agents can delegate control to other agents")
     print("- Planning: Sales Manager orchestrates the entire workflow")
+    print("- Templates: One generated email can be personalized locally for many prospects")
     print("- Observability: All actions are traced in OpenAI platform")
     print()
+    metrics = get_metrics()
+    if metrics is not None:
+        print("Local metrics:")
+        metrics.print_summary()
+        print()
 
 
 if __name__ == "__main__":
@@ -7,15 +7,23 @@ to generate cold sales emails with different writing styles.
 Features:
 - Three agents with distinct personalities (professional, engaging, concise)
 - Streaming output to see agent responses in real-time
-- Parallel execution for efficiency
-- AI-powered selection of the best email
+- Parallel execution for efficiency, returning as soon as enough drafts
+  pass a local quality check
+- AI-powered selection of the best email, ranked locally first so the
+  picker agent is only consulted for close calls
+
+The agents are declared in the agent registry (see agent_registry.py) and
+built on first use.
 """
 
 import os
 import asyncio
+from typing import Any
 from dotenv import load_dotenv
-from agents import Agent, Runner, trace
-from openai.types.responses import ResponseTextDeltaEvent
+
+from agent_registry import AgentSpec, registry
+from email_ranker import EmailRanker
+from racing import race
 
 
 # Load environment variables
@@ -40,40 +48,121 @@ Imagine you are a customer and pick the one you are most likely to respond to. \
 Do not give an explanation; reply with the selected email only."""
 
 
-# Initialize Agents
-sales_agent1 = Agent(
+# Declare Agents (registry keys are prefixed so they don't clash with automated_sdr's)
+registry.add_agent("basic_sales_agent.sales_agent1", AgentSpec(
     name="Professional Sales Agent",
     instructions=PROFESSIONAL_INSTRUCTIONS,
-    model="gpt-4o-mini"
-)
+))
 
-sales_agent2 = Agent(
+registry.add_agent("basic_sales_agent.sales_agent2", AgentSpec(
     name="Engaging Sales Agent",
     instructions=ENGAGING_INSTRUCTIONS,
-    model="gpt-4o-mini"
-)
+))
 
-sales_agent3 = Agent(
+registry.add_agent("basic_sales_agent.sales_agent3", AgentSpec(
     name="Concise Sales Agent",
     instructions=CONCISE_INSTRUCTIONS,
-    model="gpt-4o-mini"
-)
+))
 
-sales_picker = Agent(
+registry.add_agent("basic_sales_agent.sales_picker", AgentSpec(
     name="Email Selector",
     instructions=SELECTOR_INSTRUCTIONS,
-    model="gpt-4o-mini"
-)
+))
+
+ranker = EmailRanker()
+
+# Local score gap below which the picker agent makes the final call
+ESCALATION_MARGIN = 0.05
+
+# Drafting races the three agents: it stops once DRAFT_QUORUM drafts score at
+# least ACCEPT_SCORE locally, or after DRAFT_DEADLINE seconds
+DRAFT_QUORUM = 2
+ACCEPT_SCORE = 0.5
+DRAFT_DEADLINE = 30.0
+
+DRAFT_AGENTS = ("basic_sales_agent.sales_agent1", "basic_sales_agent.sales_agent2", "basic_sales_agent.sales_agent3")
+
+# Names the agents used to be importable under; built on first access
+_AGENT_ATTRIBUTES = {"sales_agent1", "sales_agent2", "sales_agent3", "sales_picker"}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _AGENT_ATTRIBUTES:
+        return registry.agent(f"basic_sales_agent.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def select_best_email(outputs, personalization=(), margin=ESCALATION_MARGIN):
+    """
+    Pick the best email, escalating to the picker agent only for close calls.
+    
+    Args:
+        outputs: Candidate emails
+        personalization: Prospect details (name, company, ...) the email should mention
+        margin: Minimum local score gap needed to skip the picker agent
+        
+    Returns:
+        Tuple of (best email, whether the picker agent was used)
+        
+    Raises:
+        ValueError: If there are no candidate emails
+    """
+    from agent_runtime import run_agent
+    
+    if not outputs:
+        raise ValueError("select_best_email needs at least one candidate email")
+    ranking = ranker.rank(outputs, personalization)
+    if ranking.margin >= margin:
+        return outputs[ranking.best], False
+    
+    # Only the close contenders go to the picker
+    contenders = [outputs[i] for i in ranking.order if ranking.scores[ranking.best] - ranking.scores[i] < margin]
+    emails = "Cold sales emails:\n\n" + "\n\nEmail:\n\n".join(contenders)
+    best = await run_agent(registry.agent("basic_sales_agent.sales_picker"), emails, hedge=True)
+    return best.final_output, True
+
+
+async def race_drafts(message, personalization=(), quorum=DRAFT_QUORUM, deadline=DRAFT_DEADLINE,
+                      on_result=None):
+    """
+    Draft with all sales agents and stop once `quorum` drafts are good enough.
+    
+    Args:
+        message: Prompt for the sales agents
+        personalization: Prospect details used by the acceptance check
+        quorum: Accepted drafts needed before the slower agents are cancelled
+        deadline: Seconds after which whatever has finished is returned
+        on_result: Called with (agent index, draft, accepted) as drafts finish
+        
+    Returns:
+        A racing.RaceResult whose values are draft texts
+    """
+    from agent_runtime import run_agent
+
+    async def draft(key):
+        result = await run_agent(registry.agent(key), message, cacheable=True, hedge=True)
+        return result.final_output
+    
+    return await race(
+        [lambda key=key: draft(key) for key in DRAFT_AGENTS],
+        accept=lambda email: ranker.accepts(email, ACCEPT_SCORE, personalization),
+        quorum=quorum,
+        deadline=deadline,
+        on_result=on_result,
+    )
 
 
 async def demo_streaming_output():
     """Demonstrate streaming output from a single agent."""
+    from openai.types.responses import ResponseTextDeltaEvent
+    from agent_runtime import stream_agent
+
     print("=" * 60)
     print("Demo 1: Streaming Output from Professional Agent")
     print("=" * 60)
     print()
     
-    result = Runner.run_streamed(sales_agent1, input="Write a cold sales email")
+    result = stream_agent(registry.agent("basic_sales_agent.sales_agent1"), input="Write a cold sales email")
     
     async for event in result.stream_events():
         if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
@@ -84,6 +173,8 @@ async def demo_streaming_output():
 
 async def demo_parallel_execution():
     """Demonstrate parallel execution of multiple agents."""
+    from agents import trace
+
     print("=" * 60)
     print("Demo 2: Parallel Execution of Three Agents")
     print("=" * 60)
@@ -91,33 +182,26 @@ async def demo_parallel_execution():
     
     message = "Write a cold sales email"
     
-    with trace("Parallel Cold Emails"):
-        results = await asyncio.gather(
-            Runner.run(sales_agent1, message),
-            Runner.run(sales_agent2, message),
-            Runner.run(sales_agent3, message),
-        )
-    
-    outputs = [result.final_output for result in results]
-    
-    print("Professional Agent Output:")
-    print("-" * 60)
-    print(outputs[0])
-    print()
+    def show(index, email, accepted):
+        print(f"{registry.spec(DRAFT_AGENTS[index]).name} Output ({'accepted' if accepted else 'below the bar'}):")
+        print("-" * 60)
+        print(email)
+        print()
     
-    print("Engaging Agent Output:")
-    print("-" * 60)
-    print(outputs[1])
-    print()
+    with trace("Parallel Cold Emails"):
+        outcome = await race_drafts(message, on_result=show)
     
-    print("Concise Agent Output:")
-    print("-" * 60)
-    print(outputs[2])
+    print(f"⏱️  {len(outcome.accepted)} of {DRAFT_QUORUM} drafts accepted in {outcome.elapsed:.2f}s"
+          f"{' (deadline hit)' if outcome.timed_out else ''}")
+    for index in outcome.cancelled:
+        print(f"✂️  Cancelled {registry.spec(DRAFT_AGENTS[index]).name}")
     print("\n")
 
 
 async def demo_ai_selection():
     """Demonstrate AI-powered selection of the best email."""
+    from agents import trace
+
     print("=" * 60)
     print("Demo 3: AI-Powered Email Selection")
     print("=" * 60)
@@ -126,23 +210,19 @@ async def demo_ai_selection():
     message = "Write a cold sales email"
     
     with trace("Selection from Sales Agents"):
-        # Generate emails in parallel
-        results = await asyncio.gather(
-            Runner.run(sales_agent1, message),
-            Runner.run(sales_agent2, message),
-            Runner.run(sales_agent3, message),
-        )
-        outputs = [result.final_output for result in results]
+        # Race the agents; the slowest is cancelled once enough drafts are good enough
+        outcome = await race_drafts(message)
+        outputs = outcome.outputs()
+        if not outputs:
+            print(f"⚠️  No drafts finished within {DRAFT_DEADLINE:.0f}s")
+            return
         
-        # Format for selection
-        emails = "Cold sales emails:\n\n" + "\n\nEmail:\n\n".join(outputs)
+        # Select best email (locally ranked; close calls go to the picker agent)
+        best, escalated = await select_best_email(outputs)
         
-        # Select best email
-        best = await Runner.run(sales_picker, emails)
-        
-        print("Best Sales Email Selected:")
+        print(f"Best Sales Email Selected ({'picker agent' if escalated else 'local ranker'}):")
         print("-" * 60)
-        print(best.final_output)
+        print(best)
         print()
     
     print("ℹ️  Check the trace at: https://platform.openai.com/traces")
@@ -151,6 +231,8 @@ async def demo_ai_selection():
 
 async def main():
     """Run all demonstrations."""
+    from metrics import get_metrics
+
     print("\n")
     print("*" * 60)
     print("AI SALES AGENT WORKFLOW DEMONSTRATIONS")
@@ -166,6 +248,12 @@ async def main():
     # Demo 3: AI Selection
     await demo_ai_selection()
     
+    metrics = get_metrics()
+    if metrics is not None:
+        print("Local metrics:")
+        metrics.print_summary()
+        print()
+    
     print("*" * 60)
     print("All demonstrations completed!")
     print("*" * 60)
@@ -0,0 +1,257 @@
+"""
+Agent Benchmark Suite
+
+Measures the latency and throughput of parallel agent runs with enough rigour
+to tell real improvements apart from noise:
+- Warmup runs that are excluded from the results
+- Repeated trials timed with `time.perf_counter`
+- p50/p95/p99 of both whole-step wall time and individual call latency
+- Sweeps over agent count and concurrency level
+- Machine-readable JSON output that can be compared across commits
+- Hedging (see hedging.py) is off unless --hedge is given, so results measure
+  plain runs; the JSON records whether it was on
+
+Run it against recorded responses (see model_replay.py) to benchmark our own
+orchestration overhead without API jitter:
+
+Usage:
+    MODEL_MODE=record python benchmark.py --agents 3 --concurrency 1,3 --trials 1 --warmup 0
+    MODEL_MODE=replay python benchmark.py --agents 3,6 --concurrency 1,3,6 --output bench.json
+    MODEL_MODE=replay python benchmark.py --output new.json --compare bench.json
+    MODEL_MODE=replay HEDGE_PERCENTILE=95 python benchmark.py --hedge --output hedged.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+from typing import Any, Dict, List, Optional, Sequence
+from dotenv import load_dotenv
+from agents import Agent
+
+from agent_runtime import run_agent
+from hedging import get_hedging_policy
+
+
+load_dotenv(override=True)
+
+
+DEFAULT_TASK = "Write a one-sentence product description for AI software."
+
+AGENT_STYLES = [
+    "You write in a formal, professional tone. Keep responses clear and structured.",
+    "You write in a creative, engaging tone with metaphors and storytelling.",
+    "You write in a technical, precise tone with specific details and terminology.",
+]
+
+
+# ============================================================================
+# STATISTICS
+# ============================================================================
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Linearly interpolated percentile (q in 0..100) of pre-sorted values."""
+    if not sorted_values:
+        return float("nan")
+    rank = (len(sorted_values) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    if low == high:
+        return sorted_values[low]
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    """Summary statistics (seconds) for a list of timings."""
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean": statistics.fmean(ordered) if ordered else float("nan"),
+        "stdev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "min": ordered[0] if ordered else float("nan"),
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1] if ordered else float("nan"),
+    }
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def build_agents(count: int, model: str = "gpt-4o-mini") -> List[Agent]:
+    """Build `count` agents cycling through the writing styles."""
+    return [
+        Agent(
+            name=f"Benchmark Writer {i + 1}",
+            instructions=AGENT_STYLES[i % len(AGENT_STYLES)],
+            model=model,
+        )
+        for i in range(count)
+    ]
+
+
+async def run_step(agents: List[Agent], task: str, concurrency: int, latencies: List[float],
+                   hedge: bool = False) -> float:
+    """Run every agent once with at most `concurrency` in flight; return wall time."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(agent: Agent) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await run_agent(agent, task, hedge=hedge)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[timed(agent) for agent in agents])
+    return time.perf_counter() - start
+
+
+async def run_benchmark(
+    agent_counts: Sequence[int] = (3,),
+    concurrency_levels: Sequence[int] = (1, 3),
+    trials: int = 10,
+    warmup: int = 2,
+    task: str = DEFAULT_TASK,
+    model: str = "gpt-4o-mini",
+    hedge: bool = False,
+) -> Dict[str, Any]:
+    """
+    Sweep agent count × concurrency and collect timing statistics.
+
+    `hedge` lets runs be hedged when HEDGE_PERCENTILE configures a policy.
+
+    Returns:
+        Dictionary with run metadata and one result entry per configuration
+    """
+    results = []
+    for agent_count in agent_counts:
+        agents = build_agents(agent_count, model)
+        for concurrency in concurrency_levels:
+            print(f"⏱️  agents={agent_count} concurrency={concurrency} "
+                  f"(warmup {warmup}, trials {trials})")
+            for _ in range(warmup):
+                await run_step(agents, task, concurrency, [], hedge)
+
+            wall_times: List[float] = []
+            latencies: List[float] = []
+            for _ in range(trials):
+                wall_times.append(await run_step(agents, task, concurrency, latencies, hedge))
+
+            wall = summarize(wall_times)
+            results.append({
+                "agents": agent_count,
+                "concurrency": concurrency,
+                "wall": wall,
+                "call_latency": summarize(latencies),
+                "calls_per_second": agent_count / wall["mean"] if wall["mean"] > 0 else 0.0,
+            })
+
+    return {"meta": _metadata(trials, warmup, task, model, hedge), "results": results}
+
+
+def _metadata(trials: int, warmup: int, task: str, model: str, hedge: bool) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    policy = get_hedging_policy() if hedge else None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "model_mode": os.environ.get('MODEL_MODE', 'live'),
+        "model": model,
+        "trials": trials,
+        "warmup": warmup,
+        "task": task,
+        # Whether runs could be hedged, and the percentile they were hedged after
+        "hedge": policy is not None,
+        "hedge_percentile": policy.percentile if policy else None,
+    }
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    """Print a results table, with p50 change versus a baseline report if given."""
+    previous = {}
+    if baseline:
+        previous = {(r["agents"], r["concurrency"]): r for r in baseline["results"]}
+    sequential = {r["agents"]: r["wall"]["p50"] for r in report["results"] if r["concurrency"] == 1}
+
+    print(f"\n{'='*78}")
+    print(f"{'agents':>6} {'conc':>5} {'wall p50':>9} {'p95':>8} {'p99':>8} "
+          f"{'call p50':>9} {'calls/s':>8} {'speedup':>8} {'vs base':>8}")
+    print(f"{'='*78}")
+    for r in report["results"]:
+        wall, call = r["wall"], r["call_latency"]
+        base_seq = sequential.get(r["agents"])
+        speedup = f"{base_seq / wall['p50']:.2f}x" if base_seq and wall["p50"] > 0 else "-"
+        change = "-"
+        old = previous.get((r["agents"], r["concurrency"]))
+        if old and old["wall"]["p50"] > 0:
+            change = f"{(wall['p50'] / old['wall']['p50'] - 1) * 100:+.1f}%"
+        print(f"{r['agents']:>6} {r['concurrency']:>5} {wall['p50']:>8.3f}s {wall['p95']:>7.3f}s "
+              f"{wall['p99']:>7.3f}s {call['p50']:>8.3f}s {r['calls_per_second']:>8.2f} "
+              f"{speedup:>8} {change:>8}")
+    print()
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+async def main():
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark parallel agent execution")
+    parser.add_argument("--agents", type=_int_list, default=[3],
+                        help="Comma-separated agent counts to sweep (default: 3)")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 3],
+                        help="Comma-separated concurrency levels to sweep (default: 1,3)")
+    parser.add_argument("--trials", type=int, default=10, help="Measured trials per configuration")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured warmup runs per configuration")
+    parser.add_argument("--task", default=DEFAULT_TASK, help="Prompt sent to every agent")
+    parser.add_argument("--model", default="gpt-4o-mini", help="Model for the benchmark agents")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Hedge slow runs (needs HEDGE_PERCENTILE); off by default so runs are measured as is")
+    args = parser.parse_args()
+    if args.hedge and get_hedging_policy() is None:
+        print("⚠️  --hedge has no effect without HEDGE_PERCENTILE")
+
+    report = await run_benchmark(args.agents, args.concurrency, args.trials, args.warmup,
+                                 args.task, args.model, args.hedge)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("hedge", False) != report["meta"]["hedge"]:
+            print("⚠️  Hedging differs between this run and the baseline; latencies aren't comparable")
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Results written to {args.output}")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,871 @@
+"""
+Bulk Prospect Campaign Runner
+
+This script runs the full automated SDR workflow (Sales Manager → Email Manager)
+for every prospect in a CSV or JSONL file.
+
+Features:
+- Prospects are streamed lazily, so memory stays flat for files of any size
+- A fixed pool of workers bounds how many prospects are in flight at once
+- Each prospect is passed as run context, so the email goes to its own address
+- Periodic throughput reports (prospects/min)
+- Optional durable outbox: sends are idempotent per prospect, and --resume
+  skips prospects already emailed and resends checkpointed failures without
+  new drafts (see outbox.py)
+- Prospects in the suppression index (unsubscribes, bounces, already
+  contacted) are dropped before any model call (see suppression.py)
+- Optional pipeline mode: drafting, selection, subject, HTML and sending run
+  as separate stages with their own worker counts, connected by bounded
+  queues, so a slow stage throttles the reader (see pipeline.py)
+- Optional template mode: one email template per campaign (or per segment,
+  e.g. industry) is generated and rendered locally for every prospect, so
+  model calls scale with templates instead of prospects (see email_templates.py);
+  segments can also be clusters of similar firmographics (see segmentation.py)
+- Optional adaptive style selection: a bandit over reply/open outcomes
+  decides which sales_agent styles to draft per prospect, so most prospects
+  cost one draft instead of three and a selection (see style_bandit.py)
+- Optional multi-process mode: prospects are sharded by email hash across
+  worker processes, each with its own event loop and concurrency limit;
+  a failed shard can be re-run on its own
+
+Usage:
+    python campaign.py prospects.csv --concurrency 20
+    python campaign.py prospects.jsonl --concurrency 50 --limit 1000
+    python campaign.py prospects.csv --outbox .cache/outbox.sqlite3 --resume
+    python campaign.py prospects.csv --workers 8 --concurrency 20
+    python campaign.py prospects.csv --pipeline --stage-workers generate=30,html=4,send=8
+    python campaign.py prospects.csv --templates --segment-by industry --concurrency 100
+    python campaign.py prospects.csv --templates --segment-by cluster --cluster-radius 0.3
+    python campaign.py prospects.csv --pipeline --style-bandit .cache/styles.sqlite3
+    python campaign.py prospects.csv --shards 8 --only-shards 3,5
+"""
+
+import os
+import csv
+import json
+import time
+import asyncio
+import argparse
+import functools
+import contextvars
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from automated_sdr import DRAFT_AGENTS, EmailJob, generate_template, run_sales_manager, sdr_pipeline
+from draft_cache import DraftCache, get_draft_cache, set_draft_cache
+from email_templates import MERGE_FIELDS, TemplateLibrary, set_template_library
+from email_transport import (
+    BatchingTransport, EmailMessage, EmailTransport, SendGridTransport, SendResult,
+    get_transport, set_transport, close_transport,
+)
+from hedging import get_hedging_policy
+from outbox import Outbox, OutboxTransport, idempotency_key
+from rate_limit import get_scheduler, set_scheduler
+from style_bandit import StyleBandit, get_style_bandit, set_style_bandit
+from suppression import SuppressionIndex, email_hash, get_suppression_index, set_suppression_index
+
+# The Agents SDK and the modules built on it are imported where they are first
+# needed, so argument errors and --help return without paying for the SDK import
+if TYPE_CHECKING:
+    from metrics import Metrics
+    from segmentation import ProspectSegmenter
+
+
+# Load environment variables
+load_dotenv(override=True)
+
+
+# ============================================================================
+# PROSPECTS
+# ============================================================================
+
+@dataclass
+class Prospect:
+    """A single campaign recipient."""
+    email: str
+    name: str = ""
+    company: str = ""
+    role: str = ""
+    industry: str = ""
+    extra: Dict[str, str] = field(default_factory=dict)
+    segment: str = ""  # Cluster assigned by segmentation.ProspectSegmenter
+
+    @classmethod
+    def from_row(cls, row: Dict[str, str]) -> "Prospect":
+        """Build a prospect from a CSV/JSONL row, keeping unknown columns in `extra`."""
+        row = {str(key).strip().lower(): ("" if value is None else str(value).strip())
+               for key, value in row.items()}
+        return cls(
+            email=row.pop("email", ""),
+            name=row.pop("name", ""),
+            company=row.pop("company", ""),
+            role=row.pop("role", ""),
+            industry=row.pop("industry", ""),
+            extra=row,
+        )
+
+
+def iter_prospects(path: str) -> Iterator[Prospect]:
+    """Lazily yield prospects from a .csv or .jsonl file, skipping rows without an email."""
+    extension = os.path.splitext(path)[1].lower()
+
+    with open(path, newline="", encoding="utf-8") as f:
+        if extension == ".csv":
+            rows = csv.DictReader(f)
+        elif extension in (".jsonl", ".ndjson"):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            raise ValueError(f"Unsupported prospect file type: {extension}")
+
+        for row in rows:
+            prospect = Prospect.from_row(row)
+            if prospect.email:
+                yield prospect
+
+
+def shard_of(email: str, shards: int) -> int:
+    """Shard (0-based) a prospect belongs to; stable across runs and processes."""
+    return email_hash(email) % shards
+
+
+def build_message(prospect: Prospect) -> str:
+    """Build the Sales Manager request for a single prospect."""
+    greeting = f"Dear {prospect.name}" if prospect.name else "Dear CEO"
+    details = []
+    if prospect.role:
+        details.append(prospect.role)
+    if prospect.company:
+        details.append(f"at {prospect.company}")
+    if prospect.industry:
+        details.append(f"({prospect.industry} industry)")
+
+    message = f"Send out a cold sales email addressed to {greeting} from Alice"
+    if details:
+        message += f". The recipient is {' '.join(details)}."
+    return message
+
+
+# ============================================================================
+# CAMPAIGN EXECUTION
+# ============================================================================
+
+@dataclass
+class CampaignStats:
+    """Running counters for a campaign."""
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    suppressed: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    stages: Dict[str, Dict[str, float]] = field(default_factory=dict)  # Pipeline mode only
+    templates: Dict[str, float] = field(default_factory=dict)  # Template mode only
+    segments: Dict[str, float] = field(default_factory=dict)  # Clustered template mode only
+
+    @property
+    def completed(self) -> int:
+        return self.succeeded + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    @property
+    def prospects_per_minute(self) -> float:
+        elapsed = self.elapsed
+        return self.completed / elapsed * 60 if elapsed > 0 else 0.0
+
+    def report(self) -> str:
+        skipped = f", {self.skipped} already done" if self.skipped else ""
+        skipped += f", {self.suppressed} suppressed" if self.suppressed else ""
+        return (f"{self.completed} done ({self.succeeded} sent, {self.failed} failed{skipped}) "
+                f"in {self.elapsed:.1f}s — {self.prospects_per_minute:.1f} prospects/min")
+
+
+class SendTracker(EmailTransport):
+    """
+    Records the last send result of the prospect a worker is processing, so it
+    can tell whether the agents actually emailed that prospect.
+
+    The expected send lives in a context variable, which the agent runs and
+    their tool calls inherit from the worker, so two input rows with the same
+    email are tracked separately.
+    """
+
+    def __init__(self, inner: EmailTransport):
+        self.inner = inner
+        # [recipient, last result] of the prospect being processed in this context
+        self._expected: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("expected_send", default=None)
+
+    async def send(self, message: EmailMessage) -> SendResult:
+        result = await self.inner.send(message)
+        expected = self._expected.get()
+        if expected is not None and expected[0] == message.recipient.strip().lower():
+            expected[1] = result
+        return result
+
+    def expect(self, email: str) -> contextvars.Token:
+        """Start tracking sends to `email` from the current context; pass the token to `pop()`."""
+        return self._expected.set([email.strip().lower(), None])
+
+    def pop(self, token: contextvars.Token) -> Optional[SendResult]:
+        """The result of the last send since `expect()`, or None if nothing was sent."""
+        result = self._expected.get()[1]
+        self._expected.reset(token)
+        return result
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+async def process_prospect(prospect: Prospect, group_id: str, manager_mode: Optional[str] = None) -> None:
+    """Run the full SDR workflow for one prospect."""
+    from agents import trace
+
+    with trace("Automated SDR Campaign", group_id=group_id):
+        await run_sales_manager(build_message(prospect), context=prospect, mode=manager_mode)
+
+
+async def resume_prospect(prospect: Prospect, outbox: Outbox, stats: CampaignStats, campaign: str = "") -> bool:
+    """
+    Finish a prospect from the outbox instead of drafting again.
+
+    Returns:
+        True if the prospect needs no new drafts: it was already emailed, its
+        earlier send has an unknown outcome, or its checkpointed email was resent
+    """
+    key = idempotency_key(prospect.email, campaign)
+    status = outbox.status(key)
+    if status in ("sent", "sending"):
+        stats.skipped += 1
+        return True
+    message = outbox.message(key) if status == "failed" else None
+    if message is None:
+        return False
+
+    result = await get_transport().send(message)
+    if not result.ok:
+        raise RuntimeError(f"Resend failed with status {result.status_code}")
+    stats.succeeded += 1
+    return True
+
+
+async def _worker(queue: asyncio.Queue, stats: CampaignStats, group_id: str, tracker: SendTracker,
+                  manager_mode: Optional[str] = None, resume_from: Optional[Outbox] = None,
+                  mark_contacted: Optional[SuppressionIndex] = None, campaign: str = "") -> None:
+    """Consume prospects from the queue until the end-of-stream sentinel."""
+    while True:
+        prospect = await queue.get()
+        if prospect is None:
+            return
+        try:
+            if resume_from is not None and await resume_prospect(prospect, resume_from, stats, campaign):
+                continue
+            expected = tracker.expect(prospect.email)
+            try:
+                await process_prospect(prospect, group_id, manager_mode)
+            finally:
+                result = tracker.pop(expected)
+            # The manager run can finish without handing off, so only a send counts as sent
+            if result is None:
+                raise RuntimeError("the workflow finished without sending an email")
+            # Already emailed in this campaign by an earlier run (see --campaign)
+            if result.duplicate:
+                stats.skipped += 1
+                continue
+            # Email tools report backend errors to the agent instead of raising
+            if not result.ok:
+                raise RuntimeError(f"Send failed with status {result.status_code}: {result.body[:200]}")
+            stats.succeeded += 1
+            if mark_contacted is not None:
+                mark_contacted.add([prospect.email], sync=False)
+        except Exception as e:
+            stats.failed += 1
+            print(f"❌ {prospect.email}: {e}")
+
+
+async def _pipeline_jobs(prospects: Iterator[Prospect], stats: CampaignStats,
+                         resume_from: Optional[Outbox] = None, campaign: str = "") -> AsyncIterator[EmailJob]:
+    """Pipeline input: one job per prospect that still needs drafting."""
+    for prospect in prospects:
+        if resume_from is not None:
+            try:
+                if await resume_prospect(prospect, resume_from, stats, campaign):
+                    continue
+            except Exception as e:
+                stats.failed += 1
+                print(f"❌ {prospect.email}: {e}")
+                continue
+        yield EmailJob(build_message(prospect), prospect)
+
+
+def _select_prospects(path: str, stats: CampaignStats, limit: Optional[int], shard: int, shards: int,
+                      suppression: Optional[SuppressionIndex]) -> Iterator[Prospect]:
+    """Prospects of this shard within `limit`; suppressed ones are counted and dropped."""
+    for count, prospect in enumerate(iter_prospects(path)):
+        if limit is not None and count >= limit:
+            break
+        if shards > 1 and shard_of(prospect.email, shards) != shard:
+            continue
+        if suppression is not None and prospect.email in suppression:
+            stats.suppressed += 1
+            continue
+        yield prospect
+
+
+async def _reporter(stats: CampaignStats, interval: float, label: str = "", pipeline: Any = None) -> None:
+    """Print a throughput line every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        limits = get_scheduler().stats()
+        print(f"📈 {label}{stats.report()} | queued: {limits['model_requests']['queue_depth']} model, "
+              f"{limits['email_sends']['queue_depth']} email | 429s: {limits['rate_limited']}")
+        if pipeline is not None:
+            print("   " + pipeline.report().replace("\n", "\n   "))
+
+
+async def run_campaign(
+    path: str,
+    concurrency: int = 10,
+    limit: Optional[int] = None,
+    report_every: float = 30.0,
+    subject_window: float = 0.25,
+    manager_mode: Optional[str] = None,
+    resume_from: Optional[Outbox] = None,
+    mark_contacted: bool = False,
+    shard: int = 0,
+    shards: int = 1,
+    stage_workers: Optional[Dict[str, int]] = None,
+    segment_by: Optional[str] = None,
+    segmenter: Optional["ProspectSegmenter"] = None,
+    campaign: str = "",
+) -> CampaignStats:
+    """
+    Stream prospects from `path` through the SDR workflow.
+
+    Args:
+        path: CSV or JSONL prospect file
+        concurrency: Maximum number of prospects processed at the same time
+        limit: Stop after this many prospects (None for the whole file)
+        report_every: Seconds between throughput reports
+        subject_window: Seconds to collect subject requests into one batched
+            model call (0 writes each subject separately)
+        manager_mode: "agent", "fanout" or "template" (see
+            automated_sdr.run_sales_manager), or "pipeline" to stream
+            prospects through `automated_sdr.sdr_pipeline`
+        resume_from: Outbox of an interrupted run; its finished prospects are
+            skipped and its failed sends are retried from the checkpoint
+        mark_contacted: Add every finished prospect to the suppression index
+        shard: Only process prospects in this shard (see `shard_of`)
+        shards: Number of shards the file is split into; `limit` counts rows
+            of the whole file, so the shards of a limited run add up to it
+        stage_workers: Pipeline mode: workers per stage; stages not listed
+            get `concurrency` workers
+        segment_by: Template mode: prospect field with one template per
+            value (None for a single template for the whole campaign)
+        segmenter: Template mode: cluster the prospect stream and generate
+            one template per cluster instead (overrides `segment_by`)
+        campaign: Campaign id the outbox keys sends by; must match the id
+            the outbox transport was created with (see `configure_campaign`)
+
+    Returns:
+        Final campaign statistics
+    """
+    from agents import gen_trace_id
+    from subject_batch import SubjectBatcher, set_subject_batcher
+
+    stats = CampaignStats()
+    group_id = gen_trace_id()
+
+    subject_batcher = SubjectBatcher(max_latency=subject_window) if subject_window > 0 else None
+    set_subject_batcher(subject_batcher)
+
+    # Suppressed prospects are dropped here, before they take a worker slot
+    suppression = get_suppression_index()
+    contacted = suppression if mark_contacted else None
+    prospects = _select_prospects(path, stats, limit, shard, shards, suppression)
+
+    templates = None
+    if manager_mode == "template" and segmenter is not None:
+        # Clusters are assigned in mini-batches as the reader streams, before the workers see them
+        prospects = segmenter.stream(prospects)
+
+        async def generate(segment: str):
+            return await generate_template(segment, audience=segmenter.describe(segment))
+
+        templates = TemplateLibrary(generate, segmenter.segment_of)
+        set_template_library(templates)
+    elif manager_mode == "template":
+        templates = TemplateLibrary(functools.partial(generate_template, segment_by=segment_by), segment_by)
+        set_template_library(templates)
+
+    pipeline = None
+    if manager_mode == "pipeline":
+        def failed(job: EmailJob, stage: str, error: BaseException) -> None:
+            stats.failed += 1
+            print(f"❌ {job.context.email} ({stage}): {error}")
+
+        def sent(job: EmailJob) -> None:
+            if job.duplicate:
+                stats.skipped += 1
+                return
+            stats.succeeded += 1
+            if contacted is not None:
+                contacted.add([job.context.email], sync=False)
+
+        pipeline = sdr_pipeline(stage_workers, on_error=failed, on_sent=sent, group_id=group_id,
+                                default_workers=concurrency)
+
+    label = f"[shard {shard}/{shards}] " if shards > 1 else ""
+    tracker = SendTracker(get_transport())
+    set_transport(tracker)
+    reporter = asyncio.create_task(_reporter(stats, report_every, label, pipeline))
+    workers: List[asyncio.Task] = []
+
+    try:
+        if pipeline is not None:
+            await pipeline.run(_pipeline_jobs(prospects, stats, resume_from, campaign))
+            stats.stages = pipeline.stats()
+        else:
+            # A small bounded queue keeps the reader only slightly ahead of the workers
+            queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+            workers = [
+                asyncio.create_task(_worker(queue, stats, group_id, tracker, manager_mode, resume_from, contacted, campaign))
+                for _ in range(concurrency)
+            ]
+            for prospect in prospects:
+                await queue.put(prospect)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+    finally:
+        reporter.cancel()
+        for worker in workers:
+            worker.cancel()
+        if subject_batcher is not None:
+            await subject_batcher.aclose()
+        set_subject_batcher(None)
+        set_transport(tracker.inner)
+        if contacted is not None:
+            # Contacted prospects are appended unsynced; one fsync covers the whole run
+            contacted.sync()
+        if templates is not None:
+            stats.templates = templates.stats()
+            set_template_library(None)
+        if segmenter is not None:
+            stats.segments = segmenter.stats()
+
+    return stats
+
+
+# ============================================================================
+# SHARDED EXECUTION
+# ============================================================================
+
+# Budgets that are per process and must be split between shard processes
+RATE_LIMIT_VARIABLES = ("MODEL_RPM", "MODEL_TPM", "EMAIL_SENDS_PER_SECOND")
+
+
+def configure_campaign(args: argparse.Namespace) -> Optional[Outbox]:
+    """Install the transport, suppression index, style bandit, outbox and draft cache chosen on the command line."""
+    transport = get_transport()
+    if isinstance(transport, BatchingTransport):
+        # Batching configured from EMAIL_BATCH_WINDOW_MS; the flags below take over
+        transport = transport.inner
+    if args.batch_window_ms > 0 and isinstance(transport, SendGridTransport):
+        # Only SendGrid takes batched requests; other backends (e.g. console) send as configured
+        set_transport(BatchingTransport(
+            transport,
+            max_batch=args.batch_size,
+            max_latency=args.batch_window_ms / 1000,
+        ))
+    else:
+        set_transport(transport)
+
+    if args.suppression:
+        set_suppression_index(SuppressionIndex(args.suppression))
+
+    # Always set, so agent and template runs don't pick STYLE_BANDIT_DB up on their own
+    set_style_bandit(StyleBandit(args.style_bandit, DRAFT_AGENTS, args.explore_rate,
+                                 campaign=args.campaign) if args.style_bandit else None)
+
+    outbox = None
+    if args.outbox:
+        outbox = Outbox(args.outbox)
+        set_transport(OutboxTransport(get_transport(), outbox, args.campaign))
+        if get_draft_cache() is None:
+            # Checkpoint every paid draft next to the outbox so a restart can reuse it
+            set_draft_cache(DraftCache(os.path.join(os.path.dirname(args.outbox) or ".", "drafts")))
+    return outbox
+
+
+@dataclass
+class ShardResult:
+    """What a shard process sends back to the coordinator."""
+    shard: int
+    succeeded: int
+    failed: int
+    skipped: int
+    suppressed: int
+    elapsed: float
+    metrics: Optional["Metrics"] = None
+
+
+def _shard_budgets(processes: int) -> Dict[str, str]:
+    """Each process's share of the rate limits in RATE_LIMIT_VARIABLES, from the coordinator's environment."""
+    budgets = {}
+    for name in RATE_LIMIT_VARIABLES:
+        value = float(os.environ.get(name, 0) or 0)
+        if value:
+            budgets[name] = str(value / processes)
+    return budgets
+
+
+def _run_shard(args: argparse.Namespace, shard: int, shards: int, budgets: Dict[str, str]) -> ShardResult:
+    """Process entry point: run one shard of the campaign on its own event loop."""
+    # Each process has its own scheduler, so the fleet shares the configured budget. Set, not
+    # divided here: a pool process runs several shards and would divide again for each one
+    os.environ.update(budgets)
+    set_scheduler(None)
+    return asyncio.run(_shard_main(args, shard, shards))
+
+
+async def _shard_main(args: argparse.Namespace, shard: int, shards: int) -> ShardResult:
+    from agent_runtime import set_run_config
+    from metrics import Metrics, get_metrics, set_metrics
+
+    # Fresh metrics per shard: the coordinator merges each result, and a reused process
+    # would otherwise report earlier shards again. The run config holds the old metrics
+    # and scheduler, so it is rebuilt too
+    if get_metrics() is not None:
+        set_metrics(Metrics())
+    set_run_config(None)
+    outbox = configure_campaign(args)
+    try:
+        stats = await run_campaign(args.prospects, args.concurrency, args.limit, args.report_every,
+                                   subject_window=args.subject_window_ms / 1000,
+                                   manager_mode=_manager_mode(args),
+                                   resume_from=outbox if args.resume else None,
+                                   mark_contacted=args.mark_contacted,
+                                   shard=shard, shards=shards,
+                                   stage_workers=parse_stage_workers(args.stage_workers),
+                                   campaign=args.campaign,
+                                   **_segmentation(args))
+    finally:
+        await close_transport()
+        if outbox is not None:
+            outbox.close()
+    return ShardResult(shard, stats.succeeded, stats.failed, stats.skipped, stats.suppressed,
+                       stats.elapsed, get_metrics())
+
+
+async def run_sharded(args: argparse.Namespace, shards: int, selected: List[int],
+                      processes: int) -> Tuple[CampaignStats, List[int]]:
+    """
+    Run the selected shards in a pool of worker processes.
+
+    Each process runs `run_campaign` over its shard with the full `--concurrency`,
+    so total concurrency is processes × concurrency. Counters and metrics are
+    merged here as shards finish.
+
+    Returns:
+        Combined statistics and the shards that failed (to re-run with --only-shards)
+    """
+    from metrics import get_metrics
+
+    stats = CampaignStats()
+    metrics = get_metrics()
+    failed: List[int] = []
+    loop = asyncio.get_running_loop()
+    # Fresh interpreters: forking a process with a running event loop is unsafe
+    context = multiprocessing.get_context("spawn")
+
+    budgets = _shard_budgets(processes)
+
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        async def run_one(shard: int) -> None:
+            try:
+                result = await loop.run_in_executor(pool, _run_shard, args, shard, shards, budgets)
+            except Exception as e:
+                failed.append(shard)
+                print(f"❌ Shard {shard}/{shards} failed: {e}")
+                return
+            stats.succeeded += result.succeeded
+            stats.failed += result.failed
+            stats.skipped += result.skipped
+            stats.suppressed += result.suppressed
+            if metrics is not None and result.metrics is not None:
+                metrics.merge(result.metrics)
+            print(f"✅ Shard {shard}/{shards}: {result.succeeded} sent, {result.failed} failed "
+                  f"in {result.elapsed:.1f}s")
+
+        await asyncio.gather(*(run_one(shard) for shard in selected))
+
+    return stats, sorted(failed)
+
+
+def _manager_mode(args: argparse.Namespace) -> Optional[str]:
+    if args.pipeline:
+        return "pipeline"
+    if args.templates:
+        return "template"
+    return "fanout" if args.fanout else None
+
+
+def _segmentation(args: argparse.Namespace) -> Dict[str, Any]:
+    """run_campaign arguments for --segment-by: a field name, or a segmenter for "cluster"."""
+    if args.segment_by != "cluster":
+        return {"segment_by": args.segment_by}
+    from segmentation import ProspectSegmenter
+
+    return {"segmenter": ProspectSegmenter(radius=args.cluster_radius, max_clusters=args.max_clusters)}
+
+
+def parse_stage_workers(value: Optional[str]) -> Dict[str, int]:
+    """
+    Parse "generate=20,send=4" into workers per pipeline stage.
+
+    Raises:
+        ValueError: If a part isn't stage=count or a count is below 1
+    """
+    workers = {}
+    for part in (value or "").split(","):
+        if part.strip():
+            name, _, count = part.partition("=")
+            workers[name.strip()] = int(count)
+            if workers[name.strip()] < 1:
+                raise ValueError(f"Stage {name.strip()!r} needs at least one worker")
+    return workers
+
+
+def _outbox_summary(path: str) -> Dict[str, int]:
+    outbox = Outbox(path)
+    try:
+        return outbox.summary()
+    finally:
+        outbox.close()
+
+
+async def main():
+    """Run a campaign from the command line."""
+    parser = argparse.ArgumentParser(description="Run the automated SDR over a prospect file")
+    parser.add_argument("prospects", help="CSV or JSONL file with at least an 'email' column")
+    parser.add_argument("--concurrency", type=int, default=10,
+                        help="Number of prospects processed in parallel, per worker process (default: 10)")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="Only process the first N prospects")
+    parser.add_argument("--report-every", type=float, default=30.0,
+                        help="Seconds between throughput reports (default: 30)")
+    parser.add_argument("--fanout", action="store_true",
+                        help="Generate the three drafts concurrently in code, then pick in one model turn")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Run generate → select → subject → HTML → send as stages connected by bounded queues")
+    parser.add_argument("--stage-workers",
+                        help="Pipeline workers per stage, e.g. generate=30,html=4,send=8 (default: --concurrency each)")
+    parser.add_argument("--templates", action="store_true",
+                        help="Generate one email template and personalize it locally for every prospect")
+    parser.add_argument("--segment-by",
+                        choices=[name for name in MERGE_FIELDS if name not in ("first_name", "name")] + ["cluster"],
+                        help="With --templates, generate one template per value of this prospect field, "
+                             "or per cluster of similar industry and company size")
+    parser.add_argument("--cluster-radius", type=float, default=0.5,
+                        help="Cluster granularity: 0 = one per distinct profile, 0.5 = an industry's similar "
+                             "sizes, 2 = everyone together (default: 0.5)")
+    parser.add_argument("--max-clusters", type=int, default=100,
+                        help="Upper bound on clusters, and so on templates generated (default: 100)")
+    parser.add_argument("--style-bandit",
+                        help="With --fanout or --pipeline, let a bandit over reply/open outcomes choose which "
+                             "styles to draft (default: STYLE_BANDIT_DB in those modes)")
+    parser.add_argument("--explore-rate", type=float, default=float(os.environ.get('STYLE_EXPLORE_RATE', 0.1)),
+                        help="Share of prospects drafted in all styles when --style-bandit is on (default: 0.1)")
+    parser.add_argument("--subject-window-ms", type=float, default=250,
+                        help="Collect subject requests this long into one batched call; 0 disables (default: 250)")
+    parser.add_argument("--batch-window-ms", type=float,
+                        default=float(os.environ.get('EMAIL_BATCH_WINDOW_MS', 0) or 0),
+                        help="Coalesce SendGrid emails from the same template (--templates) or identical ones for up to "
+                             "this long before sending "
+                             "(default: EMAIL_BATCH_WINDOW_MS, else off)")
+    parser.add_argument("--batch-size", type=int, default=int(os.environ.get('EMAIL_BATCH_SIZE', 1000)),
+                        help="Maximum recipients per batched SendGrid request (default: EMAIL_BATCH_SIZE, else 1000)")
+    parser.add_argument("--campaign",
+                        help="Campaign id the outbox keys sends by, so a prospect gets one email per campaign "
+                             "(default: the prospect file's name)")
+    parser.add_argument("--outbox", default=os.environ.get('EMAIL_OUTBOX'),
+                        help="SQLite outbox making sends idempotent and resumable (default: EMAIL_OUTBOX)")
+    parser.add_argument("--resume", action="store_true",
+                        help="With --outbox, skip prospects already emailed and resend checkpointed failures")
+    parser.add_argument("--suppression", default=os.environ.get('SUPPRESSION_INDEX'),
+                        help="Suppression index directory checked before drafting (default: SUPPRESSION_INDEX)")
+    parser.add_argument("--mark-contacted", action="store_true",
+                        help="Add each finished prospect to the suppression index")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for a sharded run (default: 1 unless --shards is given)")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="Split prospects into this many shards by email hash (default: --workers)")
+    parser.add_argument("--only-shards",
+                        help="Comma-separated shard numbers to run, e.g. to re-run failed shards (needs --shards)")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="Serve Prometheus metrics on this port while the campaign runs (default: off)")
+    parser.add_argument("--metrics-out", help="Write final metrics to this file (.json for JSON, else Prometheus text)")
+    args = parser.parse_args()
+    args.campaign = args.campaign or os.path.splitext(os.path.basename(args.prospects))[0]
+
+    if os.environ.get('EMAIL_BACKEND', 'sendgrid') == 'sendgrid' and not os.environ.get('SENDGRID_API_KEY'):
+        print("❌ Error: SENDGRID_API_KEY not found in .env file")
+        return
+
+    if not os.environ.get('SENDER_EMAIL'):
+        print("❌ Error: SENDER_EMAIL not found in .env file")
+        return
+
+    if args.mark_contacted and not args.suppression:
+        print("❌ Error: --mark-contacted needs --suppression (or SUPPRESSION_INDEX)")
+        return
+
+    if args.resume and not args.outbox:
+        print("❌ Error: --resume needs --outbox (or EMAIL_OUTBOX)")
+        return
+
+    if args.stage_workers and not args.pipeline:
+        print("❌ Error: --stage-workers needs --pipeline")
+        return
+    if args.templates and (args.pipeline or args.fanout):
+        print("❌ Error: --templates can't be combined with --pipeline or --fanout")
+        return
+
+    if args.segment_by and not args.templates:
+        print("❌ Error: --segment-by needs --templates")
+        return
+
+    fanout = args.fanout or os.environ.get('SALES_MANAGER_MODE') == "fanout"
+    drafts_styles = (fanout or args.pipeline) and not args.templates
+    if args.style_bandit and not drafts_styles:
+        print("❌ Error: --style-bandit needs --fanout or --pipeline (the agent-mode manager drafts on its own)")
+        return
+    if args.style_bandit is None and drafts_styles:
+        # From the environment it's a default for the modes that can use it, not an error elsewhere
+        args.style_bandit = os.environ.get('STYLE_BANDIT_DB')
+
+    if args.cluster_radius < 0 or args.max_clusters < 1:
+        print("❌ Error: --cluster-radius must be >= 0 and --max-clusters >= 1")
+        return
+
+    try:
+        parse_stage_workers(args.stage_workers)
+    except ValueError:
+        print("❌ Error: --stage-workers takes stage=count pairs with counts >= 1, e.g. generate=30,send=8")
+        return
+
+    shards = args.shards or args.workers or 1
+    if args.only_shards and not args.shards:
+        print("❌ Error: --only-shards needs --shards, so shard numbers mean the same as in the original run")
+        return
+    selected = sorted({int(shard) for shard in args.only_shards.split(",")}) if args.only_shards else list(range(shards))
+    if any(not 0 <= shard < shards for shard in selected):
+        print(f"❌ Error: shard numbers must be between 0 and {shards - 1}")
+        return
+    sharded = shards > 1
+    processes = min(args.workers or os.cpu_count() or 1, len(selected))
+
+    print("=" * 60)
+    if sharded:
+        print(f"Campaign: {args.prospects} (shards {','.join(map(str, selected))} of {shards}, "
+              f"{processes} processes × concurrency {args.concurrency})")
+    else:
+        print(f"Campaign: {args.prospects} (concurrency {args.concurrency})")
+    print("=" * 60)
+
+    outbox = None
+    if sharded:
+        # Shard processes open their own transport, index and outbox connections
+        if args.resume:
+            print(f"📮 Resuming from {args.outbox}: {_outbox_summary(args.outbox)}")
+    else:
+        outbox = configure_campaign(args)
+        if args.resume:
+            print(f"📮 Resuming from {args.outbox}: {outbox.summary()}")
+
+    from metrics import get_metrics, serve_metrics
+
+    metrics = get_metrics()
+    server = None
+    if metrics is not None and args.metrics_port:
+        server = await serve_metrics(metrics, port=args.metrics_port)
+        print(f"📊 Metrics at http://127.0.0.1:{args.metrics_port}/metrics")
+
+    failed_shards: List[int] = []
+    try:
+        if sharded:
+            stats, failed_shards = await run_sharded(args, shards, selected, processes)
+        else:
+            stats = await run_campaign(args.prospects, args.concurrency, args.limit, args.report_every,
+                                       subject_window=args.subject_window_ms / 1000,
+                                       manager_mode=_manager_mode(args),
+                                       resume_from=outbox if args.resume else None,
+                                       mark_contacted=args.mark_contacted,
+                                       stage_workers=parse_stage_workers(args.stage_workers),
+                                       campaign=args.campaign,
+                                       **_segmentation(args))
+    finally:
+        await close_transport()
+        if server is not None:
+            server.close()
+        if outbox is not None:
+            outbox_summary = outbox.summary()
+            outbox.close()
+
+    print("=" * 60)
+    print(f"✅ Campaign finished: {stats.report()}")
+    for name, stage in stats.stages.items():
+        print(f"🧵 {name:<9} {stage['workers']:>3} workers, {stage['throughput'] * 60:.1f}/min, "
+              f"busy {stage['utilization']:.0%}, queue mean {stage['queue_mean_depth']:.1f} "
+              f"(max {stage['queue_max_depth']}/{stage['queue_capacity']}), "
+              f"upstream blocked {stage['backpressure_seconds']:.1f}s")
+    if stats.templates:
+        print(f"📝 Templates: {stats.templates['generated']} generated in "
+              f"{stats.templates['generate_seconds']:.1f}s, {stats.templates['rendered']} emails rendered "
+              f"({stats.templates['renders_per_template']:.0f} per template) in "
+              f"{stats.templates['render_seconds'] * 1000:.1f}ms")
+        if stats.templates['failed_segments']:
+            print(f"⚠️  Segments without a template: {stats.templates['failed_segments']} "
+                  f"(their prospects are counted as failed)")
+    if stats.segments:
+        print(f"🧩 Segments: {stats.segments['clusters']} clusters for {stats.segments['assigned']} prospects "
+              f"({stats.segments['members_per_cluster']:.1f} per cluster), {stats.segments['enriched']} "
+              f"enriched from the company store, clustered in {stats.segments['seconds'] * 1000:.1f}ms")
+    if failed_shards:
+        print(f"⚠️  Failed shards: re-run them with --shards {shards} "
+              f"--only-shards {','.join(map(str, failed_shards))}")
+    if outbox is not None:
+        print(f"📮 Outbox: {outbox_summary} ({outbox.writes} writes in {outbox.commits} commits)")
+    elif sharded and args.outbox:
+        print(f"📮 Outbox: {_outbox_summary(args.outbox)}")
+    cache = get_draft_cache()
+    if cache is not None and not sharded:
+        cache_stats = cache.stats()
+        print(f"🗄️  Draft cache: {cache_stats['memory_hits'] + cache_stats['disk_hits']} hits, "
+              f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)")
+    bandit = get_style_bandit()
+    if bandit is not None and not sharded:
+        bandit_stats = bandit.stats()
+        print(f"🎰 Styles: {bandit_stats['single']} prospects drafted in one style, {bandit_stats['explored']} "
+              f"in all ({bandit_stats['drafts_per_email']:.2f} drafts per email)")
+    policy = get_hedging_policy()
+    if policy is not None and not sharded:
+        hedge_stats = policy.stats()
+        print(f"🪁 Hedging: {hedge_stats['hedges']} of {hedge_stats['requests']} runs hedged "
+              f"({hedge_stats['hedge_rate']:.1%}), {hedge_stats['hedge_wins']} won by the hedge, "
+              f"{hedge_stats['wasted_seconds']:.1f}s spent on cancelled runs")
+    if metrics is not None:
+        metrics.print_summary()
+        if args.metrics_out:
+            metrics.write(args.metrics_out)
+            print(f"📄 Metrics written to {args.metrics_out}")
+    print("ℹ️  Check the trace at: https://platform.openai.com/traces")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,495 @@
+"""
+Company Store
+
+Indexed company lookups for the `get_company_info` tools. Records live in a
+SQLite file that is opened once per process, so lookups stay well under a
+millisecond with millions of companies.
+
+Matching, in order:
+- Exact match on the normalised name ("Acme Corp" → "acmecorp")
+- Prefix match on the normalised name ("Acme" → "Acme Corp"): the shortest
+  name with that prefix, for prefixes of at least MIN_PREFIX characters so
+  "A" doesn't match an arbitrary company
+- Full-text match on name tokens in any order ("corp acme" → "Acme Corp"),
+  via FTS5
+- Typo-tolerant match: the whole name, or one of its words or leading
+  characters, within a small edit distance ("Acem" → "Acme Corp",
+  "TechStrat" → "TechStart Inc")
+
+The first three are indexed lookups. Typo candidates come from a
+deletion-variant index (as in SymSpell): each word's first TYPO_PREFIX
+letters and every variant with one letter deleted, so any two words one
+edit apart share a variant. Candidates are ranked by shared variants,
+so the real match is scored however many names share its first letters;
+the typo fallback takes milliseconds to tens of milliseconds on 100k+
+companies (`python company_store.py check`). Repeated lookups are answered from an
+in-process LRU.
+
+Environment:
+    COMPANY_DB    SQLite file built with `python company_store.py import`
+                  (default: an in-memory store with the demo companies)
+
+Usage:
+    python company_store.py import .cache/companies.sqlite3 companies.csv
+    python company_store.py lookup .cache/companies.sqlite3 "acme"
+    python company_store.py check  # Lookups against a large generated store
+"""
+
+import os
+import re
+import csv
+import json
+import sqlite3
+import time
+import random
+import argparse
+import difflib
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+
+FIELDS = ("name", "industry", "size", "website")
+
+DEMO_COMPANIES = [
+    {"name": "Acme Corp", "industry": "Technology", "size": "500-1000 employees", "website": "acme.com"},
+    {"name": "TechStart Inc", "industry": "SaaS", "size": "50-100 employees", "website": "techstart.io"},
+]
+
+MIN_PREFIX = 3  # Shortest name fragment matched as a prefix
+TYPO_PREFIX = 6  # Letters of each word indexed for typo matching
+TYPO_CANDIDATES = 200  # Best-ranked typo candidates scored per lookup
+
+_NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize_name(name: str) -> str:
+    return _NON_ALPHANUMERIC.sub("", name.lower())
+
+
+def typo_distance(a: str, b: str, limit: Optional[int] = None) -> int:
+    """
+    Edits (insert, delete, substitute, swap adjacent letters) turning `a` into `b`.
+
+    With a `limit`, only cells within `limit` of the diagonal are computed and
+    limit + 1 is returned as soon as the distance must exceed it.
+    """
+    band = max(len(a), len(b)) if limit is None else limit
+    if abs(len(a) - len(b)) > band:
+        return band + 1
+    over = band + 1
+    previous, current = None, [j if j <= band else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i if i <= band else over] + [over] * len(b)
+        for j in range(max(1, i - band), min(len(b), i + band) + 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cost = min(cost, before[j - 2] + 1)
+            current[j] = min(cost, over)
+        # A swap reaches back two rows, so both must be over the limit
+        if min(current) > band and min(previous) > band:
+            return over
+    return current[-1]
+
+
+def _deletions(text: str) -> Set[str]:
+    return {text[:i] + text[i + 1:] for i in range(len(text))}
+
+
+def typo_variants(name: str, key: str) -> Set[str]:
+    """
+    Index entries of a company for typo matching: the first TYPO_PREFIX
+    letters of each word (and of the normalised name) and their one-deletion variants.
+    """
+    variants: Set[str] = set()
+    for word in set(_TOKEN.findall(name.lower())) | {key}:
+        if len(word) >= 4:
+            head = word[:TYPO_PREFIX]
+            variants.add(head)
+            variants |= _deletions(head)
+    return variants
+
+
+def query_variants(token: str) -> Set[str]:
+    """
+    Variants of a query word that meet `typo_variants` of any word within one
+    edit of it in the first TYPO_PREFIX letters: the head and its deletions
+    (substitutions, swaps, missing letters) and the deletions of one letter
+    more (an extra letter).
+    """
+    head = token[:TYPO_PREFIX]
+    return {head} | _deletions(head) | _deletions(token[:TYPO_PREFIX + 1])
+
+
+def allowed_typos(text: str) -> int:
+    """Edits tolerated in a name fragment: none below 4 characters, 1 up to 7, 2 from 8."""
+    return 0 if len(text) < 4 else 1 if len(text) < 8 else 2
+
+
+def _excess_typos(tokens: List[str], name: str, key: str) -> int:
+    """
+    How far a company is from matching every query token, each against the
+    company's words or its normalised name cut to the token's length.
+
+    Per token, the fewest edits minus those allowed. Returns the worst token's
+    excess when one doesn't match (> 0), else the sum (<= 0, lower is closer).
+    """
+    fragments = _TOKEN.findall(name.lower())
+    excesses = []
+    for token in tokens:
+        allowed = allowed_typos(token)
+        letters = set(token)
+        excess = len(token) + 1
+        for fragment in fragments + [key[:len(token)]]:
+            # Each edit changes the length by at most 1 and the letter set by at most 2,
+            # so most pairs are ruled out before the table is built
+            if abs(len(fragment) - len(token)) <= allowed and len(letters ^ set(fragment)) <= 2 * allowed:
+                excess = min(excess, typo_distance(token, fragment, allowed) - allowed)
+        excesses.append(excess)
+    worst = max(excesses)
+    return worst if worst > 0 else sum(excesses)
+
+
+class CompanyStore:
+    """SQLite-backed company records with exact, prefix, full-text and fuzzy lookups."""
+
+    def __init__(self, path: str = ":memory:", cache_size: int = 4096, min_similarity: float = 0.85):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.min_similarity = min_similarity
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS companies ("
+            "id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, name TEXT NOT NULL, "
+            "industry TEXT, size TEXT, website TEXT, extra TEXT)"
+        )
+        # Shortest-first prefix matches: one index seek per name length
+        self._db.execute("CREATE INDEX IF NOT EXISTS companies_length ON companies (length(key), key)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS typo_variants ("
+            "variant TEXT NOT NULL, company INTEGER NOT NULL, PRIMARY KEY (variant, company)) WITHOUT ROWID"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS typo_variants_company ON typo_variants (company)")
+        try:
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS companies_fts USING fts5("
+                "name, content='companies', content_rowid='id', prefix='2 3')"
+            )
+            self.full_text = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: exact, prefix and fuzzy matching still work
+            self.full_text = False
+        self._db.commit()
+        if (self._db.execute("SELECT 1 FROM companies LIMIT 1").fetchone()
+                and not self._db.execute("SELECT 1 FROM typo_variants LIMIT 1").fetchone()):
+            # A store built before the typo index existed
+            with self._db:
+                self._index_typos(self._db.execute("SELECT id, name, key FROM companies").fetchall())
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+
+    # ------------------------------------------------------------------------
+    # LOADING
+    # ------------------------------------------------------------------------
+
+    def import_rows(self, rows: Iterable[Dict[str, Any]], batch_size: int = 10000) -> int:
+        """Insert or replace companies (dicts with at least a `name`); returns the count."""
+        count = 0
+        batch = []
+        with self._db:
+            for row in rows:
+                row = {str(key).strip().lower(): value for key, value in row.items()}
+                name = str(row.pop("name", "") or "").strip()
+                key = normalize_name(name)
+                if not key:
+                    continue
+                extra = {k: v for k, v in row.items() if k not in FIELDS and v not in (None, "")}
+                batch.append((key, name, row.get("industry"), row.get("size"), row.get("website"),
+                              json.dumps(extra) if extra else None))
+                if len(batch) >= batch_size:
+                    count += self._insert(batch)
+                    batch = []
+            if batch:
+                count += self._insert(batch)
+            if self.full_text:
+                self._db.execute("INSERT INTO companies_fts(companies_fts) VALUES ('rebuild')")
+        self.lookup.cache_clear()
+        return count
+
+    def _insert(self, batch: List[tuple]) -> int:
+        self._db.executemany(
+            "INSERT INTO companies (key, name, industry, size, website, extra) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET name = excluded.name, industry = excluded.industry, "
+            "size = excluded.size, website = excluded.website, extra = excluded.extra",
+            batch,
+        )
+        keys = list({row[0] for row in batch})
+        companies = []
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            companies += self._db.execute(
+                f"SELECT id, name, key FROM companies WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+        self._index_typos(companies)
+        return len(batch)
+
+    def _index_typos(self, companies: List[tuple]) -> None:
+        """(Re)index the typo variants of (id, name, key) rows."""
+        self._db.executemany("DELETE FROM typo_variants WHERE company = ?", [(row[0],) for row in companies])
+        self._db.executemany(
+            "INSERT OR IGNORE INTO typo_variants (variant, company) VALUES (?, ?)",
+            [(variant, company) for company, name, key in companies for variant in typo_variants(name, key)],
+        )
+
+    def import_file(self, path: str) -> int:
+        """Import a CSV or JSONL file with a `name` column."""
+        return self.import_rows(_read_rows(path))
+
+    # ------------------------------------------------------------------------
+    # LOOKUPS
+    # ------------------------------------------------------------------------
+
+    def _lookup(self, name: str) -> Optional[Dict[str, str]]:
+        key = normalize_name(name)
+        if not key:
+            return None
+        row = (
+            self._db.execute(
+                "SELECT name, industry, size, website, extra FROM companies WHERE key = ?", (key,)
+            ).fetchone()
+            or self._prefix_match(key)
+            or self._token_match(name)
+            or self._fuzzy_match(name, key)
+        )
+        return _to_record(row) if row else None
+
+    def _prefix_match(self, key: str) -> Optional[tuple]:
+        """
+        Shortest name starting with `key` (alphabetically first among equals),
+        with one (length, key) index seek per candidate length.
+        """
+        if len(key) < MIN_PREFIX:
+            return None
+        longest = self._db.execute("SELECT MAX(length(key)) FROM companies").fetchone()[0] or 0
+        for length in range(len(key) + 1, longest + 1):
+            row = self._db.execute(
+                "SELECT name, industry, size, website, extra FROM companies "
+                "WHERE length(key) = ? AND key > ? AND key < ? ORDER BY key LIMIT 1",
+                (length, key, key + "\x7f"),
+            ).fetchone()
+            if row:
+                return row
+        return None
+
+    def _token_match(self, name: str) -> Optional[tuple]:
+        tokens = _TOKEN.findall(name.lower())
+        if not self.full_text or not tokens:
+            return None
+        # Only the last token is a prefix, as when a name is cut short, and only from
+        # MIN_PREFIX characters; prefix terms and rank ordering both scan large doclists
+        last = f'"{tokens[-1]}"*' if len(tokens[-1]) >= MIN_PREFIX else f'"{tokens[-1]}"'
+        query = " AND ".join([f'"{token}"' for token in tokens[:-1]] + [last])
+        return self._db.execute(
+            "SELECT c.name, c.industry, c.size, c.website, c.extra FROM companies_fts "
+            "JOIN companies c ON c.id = companies_fts.rowid WHERE companies_fts MATCH ? LIMIT 1",
+            (query,),
+        ).fetchone()
+
+    def _fuzzy_match(self, name: str, key: str) -> Optional[tuple]:
+        """
+        Closest company among the TYPO_CANDIDATES sharing the most typo
+        variants with the words of `name` (see `typo_variants`).
+
+        A candidate matches when its whole normalised name is similar to `key`
+        (difflib ratio of at least `min_similarity`), or when every token of
+        `name` is within `allowed_typos` edits of one of the candidate's name
+        tokens or of its normalised name cut to the token's length. Names
+        rarely written in full ("TechStrat" for "TechStart Inc") are found
+        by the last of these.
+        """
+        tokens = [token for token in _TOKEN.findall(name.lower()) if len(token) >= MIN_PREFIX]
+        variants = set()
+        for token in set(tokens) | {key}:
+            if len(token) >= 4:
+                variants |= query_variants(token)
+        if not tokens or not variants:
+            return None
+        variants = list(variants)
+        candidates = {
+            row[5]: row[:5]
+            for row in self._db.execute(
+                "SELECT c.name, c.industry, c.size, c.website, c.extra, c.key FROM ("
+                f"  SELECT company, COUNT(*) AS shared FROM typo_variants WHERE variant IN ({','.join('?' * len(variants))})"
+                "   GROUP BY company ORDER BY shared DESC LIMIT ?"
+                ") AS ranked JOIN companies c ON c.id = ranked.company",
+                variants + [TYPO_CANDIDATES],
+            )
+        }
+
+        best, best_score = None, None
+        for candidate_key, row in candidates.items():
+            matcher = difflib.SequenceMatcher(None, key, candidate_key)
+            # Cheap upper bounds first, as difflib.get_close_matches does
+            similarity = matcher.ratio() if matcher.quick_ratio() >= self.min_similarity else 0.0
+            typos = _excess_typos(tokens, row[0], candidate_key)
+            if similarity < self.min_similarity and typos > 0:
+                continue
+            # Fewest typos first, then the most similar whole name
+            score = (typos, -similarity)
+            if best_score is None or score < best_score:
+                best, best_score = row, score
+        return best
+
+    def lookup_many(self, names: List[str]) -> List[Optional[Dict[str, str]]]:
+        """Look up many names, resolving exact matches in batched queries."""
+        keys = [normalize_name(name) for name in names]
+        exact: Dict[str, tuple] = {}
+        unique = list({key for key in keys if key})
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            for row in self._db.execute(
+                f"SELECT key, name, industry, size, website, extra FROM companies "
+                f"WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ):
+                exact[row[0]] = row[1:]
+        return [_to_record(exact[key]) if key in exact else self.lookup(name)
+                for name, key in zip(names, keys)]
+
+    def stats(self) -> Dict[str, Any]:
+        info = self.lookup.cache_info()
+        return {"companies": len(self), "cache_hits": info.hits, "cache_misses": info.misses,
+                "cache_size": info.currsize, "full_text": self.full_text}
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def _to_record(row: tuple) -> Dict[str, str]:
+    name, industry, size, website, extra = row
+    record = {"name": name, "industry": industry or "", "size": size or "", "website": website or ""}
+    if extra:
+        record.update(json.loads(extra))
+    return record
+
+
+def _read_rows(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+# ============================================================================
+# SHARED STORE
+# ============================================================================
+
+_store: Optional[CompanyStore] = None
+
+
+def get_company_store() -> CompanyStore:
+    """The store in COMPANY_DB, or an in-memory store with the demo companies."""
+    global _store
+    if _store is None:
+        path = os.environ.get('COMPANY_DB')
+        if path:
+            _store = CompanyStore(path)
+        else:
+            _store = CompanyStore()
+            _store.import_rows(DEMO_COMPANIES)
+    return _store
+
+
+def set_company_store(store: Optional[CompanyStore]) -> None:
+    global _store
+    _store = store
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+# (query, expected company name or None) for `check`
+CHECKS = [
+    ("Acme", "Acme Corp"),
+    ("acme corp", "Acme Corp"),
+    ("Acem", "Acme Corp"),
+    ("Acme Crop", "Acme Corp"),
+    ("corp acme", "Acme Corp"),
+    ("TechStrat", "TechStart Inc"),
+    ("techstrt inc", "TechStart Inc"),
+    ("A", None),
+    ("Ac", None),
+]
+
+
+def check(rows: int) -> bool:
+    """
+    Run CHECKS against the demo companies buried among `rows` generated ones,
+    most sharing their first letters with the demo names (the case where an
+    unranked candidate scan misses the real match).
+    """
+    rng = random.Random(0)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    generated = []
+    while len(generated) < rows:
+        name = (f"{rng.choice(['Ac', 'Acm', 'Te', 'Tech', rng.choice(letters).upper()])}"
+                f"{''.join(rng.choices(letters, k=rng.randint(2, 8)))} "
+                f"{rng.choice(['Corp', 'Inc', 'Labs', 'Group', 'Systems'])} {len(generated)}")
+        # Distractors only: no word a CHECKS query should legitimately match
+        if not re.search(r"\b(acme|acem|techst)", name.lower()):
+            generated.append({"name": name})
+    store = CompanyStore()
+    started = time.perf_counter()
+    store.import_rows(generated + DEMO_COMPANIES)
+    print(f"📦 Loaded {len(store):,} companies in {time.perf_counter() - started:.1f}s")
+    ok = True
+    for query, expected in CHECKS:
+        started = time.perf_counter()
+        record = store.lookup(query)
+        elapsed = (time.perf_counter() - started) * 1000
+        found = record["name"] if record else None
+        ok &= found == expected
+        print(f"{'✅' if found == expected else '❌'} {query!r} → {found} (expected {expected}, {elapsed:.1f}ms)")
+    store.close()
+    return ok
+
+
+def main():
+    """Import companies into a store, look names up in one, or check lookups on a large store."""
+    parser = argparse.ArgumentParser(description="Manage the company store")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load = commands.add_parser("import", help="Import CSV/JSONL files with a 'name' column")
+    load.add_argument("db")
+    load.add_argument("files", nargs="+")
+
+    lookup = commands.add_parser("lookup", help="Look up company names")
+    lookup.add_argument("db")
+    lookup.add_argument("names", nargs="+")
+
+    verify = commands.add_parser("check", help="Check lookups against a large generated store")
+    verify.add_argument("--rows", type=int, default=50000, help="Generated companies (default: 50000)")
+
+    args = parser.parse_args()
+    if args.command == "check":
+        raise SystemExit(0 if check(args.rows) else 1)
+    store = CompanyStore(args.db)
+    if args.command == "import":
+        count = sum(store.import_file(path) for path in args.files)
+        print(f"✅ Imported {count:,} companies into {args.db} ({len(store):,} total)")
+    else:
+        for name, record in zip(args.names, store.lookup_many(args.names)):
+            print(f"{name}: {json.dumps(record) if record else 'not found'}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
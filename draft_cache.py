@@ -0,0 +1,209 @@
+"""
+Content-Addressed Draft Cache
+
+Caches agent outputs keyed on everything that determines them: the agent's
+instructions, model, tools and the input. Identical reruns (A/B tests, campaign
+restarts) return the stored draft instead of calling the model again.
+
+Tiers:
+- Memory: LRU of recent drafts, bounded by entry count
+- Disk: SQLite file shared across runs, bounded by total size
+
+Both tiers honour a TTL. Hit/miss counters are available through `stats()`.
+
+Environment:
+    DRAFT_CACHE_DIR         Enable the cache, storing the disk tier in this directory
+    DRAFT_CACHE_TTL         Seconds a draft stays valid (default: 7 days)
+    DRAFT_CACHE_MAX_ENTRIES Memory tier size (default: 1024)
+    DRAFT_CACHE_MAX_MB      Disk tier size (default: 256)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+# ============================================================================
+# CACHE KEYS
+# ============================================================================
+
+def _describe_tools(agent: Any) -> list:
+    """Stable description of an agent's tools and handoffs."""
+    tools = []
+    for tool in getattr(agent, "tools", None) or []:
+        tools.append({
+            "name": getattr(tool, "name", type(tool).__name__),
+            "description": getattr(tool, "description", ""),
+            "parameters": getattr(tool, "params_json_schema", None),
+        })
+    handoffs = [getattr(handoff, "name", str(handoff)) for handoff in getattr(agent, "handoffs", None) or []]
+    return [tools, handoffs]
+
+
+def draft_key(agent: Any, input: Any) -> str:
+    """SHA-256 over the agent configuration and input that produce a draft."""
+    material = {
+        "instructions": agent.instructions if isinstance(agent.instructions, str) else repr(agent.instructions),
+        "model": str(agent.model),
+        "model_settings": repr(getattr(agent, "model_settings", None)),
+        "output_type": repr(getattr(agent, "output_type", None)),
+        "tools": _describe_tools(agent),
+        "input": input,
+    }
+    encoded = json.dumps(material, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+class DraftCache:
+    """Two-tier (memory LRU + SQLite) cache of agent text outputs."""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = 1024,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(directory, "drafts.sqlite3"), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS drafts ("
+                "key TEXT PRIMARY KEY, output TEXT NOT NULL, created REAL NOT NULL, "
+                "accessed REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS drafts_accessed ON drafts (accessed)")
+            self._db.execute("DELETE FROM drafts WHERE created < ?", (time.time() - self.ttl,))
+            self._db.commit()
+            self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM drafts").fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached draft, or None on a miss or expired entry."""
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            output, created = entry
+            if now - created <= self.ttl:
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return output
+            del self._memory[key]
+
+        if self._db is not None:
+            row = self._db.execute("SELECT output, created FROM drafts WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] <= self.ttl:
+                self._db.execute("UPDATE drafts SET accessed = ? WHERE key = ?", (now, key))
+                self._db.commit()
+                self._remember(key, row[0], row[1])
+                self._counters["disk_hits"] += 1
+                return row[0]
+
+        self._counters["misses"] += 1
+        return None
+
+    def put(self, key: str, output: str) -> None:
+        """Store a draft in both tiers."""
+        now = time.time()
+        self._remember(key, output, now)
+
+        if self._db is not None:
+            size = len(output.encode("utf-8"))
+            previous = self._db.execute("SELECT size FROM drafts WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO drafts (key, output, created, accessed, size) VALUES (?, ?, ?, ?, ?)",
+                (key, output, now, now, size),
+            )
+            self._disk_bytes += size - (previous[0] if previous else 0)
+            self._evict_disk()
+            self._db.commit()
+
+    def _remember(self, key: str, output: str, created: float) -> None:
+        self._memory[key] = (output, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _evict_disk(self) -> None:
+        """Drop least recently used drafts until the disk tier fits its budget."""
+        while self._disk_bytes > self.max_disk_bytes:
+            rows = self._db.execute(
+                "SELECT key, size FROM drafts ORDER BY accessed LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._disk_bytes = 0
+                return
+            for key, size in rows:
+                self._db.execute("DELETE FROM drafts WHERE key = ?", (key,))
+                self._disk_bytes -= size
+                self._counters["evictions"] += 1
+                if self._disk_bytes <= self.max_disk_bytes:
+                    return
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and tier sizes."""
+        lookups = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["misses"]
+        hits = lookups - self._counters["misses"]
+        return {
+            **self._counters,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+        }
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+# ============================================================================
+# SHARED CACHE
+# ============================================================================
+
+_cache: Optional[DraftCache] = None
+_configured = False
+
+
+def get_draft_cache() -> Optional[DraftCache]:
+    """Return the process-wide cache, or None when caching is not enabled."""
+    global _cache, _configured
+    if not _configured:
+        _configured = True
+        directory = os.environ.get('DRAFT_CACHE_DIR')
+        if directory:
+            _cache = DraftCache(
+                directory,
+                ttl=float(os.environ.get('DRAFT_CACHE_TTL', DEFAULT_TTL)),
+                max_entries=int(os.environ.get('DRAFT_CACHE_MAX_ENTRIES', 1024)),
+                max_disk_bytes=int(float(os.environ.get('DRAFT_CACHE_MAX_MB', 256)) * 1024 * 1024),
+            )
+    return _cache
+
+
+def set_draft_cache(cache: Optional[DraftCache]) -> None:
+    """Install (or remove, with None) the process-wide cache."""
+    global _cache, _configured
+    _cache = cache
+    _configured = True
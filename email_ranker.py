@@ -0,0 +1,172 @@
+"""
+Local Email Ranker
+
+Scores candidate cold emails locally so a picker LLM call is only needed for
+close calls. Text features are extracted once per email and all scoring is
+vectorized with NumPy, so thousands of candidates can be ranked per second.
+
+Features (each normalised to 0..1):
+- length:          closeness to an ideal word count
+- readability:     Flesch reading ease
+- cta:             presence of a clear call to action
+- personalization: share of prospect details (name, company, ...) mentioned
+- similarity:      optional cosine similarity to reference emails using a
+                   local embedding model
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+
+
+FEATURES = ("length", "readability", "cta", "personalization", "similarity")
+
+DEFAULT_WEIGHTS = {
+    "length": 0.25,
+    "readability": 0.25,
+    "cta": 0.3,
+    "personalization": 0.2,
+    "similarity": 0.0,
+}
+
+_WORD = re.compile(r"[A-Za-z']+")
+_SENTENCE_END = re.compile(r"[.!?]+(?:\s|$)")
+_VOWEL_GROUP = re.compile(r"[aeiouy]+", re.IGNORECASE)
+_CTA = re.compile(
+    r"\b(reply|respond|call|chat|demo|meeting|schedule|book|calendar|minutes|"
+    r"let me know|interested|available|link)\b",
+    re.IGNORECASE,
+)
+
+Embedder = Callable[[List[str]], np.ndarray]
+
+
+@dataclass
+class Ranking:
+    """Candidates ordered best first."""
+    order: np.ndarray
+    scores: np.ndarray
+    features: np.ndarray
+
+    @property
+    def best(self) -> int:
+        return int(self.order[0])
+
+    @property
+    def margin(self) -> float:
+        """Score gap between the top two candidates (inf with a single candidate)."""
+        if len(self.order) < 2:
+            return float("inf")
+        return float(self.scores[self.order[0]] - self.scores[self.order[1]])
+
+
+class EmailRanker:
+    """Vectorized scorer for candidate emails."""
+
+    def __init__(
+        self,
+        weights: Optional[Dict[str, float]] = None,
+        ideal_words: int = 120,
+        embedder: Optional[Embedder] = None,
+        reference_emails: Sequence[str] = (),
+    ):
+        merged = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.weights = np.array([merged[name] for name in FEATURES], dtype=np.float64)
+        self.ideal_words = ideal_words
+        self.embedder = embedder
+        self._reference = None
+        if embedder is not None and reference_emails:
+            self._reference = _normalize_rows(embedder(list(reference_emails))).mean(axis=0)
+            if not self.weights[FEATURES.index("similarity")]:
+                self.weights[FEATURES.index("similarity")] = 0.2
+
+    def _raw_counts(self, texts: Sequence[str], terms: Sequence[Sequence[str]]) -> np.ndarray:
+        """Per-text counts: words, sentences, syllables, CTA hits, terms hit, terms total."""
+        counts = np.zeros((len(texts), 6), dtype=np.float64)
+        for i, text in enumerate(texts):
+            lowered = text.lower()
+            prospect_terms = [term for term in terms[i] if term] if terms else []
+            words = len(_WORD.findall(text))
+            counts[i] = (
+                words,
+                max(1, len(_SENTENCE_END.findall(text))),
+                # Vowel groups approximate syllables; every word has at least one
+                max(words, len(_VOWEL_GROUP.findall(text))),
+                len(_CTA.findall(text)),
+                sum(1 for term in prospect_terms if term.lower() in lowered),
+                len(prospect_terms),
+            )
+        return counts
+
+    def features(self, texts: Sequence[str], terms: Optional[Sequence[Sequence[str]]] = None) -> np.ndarray:
+        """Feature matrix of shape (len(texts), len(FEATURES))."""
+        counts = self._raw_counts(texts, terms or [])
+        words = np.maximum(counts[:, 0], 1)
+        sentences, syllables, cta, hits, total = counts[:, 1], counts[:, 2], counts[:, 3], counts[:, 4], counts[:, 5]
+
+        length = np.exp(-np.abs(np.log(words / self.ideal_words)))
+        flesch = 206.835 - 1.015 * (words / sentences) - 84.6 * (syllables / words)
+        readability = np.clip(flesch / 100, 0, 1)
+        has_cta = np.minimum(cta, 2) / 2
+        personalization = np.divide(hits, total, out=np.zeros_like(hits), where=total > 0)
+
+        similarity = np.zeros(len(texts))
+        if self._reference is not None:
+            embedded = _normalize_rows(self.embedder(list(texts)))
+            similarity = np.clip(embedded @ _normalize_rows(self._reference[None, :])[0], 0, 1)
+
+        return np.column_stack([length, readability, has_cta, personalization, similarity])
+
+    def score(self, texts: Sequence[str], terms: Optional[Sequence[Sequence[str]]] = None) -> np.ndarray:
+        """Weighted score per text."""
+        if not texts:
+            return np.zeros(0)
+        return self.features(texts, terms) @ self.weights
+
+    def rank(self, texts: Sequence[str], terms: Sequence[str] = ()) -> Ranking:
+        """Rank one prospect's candidates; `terms` are its personalization details."""
+        features = self.features(texts, [list(terms)] * len(texts))
+        scores = features @ self.weights
+        return Ranking(order=np.argsort(-scores, kind="stable"), scores=scores, features=features)
+
+    def accepts(self, text: str, min_score: float, terms: Sequence[str] = ()) -> bool:
+        """Whether a single email scores at least `min_score` (e.g. a racing acceptance check)."""
+        return bool(self.score([text], [list(terms)])[0] >= min_score)
+
+    def rank_groups(self, texts: Sequence[str], groups: Sequence[int],
+                    terms: Optional[Sequence[Sequence[str]]] = None) -> np.ndarray:
+        """
+        Pick the best candidate per group for many prospects in one pass.
+
+        Args:
+            texts: Candidates for all prospects, flattened
+            groups: Group (prospect) id per candidate, as integers 0..G-1
+            terms: Personalization details per candidate
+
+        Returns:
+            Index into `texts` of the best candidate for each group
+        """
+        scores = self.score(texts, terms)
+        groups = np.asarray(groups)
+        # Sort by group, then by descending score; the first row of each group wins
+        order = np.lexsort((-scores, groups))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = groups[order][1:] != groups[order][:-1]
+        return order[first]
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float64)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def load_sentence_embedder(model_name: str = "all-MiniLM-L6-v2") -> Embedder:
+    """Embedder backed by a small local sentence-transformers model (optional dependency)."""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError as e:
+        raise ImportError("Install sentence-transformers to use embedding similarity") from e
+    model = SentenceTransformer(model_name)
+    return lambda texts: model.encode(texts, convert_to_numpy=True)
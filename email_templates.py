@@ -0,0 +1,334 @@
+"""
+Email Templates: Generate Once, Personalize Many
+
+The sales agents write one email template per campaign or segment, with
+merge fields where the personal details go. A compiled local renderer then
+fills the template in for each prospect:
+- Merge fields look like {{first_name}} or {{company|your team}}; the text
+  after the bar is used when the prospect has no value for that field
+- Templates are parsed once into str.format patterns, so rendering a
+  prospect is a handful of attribute reads and one C-level format call
+- The HTML version is rendered once per template (see html_render.py) with
+  the fields kept as placeholders; per prospect, only the HTML-escaped
+  values are filled in
+- Each rendered email also carries the template with SendGrid substitution
+  tags and its own tag values, so the batching transport can send one
+  template to many recipients in a single request
+- `TemplateLibrary` generates each segment's template once, even when many
+  prospects of that segment ask for it at the same time
+
+Model calls per campaign drop from one set per prospect to one set per
+template, while every recipient still gets their own name and company.
+
+Usage:
+    template = compile_email_template("Hello {{company}}", "Hi {{first_name|there}}, ...")
+    email = template.render(prospect)  # .subject, .text, .html
+"""
+
+import re
+import html
+import time
+import asyncio
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from html_render import render_email_html
+
+
+MERGE_FIELDS = ("first_name", "name", "company", "role", "industry")
+
+# Used when a prospect has no value for a field and the template gives no fallback
+DEFAULT_FALLBACKS = {
+    "first_name": "there",
+    "name": "there",
+    "company": "your company",
+    "role": "your role",
+    "industry": "your industry",
+}
+
+TEMPLATE_GUIDE = """Write the email as a template that will be sent to many recipients. \
+Wherever a personal detail belongs, use these merge fields exactly as written: \
+{{first_name}}, {{company}}, {{role}}, {{industry}}. \
+You may give a fallback after a bar for recipients missing a detail, e.g. {{first_name|there}}. \
+Use at least one merge field, and no other placeholders or square brackets."""
+
+_FIELD = re.compile(r"\{\{\s*([A-Za-z_]+)\s*(?:\|([^{}]*))?\}\}")
+# Leftovers of placeholders the model invented: [Name], {company}, {{ }}
+_STRAY = re.compile(r"\{|\}|\[[A-Z][A-Za-z ]*\](?!\()")
+
+
+class TemplateError(ValueError):
+    """Raised when a template uses unknown merge fields or malformed placeholders."""
+
+
+class TemplateUnavailableError(RuntimeError):
+    """Raised for a segment whose template could not be generated within the library's attempts."""
+
+
+# ============================================================================
+# COMPILATION
+# ============================================================================
+
+@dataclass(frozen=True)
+class CompiledText:
+    """A template string compiled to a str.format pattern and its fields."""
+    source: str
+    pattern: str
+    fields: Tuple[Tuple[str, str], ...]  # (field, fallback) per positional slot
+
+    def values(self, values: Dict[str, str], escape: bool = False) -> List[str]:
+        """What goes in each slot for these merge field values."""
+        args = [values.get(name) or fallback for name, fallback in self.fields]
+        if escape:
+            args = [html.escape(arg) for arg in args]
+        return args
+
+    def render(self, values: Dict[str, str], escape: bool = False) -> str:
+        return self.pattern.format(*self.values(values, escape))
+
+    def tagged(self, prefix: str) -> Tuple[str, Tuple[str, ...]]:
+        """The template with slots replaced by substitution tags (%prefix0%, ...), and those tags."""
+        tags = tuple(f"%{prefix}{i}%" for i in range(len(self.fields)))
+        return self.pattern.format(*tags), tags
+
+
+def _parse(source: str) -> List[Any]:
+    """Split a template into literal strings and (field, fallback) tuples."""
+    parts: List[Any] = []
+    position = 0
+    for match in _FIELD.finditer(source):
+        name = match.group(1).lower()
+        if name not in MERGE_FIELDS:
+            raise TemplateError(f"Unknown merge field {{{{{match.group(1)}}}}}")
+        fallback = match.group(2)
+        parts.append(source[position:match.start()])
+        parts.append((name, DEFAULT_FALLBACKS[name] if fallback is None else fallback.strip()))
+        position = match.end()
+    parts.append(source[position:])
+
+    for literal in parts[::2]:
+        stray = _STRAY.search(literal)
+        if stray:
+            raise TemplateError(f"Template contains an unsupported placeholder: {stray.group(0)!r}")
+    return parts
+
+
+def _pattern(parts: List[Any]) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    literals = [part.replace("{", "{{").replace("}", "}}") for part in parts[::2]]
+    fields = tuple(parts[1::2])
+    pattern = "".join(literal + ("{}" if i < len(fields) else "") for i, literal in enumerate(literals))
+    return pattern, fields
+
+
+@lru_cache(maxsize=256)
+def compile_text(source: str) -> CompiledText:
+    """Compile a template string; raises TemplateError if it is malformed."""
+    pattern, fields = _pattern(_parse(source))
+    return CompiledText(source, pattern, fields)
+
+
+def _compile_html(body: str) -> CompiledText:
+    """
+    Render the body to HTML once, with each field swapped for an inert token
+    the markdown renderer leaves alone, then turn the tokens back into slots.
+    """
+    parts = _parse(body)
+    tokens = [f"MERGEFIELD{i}X" for i in range(len(parts) // 2)]
+    rendered = render_email_html("".join(
+        part if i % 2 == 0 else tokens[i // 2] for i, part in enumerate(parts)
+    ))
+    html_parts: List[Any] = []
+    for token, field in zip(tokens, parts[1::2]):
+        before, found, rendered = rendered.partition(token)
+        if not found:
+            raise TemplateError(f"Merge field {{{{{field[0]}}}}} did not survive HTML rendering")
+        html_parts.extend([before, field])
+    html_parts.append(rendered)
+    if any("MERGEFIELD" in literal for literal in html_parts[::2]):
+        raise TemplateError("A merge field was rendered more than once (e.g. inside a link)")
+    pattern, fields = _pattern(html_parts)
+    return CompiledText(body, pattern, fields)
+
+
+@dataclass(frozen=True)
+class RenderedEmail:
+    subject: str
+    text: str
+    html: str
+    template: Optional[Tuple[str, str]] = None  # (subject, html) with substitution tags
+    substitutions: Optional[Dict[str, str]] = None  # This recipient's value per tag
+
+
+@dataclass(frozen=True)
+class EmailTemplate:
+    """Subject and body templates, with the body also compiled to HTML."""
+    subject: CompiledText
+    body: CompiledText
+    html: CompiledText
+
+    @property
+    def personalized(self) -> bool:
+        return bool(self.subject.fields or self.body.fields)
+
+    @cached_property
+    def _tagged(self) -> Tuple[Tuple[str, str], Tuple[str, ...], Tuple[str, ...]]:
+        subject, subject_tags = self.subject.tagged("subject")
+        body, body_tags = self.html.tagged("body")
+        return (subject, body), subject_tags, body_tags
+
+    def render(self, prospect: Any) -> RenderedEmail:
+        """Fill in the merge fields from a prospect (any object with name/company/role/industry)."""
+        values = prospect_values(prospect)
+        subject = self.subject.values(values)
+        body = self.html.values(values, escape=True)
+        template, subject_tags, body_tags = self._tagged
+        return RenderedEmail(
+            subject=self.subject.pattern.format(*subject),
+            text=self.body.render(values),
+            html=self.html.pattern.format(*body),
+            template=template,
+            substitutions={**dict(zip(subject_tags, subject)), **dict(zip(body_tags, body))},
+        )
+
+
+def compile_email_template(subject: str, body: str) -> EmailTemplate:
+    """
+    Compile a subject and body into an EmailTemplate.
+
+    Raises:
+        TemplateError: If either uses unknown fields or stray placeholders
+        UnrenderableEmailError: If the body can't be rendered to HTML locally
+    """
+    return EmailTemplate(compile_text(subject.strip()), compile_text(body), _compile_html(body))
+
+
+def prospect_values(prospect: Any) -> Dict[str, str]:
+    """Merge field values for a prospect; missing details are empty strings."""
+    values = {name: (getattr(prospect, name, "") or "").strip() for name in MERGE_FIELDS if name != "first_name"}
+    values["first_name"] = values["name"].split(" ", 1)[0]
+    return values
+
+
+def is_valid_template(body: str) -> bool:
+    """True if `body` compiles and has at least one merge field."""
+    try:
+        return bool(compile_text(body).fields)
+    except TemplateError:
+        return False
+
+
+# ============================================================================
+# TEMPLATE LIBRARY
+# ============================================================================
+
+TemplateGenerator = Callable[[str], Awaitable[EmailTemplate]]
+
+
+class TemplateLibrary:
+    """
+    Templates by segment, each generated once.
+
+    Concurrent requests for a segment that is still being generated wait for
+    that generation instead of starting their own. A generation that raised
+    (e.g. a timeout) is retried by the next request, up to `max_attempts` per
+    segment. A TemplateError is not retried: the drafts it rejected come from
+    the draft cache, so another attempt would read the same ones. Once a
+    failure is kept it lasts for the rest of the run, and every later
+    prospect of the segment fails at once with TemplateUnavailableError
+    instead of paying for another generation.
+    """
+
+    def __init__(self, generate: TemplateGenerator,
+                 segment_by: Union[None, str, Callable[[Any], str]] = None, max_attempts: int = 2):
+        if isinstance(segment_by, str) and segment_by not in MERGE_FIELDS:
+            raise ValueError(f"Can only segment by a merge field: {', '.join(MERGE_FIELDS)}")
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.generate = generate
+        self.segment_by = segment_by
+        self.max_attempts = max_attempts
+        self._templates: Dict[str, EmailTemplate] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._attempts: Dict[str, int] = {}
+        self._failures: Dict[str, BaseException] = {}
+        self.generated = 0
+        self.rendered = 0
+        self.generate_seconds = 0.0
+        self.render_seconds = 0.0
+
+    def segment_of(self, prospect: Any) -> str:
+        """
+        Segment key of a prospect: the value of the `segment_by` field, what a
+        `segment_by` function returns (e.g. a cluster from segmentation.py),
+        or "" for one template overall.
+        """
+        if self.segment_by is None:
+            return ""
+        if callable(self.segment_by):
+            return self.segment_by(prospect)
+        return prospect_values(prospect)[self.segment_by].lower()
+
+    async def _generate(self, segment: str) -> EmailTemplate:
+        start = time.perf_counter()
+        self._attempts[segment] = self._attempts.get(segment, 0) + 1
+        try:
+            template = await self.generate(segment)
+        except Exception as e:
+            if isinstance(e, TemplateError) or self._attempts[segment] >= self.max_attempts:
+                self._failures[segment] = e
+            raise
+        finally:
+            self.generate_seconds += time.perf_counter() - start
+            self._pending.pop(segment, None)
+        self._templates[segment] = template
+        self.generated += 1
+        return template
+
+    async def get(self, segment: str = "") -> EmailTemplate:
+        template = self._templates.get(segment)
+        if template is not None:
+            return template
+        failure = self._failures.get(segment)
+        if failure is not None:
+            raise TemplateUnavailableError(
+                f"No template for segment {segment or '(all prospects)'!r} after "
+                f"{self._attempts[segment]} attempts: {failure}"
+            ) from failure
+        task = self._pending.get(segment)
+        if task is None:
+            task = self._pending[segment] = asyncio.ensure_future(self._generate(segment))
+        # Shielded so one cancelled prospect doesn't cancel the others' generation
+        return await asyncio.shield(task)
+
+    async def render(self, prospect: Any) -> RenderedEmail:
+        """The prospect's email from its segment's template."""
+        template = await self.get(self.segment_of(prospect))
+        start = time.perf_counter()
+        email = template.render(prospect)
+        self.render_seconds += time.perf_counter() - start
+        self.rendered += 1
+        return email
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "templates": len(self._templates),
+            "generated": self.generated,
+            "failed_segments": len(self._failures),
+            "rendered": self.rendered,
+            "generate_seconds": self.generate_seconds,
+            "render_seconds": self.render_seconds,
+            "renders_per_template": self.rendered / len(self._templates) if self._templates else 0.0,
+        }
+
+
+_library: Optional[TemplateLibrary] = None
+
+
+def get_template_library() -> Optional[TemplateLibrary]:
+    return _library
+
+
+def set_template_library(library: Optional[TemplateLibrary]) -> None:
+    global _library
+    _library = library
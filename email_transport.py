@@ -0,0 +1,347 @@
+"""
+Async Email Transport
+
+A single shared, non-blocking email transport used by the SDR tools and the
+SendGrid configuration test.
+
+Features:
+- Async HTTP calls, so sending never blocks the event loop running the agents
+- One pooled keep-alive HTTP client reused by every send
+- Pluggable backends: SendGrid (default) or console output for dry runs
+- SENDGRID_API_URL lets a local stand-in HTTP server receive the requests
+- Requests are paced by the shared rate-limit scheduler and retried on 429
+- Optional coalescing: emails from the same template (or identical emails)
+  to many recipients are sent as one request with one personalization per
+  recipient, carrying that recipient's substitution values
+- The email send budget is charged per recipient, not per request
+
+Environment:
+    EMAIL_BACKEND           "sendgrid" (default) or "console"
+    SENDGRID_API_KEY        API key for the SendGrid backend
+    SENDGRID_API_URL        Base URL of the SendGrid API (default: https://api.sendgrid.com)
+    EMAIL_BATCH_WINDOW_MS   Enable batching, holding messages up to this long (default: off)
+    EMAIL_BATCH_SIZE        Maximum recipients per batched request (default: 1000)
+
+Usage:
+    message = EmailMessage(sender, recipient, "Hi Ada", "...", template=("Hi %subject0%", "..."),
+                           substitutions={"%subject0%": "Ada"})
+    result = await get_transport().send(message)
+"""
+
+import os
+import re
+import abc
+import json
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+import httpx
+
+from rate_limit import get_scheduler
+
+
+DEFAULT_SENDGRID_API_URL = "https://api.sendgrid.com"
+
+# SendGrid accepts at most 1000 personalizations per mail/send request
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+
+
+# ============================================================================
+# MESSAGES AND RESULTS
+# ============================================================================
+
+@dataclass
+class EmailMessage:
+    """A single outgoing email."""
+    sender: str
+    recipient: str
+    subject: str
+    content: str
+    content_type: str = "text/plain"
+    # The (subject, content) this email was rendered from, with SendGrid
+    # substitution tags, and this recipient's value per tag; emails sharing a
+    # template can be batched into one request
+    template: Optional[Tuple[str, str]] = None
+    substitutions: Optional[Dict[str, str]] = None
+
+    def to_sendgrid(self) -> Dict[str, Any]:
+        """Build the SendGrid v3 mail/send request body."""
+        return {
+            "personalizations": [{"to": [{"email": self.recipient}]}],
+            "from": {"email": self.sender},
+            "subject": self.subject,
+            "content": [{"type": self.content_type, "value": self.content}],
+        }
+
+
+@dataclass
+class SendResult:
+    """Outcome of a send as reported by the backend."""
+    status_code: int
+    body: str = ""
+    retry_after: Optional[float] = None
+    duplicate: bool = False  # Not sent because the outbox already has this email (see outbox.py)
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status_code < 300
+
+    def as_tool_result(self) -> Dict[str, str]:
+        """Convert to the `{"status": ...}` dictionary returned by the email tools."""
+        if self.ok:
+            return {"status": "success"}
+        return {"status": "error", "code": str(self.status_code), "detail": self.body[:200]}
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class EmailTransport(abc.ABC):
+    """Base class for email backends."""
+
+    @abc.abstractmethod
+    async def send(self, message: EmailMessage) -> SendResult:
+        """Send one message and report the backend's answer."""
+
+    async def aclose(self) -> None:
+        """Release any pooled connections."""
+
+
+class SendGridTransport(EmailTransport):
+    """Sends through the SendGrid v3 API over a pooled, keep-alive HTTP client."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        api_url: Optional[str] = None,
+        max_connections: int = 20,
+        timeout: float = 30.0,
+    ):
+        self.api_key = api_key or os.environ.get('SENDGRID_API_KEY', '')
+        self.api_url = api_url or os.environ.get('SENDGRID_API_URL', DEFAULT_SENDGRID_API_URL)
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so the client binds to the event loop that actually sends
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60.0,
+                ),
+                timeout=self.timeout,
+            )
+        return self._client
+
+    async def post_mail(self, payload: Dict[str, Any]) -> SendResult:
+        """POST a raw mail/send request body, charging the email send budget once per recipient."""
+
+        async def post() -> SendResult:
+            response = await self.client.post("/v3/mail/send", json=payload)
+            retry_after = response.headers.get("retry-after")
+            return SendResult(
+                response.status_code,
+                response.text,
+                float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+
+        recipients = sum(len(personalization["to"]) for personalization in payload["personalizations"])
+        return await get_scheduler().call(post, {"email_sends": recipients})
+
+    async def send(self, message: EmailMessage) -> SendResult:
+        return await self.post_mail(message.to_sendgrid())
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class ConsoleTransport(EmailTransport):
+    """Prints emails instead of sending them (useful for dry runs)."""
+
+    async def send(self, message: EmailMessage) -> SendResult:
+        print(f"📧 [console] To: {message.recipient} | Subject: {message.subject}")
+        return SendResult(202)
+
+
+# ============================================================================
+# BATCHING
+# ============================================================================
+
+_PERSONALIZATION_FIELD = re.compile(r"^personalizations\.(\d+)")
+
+
+def _failed_personalizations(body: str) -> Set[int]:
+    """Indexes of personalizations blamed by a SendGrid error response."""
+    try:
+        errors = json.loads(body).get("errors", [])
+    except (ValueError, AttributeError):
+        return set()
+    indexes = set()
+    for error in errors:
+        match = _PERSONALIZATION_FIELD.match(str(error.get("field") or ""))
+        if match:
+            indexes.add(int(match.group(1)))
+    return indexes
+
+
+def _batch_key(message: EmailMessage) -> Tuple[Any, ...]:
+    """Messages with equal keys can share a request: same template, or same subject and body."""
+    return (message.sender, message.content_type, message.template is not None) + (
+        message.template or (message.subject, message.content)
+    )
+
+
+class BatchingTransport(EmailTransport):
+    """
+    Coalesces emails into batched SendGrid requests.
+
+    Messages rendered from the same template (or with the same subject and
+    body) are held for up to `max_latency` seconds and flushed as a single
+    request with one personalization per recipient, so recipients never see
+    each other. Templated messages send the template once and each
+    recipient's values as personalization `substitutions`. A group is
+    flushed early once it reaches `max_batch` recipients. Each caller still
+    receives its own SendResult.
+    """
+
+    def __init__(
+        self,
+        inner: Optional[SendGridTransport] = None,
+        max_batch: int = SENDGRID_MAX_PERSONALIZATIONS,
+        max_latency: float = 0.05,
+    ):
+        self.inner = inner or SendGridTransport()
+        self.max_batch = max(1, min(max_batch, SENDGRID_MAX_PERSONALIZATIONS))
+        self.max_latency = max_latency
+        self._pending: Dict[Tuple[Any, ...], List[Tuple[EmailMessage, asyncio.Future]]] = {}
+        self._timers: Dict[Tuple[Any, ...], asyncio.TimerHandle] = {}
+        self._inflight: Set[asyncio.Task] = set()
+
+    async def send(self, message: EmailMessage) -> SendResult:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = _batch_key(message)
+
+        group = self._pending.setdefault(key, [])
+        group.append((message, future))
+        if len(group) >= self.max_batch:
+            self._flush(key)
+        elif len(group) == 1:
+            self._timers[key] = loop.call_later(self.max_latency, self._flush, key)
+
+        return await future
+
+    def _flush(self, key: Tuple[Any, ...]) -> None:
+        """Detach a pending group and send it in the background."""
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        group = self._pending.pop(key, None)
+        if not group:
+            return
+        task = asyncio.create_task(self._send_batch(group))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _send_batch(self, group: List[Tuple[EmailMessage, asyncio.Future]]) -> None:
+        """Send one group, retrying once without recipients the API rejected."""
+        try:
+            for _ in range(2):
+                first = group[0][0]
+                payload = first.to_sendgrid()
+                if first.template is not None:
+                    payload["subject"], payload["content"][0]["value"] = first.template
+                payload["personalizations"] = [_personalization(message) for message, _ in group]
+                result = await self.inner.post_mail(payload)
+
+                rejected = set() if result.ok else _failed_personalizations(result.body)
+                if not rejected or len(rejected) >= len(group):
+                    break
+
+                # SendGrid rejects the whole request; fail the blamed recipients
+                # and resend to the others
+                for index in rejected:
+                    if index < len(group):
+                        _resolve(group[index][1], result)
+                group = [entry for index, entry in enumerate(group) if index not in rejected]
+
+            for _, future in group:
+                _resolve(future, result)
+        except Exception as e:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def aclose(self) -> None:
+        """Flush everything still queued, wait for in-flight batches, then close."""
+        for key in list(self._pending):
+            self._flush(key)
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        await self.inner.aclose()
+
+
+def _personalization(message: EmailMessage) -> Dict[str, Any]:
+    personalization: Dict[str, Any] = {"to": [{"email": message.recipient}]}
+    if message.template is not None and message.substitutions:
+        personalization["substitutions"] = message.substitutions
+    return personalization
+
+
+def _resolve(future: asyncio.Future, result: SendResult) -> None:
+    if not future.done():
+        future.set_result(result)
+
+
+# ============================================================================
+# SHARED TRANSPORT
+# ============================================================================
+
+TRANSPORTS = {
+    "sendgrid": SendGridTransport,
+    "console": ConsoleTransport,
+}
+
+_transport: Optional[EmailTransport] = None
+
+
+def get_transport() -> EmailTransport:
+    """Return the process-wide transport, creating it from EMAIL_BACKEND on first use."""
+    global _transport
+    if _transport is None:
+        backend = os.environ.get('EMAIL_BACKEND', 'sendgrid').lower()
+        if backend not in TRANSPORTS:
+            raise ValueError(f"Unknown EMAIL_BACKEND: {backend}")
+        _transport = TRANSPORTS[backend]()
+
+        window_ms = float(os.environ.get('EMAIL_BATCH_WINDOW_MS', 0) or 0)
+        if window_ms > 0 and isinstance(_transport, SendGridTransport):
+            _transport = BatchingTransport(
+                _transport,
+                max_batch=int(os.environ.get('EMAIL_BATCH_SIZE', SENDGRID_MAX_PERSONALIZATIONS)),
+                max_latency=window_ms / 1000,
+            )
+    return _transport
+
+
+def set_transport(transport: Optional[EmailTransport]) -> None:
+    """Replace the process-wide transport (e.g. with a test double)."""
+    global _transport
+    _transport = transport
+
+
+async def close_transport() -> None:
+    """Close the shared transport's connection pool."""
+    global _transport
+    if _transport is not None:
+        await _transport.aclose()
+        _transport = None
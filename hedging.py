@@ -0,0 +1,168 @@
+"""
+Hedged Requests
+
+Cuts tail latency on side-effect free agent runs. When a run is slower than
+a learned latency percentile for its agent, a duplicate run is started; the
+first to finish wins and the other is cancelled.
+
+- Latency percentiles are learned online per agent from recent runs, timed
+  from the primary's start (a hedge's own, shorter latency would drag the
+  percentile down and make hedging ever more eager)
+- Hedging only starts once an agent has enough samples
+- A hedge budget caps the share of runs that may be duplicated
+- Hedge rate, hedge wins and time spent on cancelled runs are recorded
+
+Environment:
+    HEDGE_PERCENTILE    Enable hedging after this latency percentile, e.g. 95 (default: off)
+    HEDGE_MIN_SAMPLES   Runs observed per agent before hedging (default: 20)
+    HEDGE_MAX_RATE      Maximum fraction of runs that may be hedged (default: 0.1)
+"""
+
+import os
+import time
+import asyncio
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies with a cached percentile."""
+
+    def __init__(self, percentile: float, window: int = 500, refresh_every: int = 20):
+        self.percentile = percentile
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.refresh_every = refresh_every
+        self._threshold: Optional[float] = None
+        self._since_refresh = 0
+
+    def observe(self, latency: float) -> None:
+        self.samples.append(latency)
+        self._since_refresh += 1
+        if self._threshold is None or self._since_refresh >= self.refresh_every:
+            ordered = sorted(self.samples)
+            self._threshold = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))]
+            self._since_refresh = 0
+
+    @property
+    def threshold(self) -> Optional[float]:
+        return self._threshold
+
+
+class HedgingPolicy:
+    """Launches a backup run when the primary exceeds the agent's latency percentile."""
+
+    def __init__(self, percentile: float = 95.0, min_samples: int = 20, max_hedge_rate: float = 0.1):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_hedge_rate = max_hedge_rate
+        self._trackers: Dict[str, LatencyTracker] = defaultdict(lambda: LatencyTracker(self.percentile))
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.wasted_seconds = 0.0
+
+    def threshold(self, key: str) -> Optional[float]:
+        """Delay before hedging a run of `key`, or None if it shouldn't be hedged."""
+        tracker = self._trackers[key]
+        if len(tracker.samples) < self.min_samples:
+            return None
+        if self.hedges >= self.max_hedge_rate * self.requests:
+            return None
+        return tracker.threshold
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `factory()`, hedging with a second call if it is slow.
+
+        Args:
+            key: Latency bucket, normally the agent name
+            factory: Creates a fresh run each time it is called
+        """
+        self.requests += 1
+        delay = self.threshold(key)
+        started = {}
+
+        def launch() -> asyncio.Task:
+            task = asyncio.ensure_future(factory())
+            started[task] = time.perf_counter()
+            return task
+
+        primary = launch()
+        if delay is None:
+            result = await primary
+            self._trackers[key].observe(time.perf_counter() - started[primary])
+            return result
+
+        pending = {primary}
+        error: Optional[BaseException] = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self.hedges += 1
+                pending.add(launch())
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        # The primary's elapsed time: the latency this run would have had
+                        # unhedged, at least, not the hedge's head-started one
+                        self._trackers[key].observe(time.perf_counter() - started[primary])
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            now = time.perf_counter()
+            for task in pending:
+                task.cancel()
+                self.wasted_seconds += now - started[task]
+            if pending:
+                # Let the losers finish cancelling, and retrieve their exceptions
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hedge rate, wins and time spent on cancelled runs.
+
+        The tokens of a cancelled run aren't reported (usage arrives only with
+        a finished response), so extra spend isn't measured; each hedge costs
+        at most one extra run, which makes `hedge_rate` its upper bound.
+        """
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_rate": self.hedges / self.requests if self.requests else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "wasted_seconds": self.wasted_seconds,
+            "thresholds": {key: tracker.threshold for key, tracker in self._trackers.items()},
+        }
+
+
+_policy: Optional[HedgingPolicy] = None
+_configured = False
+
+
+def get_hedging_policy() -> Optional[HedgingPolicy]:
+    """The process-wide policy, or None when HEDGE_PERCENTILE is not set."""
+    global _policy, _configured
+    if not _configured:
+        _configured = True
+        percentile = os.environ.get('HEDGE_PERCENTILE')
+        if percentile:
+            _policy = HedgingPolicy(
+                percentile=float(percentile),
+                min_samples=int(os.environ.get('HEDGE_MIN_SAMPLES', 20)),
+                max_hedge_rate=float(os.environ.get('HEDGE_MAX_RATE', 0.1)),
+            )
+    return _policy
+
+
+def set_hedging_policy(policy: Optional[HedgingPolicy]) -> None:
+    global _policy, _configured
+    _policy = policy
+    _configured = True
@@ -0,0 +1,203 @@
+"""
+Local Email HTML Renderer
+
+Deterministic markdown-to-HTML conversion for email bodies, used instead of an
+LLM round trip through the HTML converter agent.
+
+Supported markdown:
+- Paragraphs and single line breaks
+- Headings (#, ##, ###)
+- Bulleted (-, *, +) and numbered (1.) lists
+- **bold**, *italic* / _italic_, [links](https://...) and bare URLs
+- Horizontal rules (---)
+
+Input outside that subset (tables, code fences, raw HTML, nested lists) raises
+UnrenderableEmailError so the caller can fall back to the LLM converter.
+
+Usage:
+    python html_render.py  # Check the renderer against known inputs
+"""
+
+import re
+import html
+from functools import lru_cache
+from string import Template
+
+
+class UnrenderableEmailError(ValueError):
+    """Raised when an email body uses markdown the local renderer does not support."""
+
+
+# ============================================================================
+# LAYOUT
+# ============================================================================
+
+# Compiled once at import; only the body is substituted per email
+EMAIL_LAYOUT = Template("""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+</head>
+<body style="margin:0;padding:0;background-color:#f4f5f7;">
+<table role="presentation" width="100%" cellpadding="0" cellspacing="0" style="background-color:#f4f5f7;">
+<tr><td align="center" style="padding:24px 12px;">
+<table role="presentation" width="600" cellpadding="0" cellspacing="0" style="max-width:600px;width:100%;background-color:#ffffff;border-radius:8px;">
+<tr><td style="padding:32px;font-family:Arial,Helvetica,sans-serif;font-size:15px;line-height:1.6;color:#1f2933;">
+$body
+</td></tr>
+</table>
+</td></tr>
+</table>
+</body>
+</html>""")
+
+HEADING_STYLE = "margin:0 0 16px;font-family:Arial,Helvetica,sans-serif;color:#102a43;"
+PARAGRAPH_STYLE = "margin:0 0 16px;"
+LIST_STYLE = "margin:0 0 16px;padding-left:24px;"
+LINK_STYLE = "color:#2563eb;text-decoration:underline;"
+RULE_STYLE = "border:none;border-top:1px solid #d9e2ec;margin:24px 0;"
+
+
+# ============================================================================
+# PARSING
+# ============================================================================
+
+_UNSUPPORTED = re.compile(
+    r"^\s*(```|~~~|\|.*\|\s*$)"         # code fences, tables
+    r"|</?[a-zA-Z][a-zA-Z0-9]*[\s>/]"   # raw HTML tags
+    r"|^(  |\t)+([-*+]|\d+[.)])\s",     # nested lists
+    re.MULTILINE,
+)
+_HEADING = re.compile(r"^(#{1,3})\s+(.*)$")
+_BULLET = re.compile(r"^[-*+]\s+(.*)$")
+_NUMBERED = re.compile(r"^\d+[.)]\s+(.*)$")
+_RULE = re.compile(r"^(-{3,}|\*{3,}|_{3,})$")
+
+_LINK = re.compile(r"\[([^\]]+)\]\((https?://[^)\s]+|mailto:[^)\s]+)\)")
+_BARE_URL = re.compile(r"(?<![\"'=>])\b(https?://[^\s<\x00]+[^\s<\x00.,;:!?)])")
+_LINK_PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+_BOLD = re.compile(r"\*\*(.+?)\*\*|__(.+?)__")
+_ITALIC = re.compile(r"(?<![*\w])\*(?!\s)(.+?)(?<!\s)\*(?![*\w])|(?<![_\w])_(?!\s)(.+?)(?<!\s)_(?![_\w])")
+
+
+def _format(text: str) -> str:
+    """Escape text and apply bold and italics."""
+    text = html.escape(text, quote=False)
+    text = _BOLD.sub(lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", text)
+    return _ITALIC.sub(lambda m: f"<em>{m.group(1) or m.group(2)}</em>", text)
+
+
+def _inline(text: str) -> str:
+    """Escape text and apply inline formatting."""
+    # Links are found in the raw text and swapped for placeholders, so each URL is
+    # escaped exactly once and bold/italic markers never reach into an href
+    links = []
+
+    def link(label: str, url: str) -> str:
+        links.append(f'<a href="{html.escape(url, quote=True)}" style="{LINK_STYLE}">{label}</a>')
+        return f"\x00{len(links) - 1}\x00"
+
+    text = _LINK.sub(lambda m: link(_format(m.group(1)), m.group(2)), text)
+    text = _BARE_URL.sub(lambda m: link(html.escape(m.group(1), quote=False), m.group(1)), text)
+    text = _format(text)
+    return _LINK_PLACEHOLDER.sub(lambda m: links[int(m.group(1))], text)
+
+
+def _render_blocks(text: str) -> str:
+    blocks = []
+    paragraph = []
+    list_tag = None
+    items = []
+
+    def close_paragraph():
+        if paragraph:
+            blocks.append(f'<p style="{PARAGRAPH_STYLE}">' + "<br>\n".join(paragraph) + "</p>")
+            paragraph.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            body = "".join(f"<li>{item}</li>" for item in items)
+            blocks.append(f'<{list_tag} style="{LIST_STYLE}">{body}</{list_tag}>')
+            items.clear()
+            list_tag = None
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            close_paragraph()
+            close_list()
+            continue
+
+        if _RULE.match(line):
+            close_paragraph()
+            close_list()
+            blocks.append(f'<hr style="{RULE_STYLE}">')
+            continue
+
+        heading = _HEADING.match(line)
+        if heading:
+            close_paragraph()
+            close_list()
+            level = len(heading.group(1)) + 1  # h2-h4 read better in email than h1
+            blocks.append(f'<h{level} style="{HEADING_STYLE}">{_inline(heading.group(2))}</h{level}>')
+            continue
+
+        bullet = _BULLET.match(line)
+        numbered = None if bullet else _NUMBERED.match(line)
+        if bullet or numbered:
+            close_paragraph()
+            tag = "ul" if bullet else "ol"
+            if list_tag != tag:
+                close_list()
+                list_tag = tag
+            items.append(_inline((bullet or numbered).group(1)))
+            continue
+
+        close_list()
+        paragraph.append(_inline(line))
+
+    close_paragraph()
+    close_list()
+    return "\n".join(blocks)
+
+
+@lru_cache(maxsize=1024)
+def render_email_html(text: str) -> str:
+    """
+    Render a markdown-ish email body into the standard HTML email layout.
+
+    Raises:
+        UnrenderableEmailError: If the body is empty or uses unsupported markdown
+    """
+    if not text or not text.strip():
+        raise UnrenderableEmailError("Email body is empty")
+    if _UNSUPPORTED.search(text):
+        raise UnrenderableEmailError("Email body contains markdown the local renderer does not support")
+    return EMAIL_LAYOUT.substitute(body=_render_blocks(text))
+
+
+# ============================================================================
+# SELF-CHECK
+# ============================================================================
+
+# (markdown, HTML the rendered body must contain)
+_CHECKS = (
+    ("Hi **Ana**, see [the demo](https://example.com/demo?a=1&b=2).",
+     '<strong>Ana</strong>, see <a href="https://example.com/demo?a=1&amp;b=2"'),
+    ("Book at https://cal.example.com/x?t=1&u=_me_ today",
+     '<a href="https://cal.example.com/x?t=1&amp;u=_me_" style="' + LINK_STYLE + '">https://cal.example.com/x?t=1&amp;u=_me_</a>'),
+    ("Q&A on [*pricing*](https://example.com/p?x=\"y\")",
+     'Q&amp;A on <a href="https://example.com/p?x=&quot;y&quot;" style="' + LINK_STYLE + '"><em>pricing</em></a>'),
+)
+
+
+if __name__ == "__main__":
+    failures = 0
+    for markdown, expected in _CHECKS:
+        if expected not in render_email_html(markdown):
+            failures += 1
+            print(f"❌ {markdown!r} did not render {expected!r}")
+    print(f"✅ {len(_CHECKS) - failures}/{len(_CHECKS)} rendering checks passed")
+    raise SystemExit(1 if failures else 0)
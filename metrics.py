@@ -0,0 +1,359 @@
+"""
+Local Run Metrics
+
+Per-agent latency, token and cost numbers collected locally, so a run can be
+inspected without opening the remote traces.
+
+- `MetricsHooks` (run hooks passed by `agent_runtime`) records model call
+  latency, input/output/cached tokens and estimated cost per agent, function
+  tool execution time and handoffs
+- `MetricsProvider` records time-to-first-token for streamed model calls
+- Everything is exported as Prometheus text format or JSON, written to a
+  file or served over HTTP
+
+Recording is a dict lookup and a few additions per event, so it stays on by
+default.
+
+Environment:
+    METRICS_ENABLED     Set to 0 to turn collection off (default: 1)
+"""
+
+import os
+import json
+import time
+import asyncio
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from agents import RunHooks
+from agents.items import ModelResponse
+from agents.models.interface import Model, ModelProvider
+
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# USD per million tokens: (input, cached input, output)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+}
+
+DESCRIPTIONS = {
+    "agent_llm_latency_seconds": "Model call latency per agent",
+    "agent_llm_calls_total": "Model calls per agent",
+    "agent_input_tokens_total": "Input tokens per agent, including cached tokens",
+    "agent_cached_tokens_total": "Cached input tokens per agent",
+    "agent_output_tokens_total": "Output tokens per agent",
+    "agent_cost_usd_total": "Estimated model cost per agent in USD",
+    "agent_run_seconds": "Wall time of whole runs by starting agent",
+    "model_time_to_first_token_seconds": "Time to the first streamed delta per model",
+    "tool_latency_seconds": "Function tool execution time",
+    "handoffs_total": "Handoffs between agents",
+    "pipeline_items_total": "Items finished per pipeline stage",
+    "pipeline_failures_total": "Items failed per pipeline stage",
+    "pipeline_stage_seconds": "Time spent on one item per pipeline stage",
+    "pipeline_queue_depth": "Items waiting in a pipeline stage's input queue",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Fixed-bucket histogram; buckets are cumulated only at export time."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Counters, gauges and histograms keyed by metric name and label values."""
+
+    def __init__(self, prices: Optional[Dict[str, Tuple[float, float, float]]] = None):
+        self.prices = MODEL_PRICES if prices is None else prices
+        self.counters: Dict[Tuple[str, Labels], float] = defaultdict(float)
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = defaultdict(Histogram)
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+
+    def inc(self, name: str, labels: Labels, value: float = 1.0) -> None:
+        self.counters[(name, labels)] += value
+
+    def observe(self, name: str, labels: Labels, value: float) -> None:
+        self.histograms[(name, labels)].observe(value)
+
+    def set_gauge(self, name: str, labels: Labels, value: float) -> None:
+        self.gauges[(name, labels)] = value
+
+    def record_usage(self, agent: str, model: str, response: ModelResponse) -> None:
+        """Token counters and estimated cost for one model response."""
+        usage = response.usage
+        details = getattr(usage, "input_tokens_details", None)
+        cached = getattr(details, "cached_tokens", 0) or 0
+        labels = (("agent", agent), ("model", model))
+        self.inc("agent_llm_calls_total", labels)
+        self.inc("agent_input_tokens_total", labels, usage.input_tokens)
+        self.inc("agent_cached_tokens_total", labels, cached)
+        self.inc("agent_output_tokens_total", labels, usage.output_tokens)
+
+        price = self.prices.get(model)
+        if price is not None:
+            input_price, cached_price, output_price = price
+            cost = ((usage.input_tokens - cached) * input_price + cached * cached_price
+                    + usage.output_tokens * output_price) / 1_000_000
+            self.inc("agent_cost_usd_total", labels, cost)
+
+    def merge(self, other: "Metrics") -> None:
+        """Add another collector's counts, e.g. from a campaign shard process."""
+        for key, value in other.counters.items():
+            self.counters[key] += value
+        for key, value in other.gauges.items():
+            self.gauges[key] = self.gauges.get(key, 0.0) + value
+        for key, histogram in other.histograms.items():
+            target = self.histograms[key]
+            target.counts = [a + b for a, b in zip(target.counts, histogram.counts)]
+            target.sum += histogram.sum
+            target.count += histogram.count
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.histograms.clear()
+        self.gauges.clear()
+
+    # ------------------------------------------------------------------------
+    # EXPORT
+    # ------------------------------------------------------------------------
+
+    def to_json(self) -> Dict[str, Any]:
+        """All metrics as plain data; histograms keep their non-cumulative bucket counts."""
+        counters: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for (name, labels), value in sorted(self.counters.items()):
+            counters[name].append({"labels": dict(labels), "value": value})
+        gauges: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for (name, labels), value in sorted(self.gauges.items()):
+            gauges[name].append({"labels": dict(labels), "value": value})
+        histograms: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            histograms[name].append({
+                "labels": dict(labels),
+                "count": histogram.count,
+                "sum": histogram.sum,
+                "mean": histogram.sum / histogram.count if histogram.count else 0.0,
+                "buckets": dict(zip([*map(str, LATENCY_BUCKETS), "+Inf"], histogram.counts)),
+            })
+        return {"timestamp": time.time(), "counters": dict(counters), "gauges": dict(gauges),
+                "histograms": dict(histograms)}
+
+    def to_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        described = set()
+
+        def header(name: str, kind: str) -> None:
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {DESCRIPTIONS.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {float(value)!r}")
+
+        for (name, labels), value in sorted(self.gauges.items()):
+            header(name, "gauge")
+            lines.append(f"{name}{_format_labels(labels)} {float(value)!r}")
+
+        for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip([*map(str, LATENCY_BUCKETS), "+Inf"], histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {float(histogram.sum)!r}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Write a snapshot; `.json` files get JSON, anything else Prometheus text."""
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                json.dump(self.to_json(), f, indent=2)
+            else:
+                f.write(self.to_prometheus())
+
+    def print_summary(self) -> None:
+        """Print a per-agent table of calls, latency, tokens and cost."""
+        agents: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for (name, labels), value in self.counters.items():
+            if name.startswith("agent_"):
+                agents[dict(labels)["agent"]][name] += value
+        for (name, labels), histogram in self.histograms.items():
+            if name == "agent_llm_latency_seconds":
+                agents[dict(labels)["agent"]]["latency_sum"] += histogram.sum
+        if not agents:
+            return
+
+        print(f"{'agent':<28} {'calls':>6} {'avg s':>7} {'in tok':>8} {'cached':>7} {'out tok':>8} {'cost $':>9}")
+        for agent, row in sorted(agents.items()):
+            calls = row["agent_llm_calls_total"]
+            print(f"{agent[:28]:<28} {calls:>6.0f} {row['latency_sum'] / calls if calls else 0:>7.2f} "
+                  f"{row['agent_input_tokens_total']:>8.0f} {row['agent_cached_tokens_total']:>7.0f} "
+                  f"{row['agent_output_tokens_total']:>8.0f} {row['agent_cost_usd_total']:>9.4f}")
+        for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            if name == "tool_latency_seconds" and histogram.count:
+                print(f"🔧 {dict(labels)['tool']}: {histogram.count} calls, "
+                      f"{histogram.sum / histogram.count:.3f}s avg")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+# ============================================================================
+# INSTRUMENTATION
+# ============================================================================
+
+class MetricsHooks(RunHooks):
+    """Run hooks that time model calls and tools and count tokens per agent."""
+
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+        # Keyed by the run (or tool call) context, which both hook calls share
+        self._llm_started: Dict[int, float] = {}
+        self._tool_started: Dict[int, float] = {}
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items) -> None:
+        self._llm_started[id(context)] = time.perf_counter()
+
+    async def on_llm_end(self, context, agent, response) -> None:
+        started = self._llm_started.pop(id(context), None)
+        model = agent.model if isinstance(agent.model, str) else getattr(agent.model, "model", "") or ""
+        if started is not None:
+            self.metrics.observe("agent_llm_latency_seconds", (("agent", agent.name), ("model", model)),
+                                 time.perf_counter() - started)
+        self.metrics.record_usage(agent.name, model, response)
+
+    async def on_tool_start(self, context, agent, tool) -> None:
+        self._tool_started[id(context)] = time.perf_counter()
+
+    async def on_tool_end(self, context, agent, tool, result) -> None:
+        started = self._tool_started.pop(id(context), None)
+        if started is not None:
+            self.metrics.observe("tool_latency_seconds", (("tool", tool.name),), time.perf_counter() - started)
+
+    async def on_handoff(self, context, from_agent, to_agent) -> None:
+        self.metrics.inc("handoffs_total", (("from", from_agent.name), ("to", to_agent.name)))
+
+
+class MetricsModel(Model):
+    """Records time-to-first-token of streamed responses."""
+
+    def __init__(self, inner: Model, model_name: str, metrics: Metrics):
+        self.inner = inner
+        self.labels = (("model", model_name),)
+        self.metrics = metrics
+
+    async def get_response(self, *args, **kwargs) -> ModelResponse:
+        return await self.inner.get_response(*args, **kwargs)
+
+    async def stream_response(self, *args, **kwargs) -> AsyncIterator[Any]:
+        start = time.perf_counter()
+        first = True
+        async for event in self.inner.stream_response(*args, **kwargs):
+            if first and getattr(event, "type", "").endswith(".delta"):
+                first = False
+                self.metrics.observe("model_time_to_first_token_seconds", self.labels,
+                                     time.perf_counter() - start)
+            yield event
+
+
+class MetricsProvider(ModelProvider):
+    """Wraps another provider so streamed calls report time-to-first-token."""
+
+    def __init__(self, inner: ModelProvider, metrics: Metrics):
+        self.inner = inner
+        self.metrics = metrics
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return MetricsModel(self.inner.get_model(model_name), model_name or "", self.metrics)
+
+
+# ============================================================================
+# HTTP ENDPOINT
+# ============================================================================
+
+async def serve_metrics(metrics: Metrics, host: str = "127.0.0.1", port: int = 9464) -> Any:
+    """
+    Serve /metrics (Prometheus text) and /metrics.json over plain HTTP.
+
+    Returns:
+        The asyncio server; close it with `server.close()`
+    """
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            while (await reader.readline()).strip():
+                pass
+            path = request_line[1] if len(request_line) > 1 else "/"
+            if path.startswith("/metrics.json"):
+                body, content_type = json.dumps(metrics.to_json()), "application/json"
+            else:
+                body, content_type = metrics.to_prometheus(), "text/plain; version=0.0.4"
+            payload = body.encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("latin-1") + payload
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+# ============================================================================
+# SHARED METRICS
+# ============================================================================
+
+_metrics: Optional[Metrics] = None
+_hooks: Optional[MetricsHooks] = None
+_configured = False
+
+
+def get_metrics() -> Optional[Metrics]:
+    """The process-wide metrics, or None when METRICS_ENABLED=0."""
+    global _metrics, _hooks, _configured
+    if not _configured:
+        _configured = True
+        if os.environ.get('METRICS_ENABLED', '1') != '0':
+            _metrics = Metrics()
+            _hooks = MetricsHooks(_metrics)
+    return _metrics
+
+
+def get_metrics_hooks() -> Optional[MetricsHooks]:
+    """Run hooks feeding the process-wide metrics."""
+    get_metrics()
+    return _hooks
+
+
+def set_metrics(metrics: Optional[Metrics]) -> None:
+    global _metrics, _hooks, _configured
+    _metrics = metrics
+    _hooks = MetricsHooks(metrics) if metrics is not None else None
+    _configured = True
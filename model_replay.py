@@ -0,0 +1,337 @@
+"""
+Record/Replay Model Provider
+
+Records real model responses (text, tool calls and handoffs) to a compact
+gzip-compressed JSONL cassette, and replays them later without network access.
+Replays are deterministic and can add synthetic latency, so the agent graphs
+can be benchmarked on an air-gapped box and regressions in our own
+orchestration code are not hidden by API jitter.
+
+Each request is keyed on the model, system instructions, input, tools, handoffs
+and output schema. Repeated identical requests are replayed in recorded order.
+
+Environment:
+    MODEL_MODE              "live" (default), "record" or "replay"
+    MODEL_CASSETTE          Cassette path (default: cassettes/models.jsonl.gz)
+    REPLAY_LATENCY          Fixed latency per replayed call in seconds, or
+                            "recorded" to reuse the recorded latency (default)
+    REPLAY_LATENCY_SCALE    Multiplier for recorded latency (default: 1.0)
+    REPLAY_JITTER           Random ± fraction applied to latency (default: 0)
+    REPLAY_SEED             Seed for the jitter (default: 0)
+
+Usage:
+    MODEL_MODE=record python automated_sdr.py
+    MODEL_MODE=replay REPLAY_LATENCY=0 python automated_sdr.py
+"""
+
+import os
+import gzip
+import json
+import time
+import random
+import asyncio
+import hashlib
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional
+from pydantic import TypeAdapter
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseOutputItem,
+    ResponseOutputMessage,
+    ResponseTextDeltaEvent,
+    ResponseUsage,
+)
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails
+from agents import set_tracing_disabled
+from agents.items import ModelResponse
+from agents.usage import Usage
+from agents.models.interface import Model, ModelProvider
+from agents.models.multi_provider import MultiProvider
+
+
+DEFAULT_CASSETTE = os.path.join("cassettes", "models.jsonl.gz")
+
+_output_adapter = TypeAdapter(ResponseOutputItem)
+
+
+class ReplayMissError(RuntimeError):
+    """Raised when a replayed run makes a request that was never recorded."""
+
+
+# ============================================================================
+# REQUEST KEYS AND SERIALIZATION
+# ============================================================================
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_unset=True)
+    return str(value)
+
+
+def request_key(
+    model_name: str,
+    system_instructions: Optional[str],
+    input: Any,
+    tools: List[Any],
+    output_schema: Any,
+    handoffs: List[Any],
+) -> str:
+    """SHA-256 over everything in a model request that shapes its response."""
+    material = {
+        "model": model_name,
+        "system": system_instructions,
+        "input": input,
+        "tools": [getattr(tool, "name", type(tool).__name__) for tool in tools or []],
+        "handoffs": [getattr(handoff, "tool_name", str(handoff)) for handoff in handoffs or []],
+        "output_schema": output_schema.json_schema() if output_schema is not None else None,
+    }
+    encoded = json.dumps(material, sort_keys=True, default=_jsonable).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _dump_response(key: str, response: ModelResponse, latency: float) -> Dict[str, Any]:
+    usage = response.usage
+    return {
+        "key": key,
+        "latency": round(latency, 4),
+        "response_id": response.response_id,
+        "output": [item.model_dump(exclude_unset=True) for item in response.output],
+        "usage": [usage.requests, usage.input_tokens, usage.output_tokens, usage.total_tokens],
+    }
+
+
+def _load_response(record: Dict[str, Any]) -> ModelResponse:
+    requests, input_tokens, output_tokens, total_tokens = record["usage"]
+    return ModelResponse(
+        output=[_output_adapter.validate_python(item) for item in record["output"]],
+        usage=Usage(
+            requests=requests,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=total_tokens,
+        ),
+        response_id=record.get("response_id"),
+    )
+
+
+# ============================================================================
+# RECORDING
+# ============================================================================
+
+class RecordingModel(Model):
+    """Wraps a live model and appends every response to the cassette."""
+
+    def __init__(self, inner: Model, model_name: str, provider: "RecordingProvider"):
+        self.inner = inner
+        self.model_name = model_name
+        self.provider = provider
+
+    async def get_response(self, system_instructions, input, model_settings, tools,
+                           output_schema, handoffs, tracing, **kwargs) -> ModelResponse:
+        key = request_key(self.model_name, system_instructions, input, tools, output_schema, handoffs)
+        start = time.perf_counter()
+        response = await self.inner.get_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+        )
+        self.provider.write(_dump_response(key, response, time.perf_counter() - start))
+        return response
+
+    async def stream_response(self, system_instructions, input, model_settings, tools,
+                              output_schema, handoffs, tracing, **kwargs) -> AsyncIterator[Any]:
+        key = request_key(self.model_name, system_instructions, input, tools, output_schema, handoffs)
+        start = time.perf_counter()
+        async for event in self.inner.stream_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+        ):
+            if isinstance(event, ResponseCompletedEvent):
+                usage = event.response.usage
+                response = ModelResponse(
+                    output=event.response.output,
+                    usage=Usage(
+                        requests=1,
+                        input_tokens=usage.input_tokens if usage else 0,
+                        output_tokens=usage.output_tokens if usage else 0,
+                        total_tokens=usage.total_tokens if usage else 0,
+                    ),
+                    response_id=event.response.id,
+                )
+                self.provider.write(_dump_response(key, response, time.perf_counter() - start))
+            yield event
+
+
+class RecordingProvider(ModelProvider):
+    """Model provider that records live responses to a cassette."""
+
+    def __init__(self, path: str = DEFAULT_CASSETTE, inner: Optional[ModelProvider] = None):
+        self.path = path
+        self.inner = inner or MultiProvider()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return RecordingModel(self.inner.get_model(model_name), model_name or "", self)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        # Each append adds a gzip member; readers see one continuous stream
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+# ============================================================================
+# REPLAY
+# ============================================================================
+
+class ReplayModel(Model):
+    """Serves recorded responses with synthetic latency."""
+
+    def __init__(self, model_name: str, provider: "ReplayProvider"):
+        self.model_name = model_name
+        self.provider = provider
+
+    async def get_response(self, system_instructions, input, model_settings, tools,
+                           output_schema, handoffs, tracing, **kwargs) -> ModelResponse:
+        key = request_key(self.model_name, system_instructions, input, tools, output_schema, handoffs)
+        record = self.provider.next_record(key, self.model_name)
+        await asyncio.sleep(self.provider.latency_for(record))
+        return _load_response(record)
+
+    async def stream_response(self, system_instructions, input, model_settings, tools,
+                              output_schema, handoffs, tracing, **kwargs) -> AsyncIterator[Any]:
+        key = request_key(self.model_name, system_instructions, input, tools, output_schema, handoffs)
+        record = self.provider.next_record(key, self.model_name)
+        response = _load_response(record)
+        await asyncio.sleep(self.provider.latency_for(record))
+
+        sequence = 0
+        for output_index, item in enumerate(response.output):
+            if not isinstance(item, ResponseOutputMessage):
+                continue
+            for content_index, part in enumerate(item.content):
+                text = getattr(part, "text", "")
+                # Replay text in word-sized deltas so streaming consumers behave as live
+                for delta in text.split(" "):
+                    yield ResponseTextDeltaEvent.model_construct(
+                        type="response.output_text.delta",
+                        item_id=item.id,
+                        output_index=output_index,
+                        content_index=content_index,
+                        delta=delta + " ",
+                        logprobs=[],
+                        sequence_number=sequence,
+                    )
+                    sequence += 1
+
+        usage = response.usage
+        yield ResponseCompletedEvent.model_construct(
+            type="response.completed",
+            sequence_number=sequence,
+            response=Response.model_construct(
+                id=response.response_id or f"resp_replay_{key[:16]}",
+                object="response",
+                created_at=time.time(),
+                model=self.model_name,
+                output=response.output,
+                status="completed",
+                parallel_tool_calls=True,
+                tool_choice="auto",
+                tools=[],
+                usage=ResponseUsage.model_construct(
+                    input_tokens=usage.input_tokens,
+                    output_tokens=usage.output_tokens,
+                    total_tokens=usage.total_tokens,
+                    input_tokens_details=InputTokensDetails.model_construct(cached_tokens=0),
+                    output_tokens_details=OutputTokensDetails.model_construct(reasoning_tokens=0),
+                ),
+            ),
+        )
+
+
+class ReplayProvider(ModelProvider):
+    """Model provider that answers every request from a cassette."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CASSETTE,
+        latency: Optional[float] = None,
+        latency_scale: float = 1.0,
+        jitter: float = 0.0,
+        seed: int = 0,
+    ):
+        self.path = path
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._records: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursors: Dict[str, int] = defaultdict(int)
+
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self._records[record["key"]].append(record)
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return ReplayModel(model_name or "", self)
+
+    def next_record(self, key: str, model_name: str) -> Dict[str, Any]:
+        """Return the next recorded response for a request, cycling when exhausted."""
+        records = self._records.get(key)
+        if not records:
+            raise ReplayMissError(
+                f"No recorded response for {model_name} request {key[:12]} in {self.path}; "
+                "re-record with MODEL_MODE=record"
+            )
+        cursor = self._cursors[key]
+        self._cursors[key] = cursor + 1
+        return records[cursor % len(records)]
+
+    def latency_for(self, record: Dict[str, Any]) -> float:
+        base = self.latency if self.latency is not None else record.get("latency", 0.0) * self.latency_scale
+        if self.jitter:
+            base *= 1 + self._random.uniform(-self.jitter, self.jitter)
+        return max(0.0, base)
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+_provider: Optional[ModelProvider] = None
+_configured = False
+
+
+def get_model_provider() -> Optional[ModelProvider]:
+    """Provider for the mode selected by MODEL_MODE, or None for live runs."""
+    global _provider, _configured
+    if _configured:
+        return _provider
+    _configured = True
+
+    mode = os.environ.get('MODEL_MODE', 'live').lower()
+    path = os.environ.get('MODEL_CASSETTE', DEFAULT_CASSETTE)
+    if mode == "record":
+        _provider = RecordingProvider(path)
+    elif mode == "replay":
+        latency = os.environ.get('REPLAY_LATENCY', 'recorded')
+        _provider = ReplayProvider(
+            path,
+            latency=None if latency == "recorded" else float(latency),
+            latency_scale=float(os.environ.get('REPLAY_LATENCY_SCALE', 1.0)),
+            jitter=float(os.environ.get('REPLAY_JITTER', 0.0)),
+            seed=int(os.environ.get('REPLAY_SEED', 0)),
+        )
+        # Nothing to upload traces to on an offline box
+        set_tracing_disabled(True)
+    elif mode != "live":
+        raise ValueError(f"Unknown MODEL_MODE: {mode}")
+    return _provider
+
+
+def set_model_provider(provider: Optional[ModelProvider]) -> None:
+    """Install the provider used by `agent_runtime.run_agent` (None for live)."""
+    global _provider, _configured
+    _provider = provider
+    _configured = True
@@ -0,0 +1,188 @@
+"""
+Durable Email Outbox
+
+A SQLite (WAL) log between the Email Manager and the email transport, so an
+interrupted campaign can be resumed without re-sending or skipping prospects.
+
+- Every message is keyed by a (campaign, prospect) idempotency key and
+  checkpointed before it is handed to the transport, so a finished email is
+  never lost
+- A key that is already sent is never sent again; the suppressed send comes
+  back with `duplicate` set, so a prospect gets one email per campaign
+- Writes are group-committed: concurrent sends share one transaction and one
+  fsync instead of paying for their own
+
+Message states:
+    sending   Checkpointed and handed to the transport; outcome unknown if the
+              process died here
+    sent      Accepted by the backend
+    failed    Rejected by the backend or errored; safe to resend
+
+Usage:
+    python campaign.py prospects.csv --outbox .cache/outbox.sqlite3
+    python campaign.py prospects.csv --outbox .cache/outbox.sqlite3 --resume
+    python campaign.py followups.csv --outbox .cache/outbox.sqlite3 --campaign q3-followup
+"""
+
+import os
+import time
+import asyncio
+import sqlite3
+import hashlib
+from typing import Dict, List, Optional, Set, Tuple
+
+from email_transport import EmailMessage, EmailTransport, SendResult
+
+
+def idempotency_key(recipient: str, campaign: str = "") -> str:
+    """Stable key for the one email a prospect should receive in a campaign."""
+    material = f"{campaign}\0{recipient.strip().lower()}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class Outbox:
+    """Append-mostly SQLite log of outgoing messages with group commit."""
+
+    def __init__(self, path: str, commit_interval: float = 0.02, max_batch: int = 256):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.commit_interval = commit_interval
+        self.max_batch = max_batch
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # Survives process crashes; only an OS crash can lose the last commits
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "key TEXT PRIMARY KEY, recipient TEXT NOT NULL, sender TEXT NOT NULL, "
+            "subject TEXT NOT NULL, content TEXT NOT NULL, content_type TEXT NOT NULL, "
+            "status TEXT NOT NULL, status_code INTEGER, detail TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, updated REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._pending: List[Tuple[str, tuple, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.commits = 0
+        self.writes = 0
+
+    # ------------------------------------------------------------------------
+    # READS
+    # ------------------------------------------------------------------------
+
+    def status(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT status FROM messages WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def message(self, key: str) -> Optional[EmailMessage]:
+        """The checkpointed email for a key, e.g. to resend it without new drafts."""
+        row = self._db.execute(
+            "SELECT sender, recipient, subject, content, content_type FROM messages WHERE key = ?", (key,)
+        ).fetchone()
+        return EmailMessage(*row) if row else None
+
+    def keys(self, status: str) -> Set[str]:
+        return {row[0] for row in self._db.execute("SELECT key FROM messages WHERE status = ?", (status,))}
+
+    def summary(self) -> Dict[str, int]:
+        """Message count per state."""
+        return dict(self._db.execute("SELECT status, COUNT(*) FROM messages GROUP BY status").fetchall())
+
+    # ------------------------------------------------------------------------
+    # GROUP-COMMITTED WRITES
+    # ------------------------------------------------------------------------
+
+    async def _write(self, sql: str, params: tuple) -> None:
+        """Queue a statement and wait until the transaction containing it commits."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((sql, params, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.commit_interval, self._flush)
+        await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            with self._db:
+                for sql, params, _ in batch:
+                    self._db.execute(sql, params)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.commits += 1
+        self.writes += len(batch)
+        for _, _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    async def begin(self, key: str, message: EmailMessage) -> None:
+        """Checkpoint a message as `sending`; must commit before the transport is called."""
+        await self._write(
+            "INSERT INTO messages (key, recipient, sender, subject, content, content_type, status, attempts, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, 'sending', 1, ?) "
+            "ON CONFLICT (key) DO UPDATE SET subject = excluded.subject, content = excluded.content, "
+            "content_type = excluded.content_type, status = 'sending', attempts = attempts + 1, "
+            "updated = excluded.updated",
+            (key, message.recipient, message.sender, message.subject, message.content,
+             message.content_type, time.time()),
+        )
+
+    async def finish(self, key: str, status: str, status_code: Optional[int] = None, detail: str = "") -> None:
+        await self._write(
+            "UPDATE messages SET status = ?, status_code = ?, detail = ?, updated = ? WHERE key = ?",
+            (status, status_code, detail[:500], time.time(), key),
+        )
+
+    def close(self) -> None:
+        """Commit anything still queued and close the database."""
+        self._flush()
+        self._db.close()
+
+
+class OutboxTransport(EmailTransport):
+    """Makes another transport idempotent and crash-safe through an Outbox."""
+
+    def __init__(self, inner: EmailTransport, outbox: Outbox, campaign: str = ""):
+        self.inner = inner
+        self.outbox = outbox
+        self.campaign = campaign
+        self.suppressed = 0
+        self._inflight: Set[str] = set()
+
+    async def send(self, message: EmailMessage) -> SendResult:
+        key = idempotency_key(message.recipient, self.campaign)
+        status = "sending" if key in self._inflight else self.outbox.status(key)
+        if status == "sent":
+            self.suppressed += 1
+            return SendResult(200, "duplicate suppressed: already sent", duplicate=True)
+        if status == "sending":
+            # A previous run may or may not have delivered it; never risk a double send
+            self.suppressed += 1
+            return SendResult(409, "duplicate suppressed: outcome of an earlier send is unknown", duplicate=True)
+
+        self._inflight.add(key)
+        try:
+            await self.outbox.begin(key, message)
+            try:
+                result = await self.inner.send(message)
+            except Exception as e:
+                await self.outbox.finish(key, "failed", detail=str(e))
+                raise
+            await self.outbox.finish(key, "sent" if result.ok else "failed", result.status_code, result.body)
+            return result
+        finally:
+            self._inflight.discard(key)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
@@ -3,11 +3,15 @@ Parallel Agent Execution Example
 
 This example demonstrates how to run multiple agents concurrently
 using asyncio.gather() for improved performance.
+
+The agents are declared in the agent registry (see agent_registry.py) and
+built on first use.
 """
 
 import asyncio
 from dotenv import load_dotenv
-from agents import Agent, Runner, trace
+
+from agent_registry import AgentSpec, registry
 
 
 load_dotenv(override=True)
@@ -29,19 +33,20 @@ agents_config = [
     },
 ]
 
+# Registry keys, e.g. "parallel_execution.professional_writer"
+AGENT_KEYS = []
+for _config in agents_config:
+    AGENT_KEYS.append("parallel_execution." + _config["name"].lower().replace(" ", "_"))
+    registry.add_agent(AGENT_KEYS[-1], AgentSpec(name=_config["name"], instructions=_config["instructions"]))
+
 
 async def run_parallel_agents():
     """Execute multiple agents in parallel and compare outputs."""
+    from agents import trace
+    from agent_runtime import run_agent
     
-    # Create agents
-    agents = [
-        Agent(
-            name=config["name"],
-            instructions=config["instructions"],
-            model="gpt-4o-mini"
-        )
-        for config in agents_config
-    ]
+    # Build (or reuse) the agents
+    agents = [registry.agent(key) for key in AGENT_KEYS]
     
     # Task for all agents
     task = "Explain what artificial intelligence is in 3 sentences."
@@ -52,7 +57,7 @@ async def run_parallel_agents():
     # Execute in parallel with tracing
     with trace("Parallel Agent Execution"):
         results = await asyncio.gather(
-            *[Runner.run(agent, task) for agent in agents]
+            *[run_agent(agent, task) for agent in agents]
         )
     
     # Display results
@@ -68,42 +73,27 @@ async def run_parallel_agents():
 
 
 async def measure_performance():
-    """Compare parallel vs sequential execution time."""
-    import time
-    
-    agents = [
-        Agent(
-            name=config["name"],
-            instructions=config["instructions"],
-            model="gpt-4o-mini"
-        )
-        for config in agents_config
-    ]
-    
-    task = "Write a one-sentence product description for AI software."
-    
-    # Sequential execution
-    print("\nTesting Sequential Execution...")
-    start = time.time()
-    for agent in agents:
-        await Runner.run(agent, task)
-    sequential_time = time.time() - start
-    
-    # Parallel execution
-    print("Testing Parallel Execution...")
-    start = time.time()
-    await asyncio.gather(
-        *[Runner.run(agent, task) for agent in agents]
+    """Compare parallel vs sequential execution time over repeated trials."""
+    from benchmark import run_benchmark
+
+    report = await run_benchmark(
+        agent_counts=[len(agents_config)],
+        concurrency_levels=[1, len(agents_config)],
+        trials=5,
+        warmup=1,
+        task="Write a one-sentence product description for AI software.",
     )
-    parallel_time = time.time() - start
+    
+    sequential, parallel = (result["wall"] for result in report["results"])
     
     # Results
     print(f"\n{'='*60}")
-    print("Performance Comparison:")
+    print("Performance Comparison (5 trials, p50 / p95):")
     print(f"{'='*60}")
-    print(f"Sequential: {sequential_time:.2f} seconds")
-    print(f"Parallel:   {parallel_time:.2f} seconds")
-    print(f"Speedup:    {sequential_time/parallel_time:.2f}x faster")
+    print(f"Sequential: {sequential['p50']:.2f}s / {sequential['p95']:.2f}s")
+    print(f"Parallel:   {parallel['p50']:.2f}s / {parallel['p95']:.2f}s")
+    print(f"Speedup:    {sequential['p50']/parallel['p50']:.2f}x faster (median)")
+    print("For sweeps and JSON output, run: python benchmark.py --help")
 
 
 async def main():
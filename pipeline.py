@@ -0,0 +1,233 @@
+"""
+Backpressured Async Pipeline
+
+Stages connected by bounded queues, each stage with its own number of
+workers, so items stream through instead of moving in lockstep batches:
+- A full queue blocks the stage in front of it, so a slow stage (sending,
+  HTML conversion) throttles everything upstream, down to the reader,
+  instead of letting finished drafts pile up in memory
+- Items move independently: one prospect can be sending while the next is
+  still being drafted
+- Per-stage statistics: items processed, dropped and failed, throughput,
+  busy time, queue depth (current, max and time-weighted mean) and the time
+  workers spent blocked on a full downstream queue
+
+A stage handler returns the item for the next stage, or None to drop it.
+Exceptions are counted and passed to `on_error`; the item is dropped. Given
+a `metrics.Metrics`, the pipeline also records per-stage item counters,
+per-item stage time and live queue depth gauges (pipeline_* metrics).
+
+Usage:
+    pipeline = Pipeline([Stage("draft", draft, workers=20), Stage("send", send, workers=4)])
+    await pipeline.run(prospects)
+    print(pipeline.report())
+"""
+
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """One step of a pipeline."""
+    name: str
+    handler: Callable[[Any], Awaitable[Any]]
+    workers: int = 1
+    queue_size: Optional[int] = None  # Input queue bound (default: 2 × workers)
+
+    def __post_init__(self):
+        if self.workers < 1:
+            raise ValueError(f"Stage {self.name!r} needs at least one worker")
+
+
+class StageQueue:
+    """Bounded asyncio queue that tracks its depth over time."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.max_depth = 0
+        self.blocked_seconds = 0.0
+        self._area = 0.0
+        self._since = self._last = time.perf_counter()
+
+    def _account(self) -> None:
+        now = time.perf_counter()
+        self._area += self._queue.qsize() * (now - self._last)
+        self._last = now
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def mean_depth(self) -> float:
+        self._account()
+        elapsed = self._last - self._since
+        return self._area / elapsed if elapsed > 0 else 0.0
+
+    async def put(self, item: Any) -> None:
+        if self._queue.full():
+            start = time.perf_counter()
+            await self._queue.put(item)
+            self.blocked_seconds += time.perf_counter() - start
+        else:
+            self._account()
+            self._queue.put_nowait(item)
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    async def close(self, workers: int) -> None:
+        """Queue one end-of-stream marker per consuming worker."""
+        for _ in range(workers):
+            await self._queue.put(_DONE)
+
+    async def get(self) -> Any:
+        if self._queue.empty():
+            item = await self._queue.get()
+        else:
+            self._account()
+            item = self._queue.get_nowait()
+        self._account()
+        return item
+
+
+@dataclass
+class StageStats:
+    processed: int = 0
+    dropped: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+
+
+class Pipeline:
+    """Runs items from a source through stages connected by bounded queues."""
+
+    def __init__(self, stages: List[Stage],
+                 on_error: Optional[Callable[[Any, str, BaseException], None]] = None,
+                 metrics: Any = None):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        for stage in stages:
+            # A stage without workers would never drain its queue (or, with queue size 0, never bound it)
+            if stage.workers < 1:
+                raise ValueError(f"Stage {stage.name!r} needs at least one worker")
+        self.stages = stages
+        self.on_error = on_error
+        self.metrics = metrics
+        self._labels = [(("stage", stage.name),) for stage in stages]
+        self._queues = [StageQueue(stage.queue_size or stage.workers * 2) for stage in stages]
+        self._stats = {stage.name: StageStats() for stage in stages}
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+
+    async def _put(self, index: int, item: Any) -> None:
+        await self._queues[index].put(item)
+        if self.metrics is not None:
+            self.metrics.set_gauge("pipeline_queue_depth", self._labels[index], self._queues[index].depth)
+
+    async def _feed(self, source: Union[Iterable[Any], AsyncIterable[Any]]) -> None:
+        if hasattr(source, "__aiter__"):
+            async for item in source:
+                await self._put(0, item)
+        else:
+            for item in source:
+                await self._put(0, item)
+
+    async def _work(self, index: int) -> None:
+        stage, stats = self.stages[index], self._stats[self.stages[index].name]
+        queue, labels, metrics = self._queues[index], self._labels[index], self.metrics
+        last = index + 1 == len(self.stages)
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            if metrics is not None:
+                metrics.set_gauge("pipeline_queue_depth", labels, queue.depth)
+            start = time.perf_counter()
+            try:
+                result = await stage.handler(item)
+            except Exception as e:
+                stats.failed += 1
+                if metrics is not None:
+                    metrics.inc("pipeline_failures_total", labels)
+                if self.on_error is not None:
+                    self.on_error(item, stage.name, e)
+                continue
+            finally:
+                elapsed = time.perf_counter() - start
+                stats.busy_seconds += elapsed
+                if metrics is not None:
+                    metrics.observe("pipeline_stage_seconds", labels, elapsed)
+            if result is None:
+                stats.dropped += 1
+                continue
+            stats.processed += 1
+            if metrics is not None:
+                metrics.inc("pipeline_items_total", labels)
+            if not last:
+                await self._put(index + 1, result)
+
+    async def _run_stage(self, index: int) -> None:
+        """Run a stage's workers, then tell the next stage no more items are coming."""
+        await asyncio.gather(*(self._work(index) for _ in range(self.stages[index].workers)))
+        if index + 1 < len(self.stages):
+            await self._queues[index + 1].close(self.stages[index + 1].workers)
+
+    async def run(self, source: Union[Iterable[Any], AsyncIterable[Any]]) -> None:
+        """Push every item of `source` through all stages and wait until the last one finishes."""
+        self._started = time.perf_counter()
+        stages = [asyncio.create_task(self._run_stage(index)) for index in range(len(self.stages))]
+        try:
+            await self._feed(source)
+            await self._queues[0].close(self.stages[0].workers)
+            await asyncio.gather(*stages)
+        finally:
+            for task in stages:
+                task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            self._finished = time.perf_counter()
+
+    # ------------------------------------------------------------------------
+    # STATISTICS
+    # ------------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage counters, throughput (items/s) and queue occupancy."""
+        elapsed = 0.0
+        if self._started is not None:
+            elapsed = (self._finished or time.perf_counter()) - self._started
+        result = {}
+        for stage, queue in zip(self.stages, self._queues):
+            stats = self._stats[stage.name]
+            result[stage.name] = {
+                "workers": stage.workers,
+                "processed": stats.processed,
+                "dropped": stats.dropped,
+                "failed": stats.failed,
+                "throughput": stats.processed / elapsed if elapsed > 0 else 0.0,
+                "utilization": stats.busy_seconds / (elapsed * stage.workers) if elapsed > 0 else 0.0,
+                "queue_depth": queue.depth,
+                "queue_capacity": queue.maxsize,
+                "queue_max_depth": queue.max_depth,
+                "queue_mean_depth": queue.mean_depth,
+                # Time the upstream side waited because this stage's queue was full
+                "backpressure_seconds": queue.blocked_seconds,
+            }
+        return result
+
+    def report(self) -> str:
+        """One line per stage: done, rate, worker utilization and queue occupancy."""
+        lines = []
+        for name, stats in self.stats().items():
+            lines.append(
+                f"{name:<10} {stats['processed']:>6} done {stats['failed']:>4} failed "
+                f"{stats['throughput'] * 60:>8.1f}/min  busy {stats['utilization']:>4.0%}  "
+                f"queue {stats['queue_depth']}/{stats['queue_capacity']} "
+                f"(max {stats['queue_max_depth']}, mean {stats['queue_mean_depth']:.1f})"
+            )
+        return "\n".join(lines)
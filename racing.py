@@ -0,0 +1,96 @@
+"""
+Quorum Racing
+
+Starts several side-effect free runs at once and returns as soon as enough of
+them are good enough, instead of waiting for the slowest one.
+
+- Results are handed to an optional callback as they complete
+- A local acceptance check decides whether a result counts towards the quorum
+- A hard deadline returns whatever has finished so far
+- Stragglers are cancelled and awaited, so no tasks are left running
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+
+@dataclass
+class RaceResult:
+    """Outcome of a race; all dicts are keyed by the run's index in the race."""
+    quorum: int
+    accepted: Dict[int, Any] = field(default_factory=dict)
+    rejected: Dict[int, Any] = field(default_factory=dict)
+    failed: Dict[int, BaseException] = field(default_factory=dict)
+    cancelled: List[int] = field(default_factory=list)
+    timed_out: bool = False
+    elapsed: float = 0.0
+
+    @property
+    def quorum_met(self) -> bool:
+        return len(self.accepted) >= self.quorum
+
+    def outputs(self) -> List[Any]:
+        """Accepted results in completion order, followed by rejected ones."""
+        return list(self.accepted.values()) + list(self.rejected.values())
+
+
+async def race(
+    factories: Sequence[Callable[[], Awaitable[Any]]],
+    accept: Callable[[Any], bool] = lambda result: True,
+    quorum: int = 1,
+    deadline: Optional[float] = None,
+    on_result: Optional[Callable[[int, Any, bool], None]] = None,
+) -> RaceResult:
+    """
+    Run every factory concurrently until `quorum` results pass `accept`.
+
+    Args:
+        factories: Each creates one run when called
+        accept: Local check deciding whether a finished result is good enough
+        quorum: Accepted results needed before the stragglers are cancelled
+        deadline: Seconds after which the race stops with partial results
+        on_result: Called with (index, result, accepted) as each run finishes
+
+    Returns:
+        A RaceResult; check `quorum_met` and `timed_out` for partial results
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    tasks = {asyncio.ensure_future(factory()): index for index, factory in enumerate(factories)}
+    pending = set(tasks)
+    outcome = RaceResult(quorum=min(quorum, len(tasks)))
+
+    try:
+        while pending and not outcome.quorum_met:
+            timeout = None if deadline is None else deadline - (loop.time() - start)
+            if timeout is not None and timeout <= 0:
+                outcome.timed_out = True
+                break
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                outcome.timed_out = True
+                break
+
+            for task in sorted(done, key=tasks.get):
+                index = tasks[task]
+                if task.cancelled():
+                    outcome.failed[index] = asyncio.CancelledError()
+                    continue
+                if task.exception() is not None:
+                    outcome.failed[index] = task.exception()
+                    continue
+                result = task.result()
+                ok = accept(result)
+                (outcome.accepted if ok else outcome.rejected)[index] = result
+                if on_result is not None:
+                    on_result(index, result, ok)
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        outcome.cancelled = sorted(tasks[task] for task in pending)
+        outcome.elapsed = loop.time() - start
+
+    return outcome
@@ -0,0 +1,225 @@
+"""
+Shared Rate-Limit Scheduler
+
+One process-wide scheduler that every model call and email send passes
+through, so parallel fan-outs stay inside provider budgets instead of
+triggering 429 storms.
+
+Features:
+- Token buckets for model requests/min, model tokens/min and email sends/sec
+- FIFO waiting, so no caller is starved under contention
+- 429 handling that honours Retry-After, pauses the whole bucket and retries
+  with jittered exponential backoff
+- Queue depth and wait-time statistics per bucket
+
+Environment (unset or 0 means unlimited):
+    MODEL_RPM                   Model requests per minute
+    MODEL_TPM                   Model tokens per minute
+    EMAIL_SENDS_PER_SECOND      Emails per second (a batched request counts each recipient)
+    RATE_LIMIT_MAX_RETRIES      Retries after a 429 (default: 5)
+"""
+
+import os
+import time
+import random
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+
+# ============================================================================
+# TOKEN BUCKET
+# ============================================================================
+
+class TokenBucket:
+    """Async token bucket; `rate` is tokens per second (None for unlimited)."""
+
+    def __init__(self, rate: Optional[float], capacity: Optional[float] = None):
+        self.rate = rate if rate else None
+        self.capacity = capacity if capacity is not None else (self.rate or 0.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+        self.waiting = 0
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self, now: float) -> None:
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Wait until `amount` tokens are available and take them; returns seconds waited."""
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    if now < self.blocked_until:
+                        await asyncio.sleep(self.blocked_until - now)
+                        continue
+                    if not self.rate:
+                        break
+                    self._refill(now)
+                    # Requests larger than the burst capacity go into debt rather than waiting forever
+                    needed = min(amount, self.capacity)
+                    if self.tokens >= needed:
+                        self.tokens -= amount
+                        break
+                    await asyncio.sleep((needed - self.tokens) / self.rate)
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - start
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def adjust(self, amount: float) -> None:
+        """Take (positive) or return (negative) tokens after the fact."""
+        if self.rate:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+    def pause(self, seconds: float) -> None:
+        """Block every caller for `seconds` (used after a 429)."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queue_depth": self.waiting,
+            "acquired": self.acquired,
+            "avg_wait": self.total_wait / self.acquired if self.acquired else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+
+# ============================================================================
+# 429 DETECTION
+# ============================================================================
+
+def is_rate_limited(value: Any) -> bool:
+    """True for a 429 exception (e.g. openai.RateLimitError) or a 429 result."""
+    return getattr(value, "status_code", None) == 429
+
+
+def retry_after_seconds(value: Any) -> Optional[float]:
+    """Retry-After hint from a SendResult or an exception carrying an HTTP response."""
+    hint = getattr(value, "retry_after", None)
+    if hint is not None:
+        return hint
+    headers = getattr(getattr(value, "response", None), "headers", None) or {}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+# ============================================================================
+# SCHEDULER
+# ============================================================================
+
+class RateLimitScheduler:
+    """Process-wide budgets for model and email calls."""
+
+    def __init__(
+        self,
+        model_rpm: Optional[float] = None,
+        model_tpm: Optional[float] = None,
+        email_per_second: Optional[float] = None,
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ):
+        self.buckets = {
+            "model_requests": TokenBucket(model_rpm / 60 if model_rpm else None,
+                                          max(1.0, model_rpm / 60) if model_rpm else None),
+            "model_tokens": TokenBucket(model_tpm / 60 if model_tpm else None,
+                                        model_tpm / 60 * 10 if model_tpm else None),
+            "email_sends": TokenBucket(email_per_second,
+                                       max(1.0, email_per_second) if email_per_second else None),
+        }
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rate_limited = 0
+        self._random = random.Random()
+
+    def backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Full-jitter exponential backoff, never shorter than Retry-After."""
+        delay = self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, retry_after or 0.0)
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        costs: Dict[str, float],
+    ) -> T:
+        """
+        Run `fn` once the listed buckets allow it, retrying on 429.
+
+        Args:
+            fn: Zero-argument coroutine factory performing the request
+            costs: Tokens to take from each bucket, e.g. {"model_requests": 1}
+        """
+        attempt = 0
+        while True:
+            for name, amount in costs.items():
+                await self.buckets[name].acquire(amount)
+            try:
+                result = await fn()
+            except Exception as e:
+                if not is_rate_limited(e) or attempt >= self.max_retries:
+                    raise
+                hint = retry_after_seconds(e)
+            else:
+                if not is_rate_limited(result) or attempt >= self.max_retries:
+                    return result
+                hint = retry_after_seconds(result)
+
+            self.rate_limited += 1
+            delay = self.backoff(attempt, hint)
+            for name in costs:
+                self.buckets[name].pause(delay)
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and wait times per bucket, plus the 429 count."""
+        return {
+            "rate_limited": self.rate_limited,
+            **{name: bucket.stats() for name, bucket in self.buckets.items()},
+        }
+
+
+_scheduler: Optional[RateLimitScheduler] = None
+
+
+def get_scheduler() -> RateLimitScheduler:
+    """Return the process-wide scheduler, configured from the environment on first use."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RateLimitScheduler(
+            model_rpm=float(os.environ.get('MODEL_RPM', 0) or 0),
+            model_tpm=float(os.environ.get('MODEL_TPM', 0) or 0),
+            email_per_second=float(os.environ.get('EMAIL_SENDS_PER_SECOND', 0) or 0),
+            max_retries=int(os.environ.get('RATE_LIMIT_MAX_RETRIES', 5)),
+        )
+    return _scheduler
+
+
+def set_scheduler(scheduler: Optional[RateLimitScheduler]) -> None:
+    """Replace the process-wide scheduler (None re-reads the environment on next use)."""
+    global _scheduler
+    _scheduler = scheduler
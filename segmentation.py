@@ -0,0 +1,231 @@
+"""
+Streaming Prospect Segmentation
+
+Groups prospects with the same firmographic profile (industry and company
+size, the fields `get_company_info` returns) so a whole group can share one
+draft set instead of paying for three drafts and a selection per prospect.
+
+- Prospects are read in mini-batches; missing industry/size details are
+  filled from the company store (see company_store.py) with one batched
+  lookup per mini-batch
+- Each profile is encoded as a vector: a hashed one-hot industry and the
+  log10 of the employee count, so companies 10x apart in size are as far
+  apart as `SIZE_WEIGHT` and different industries are sqrt(2) apart
+- Clusters are assigned and updated with streaming mini-batch k-means,
+  vectorized with NumPy. A prospect farther than `radius` from every
+  cluster starts a new one (up to `max_clusters`), so the number of
+  clusters follows the data instead of being fixed up front
+- `radius` sets the granularity: 0 gives every distinct profile its own
+  cluster (most personal, most model calls), ~0.5 groups an industry's
+  companies of similar size, and above 1.5 industries merge (one set of
+  drafts for everyone)
+
+Usage:
+    segmenter = ProspectSegmenter(radius=0.5)
+    for prospect in segmenter.stream(prospects):
+        print(prospect.segment, segmenter.describe(prospect.segment))
+"""
+
+import re
+import math
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import numpy as np
+
+
+INDUSTRY_BUCKETS = 256
+SIZE_WEIGHT = 0.5  # Distance between companies 10x apart in size
+
+_NUMBER = re.compile(r"\d[\d,.]*\s*[kKmM]?\b")
+
+
+def parse_employees(size: str) -> Optional[float]:
+    """
+    Employee count from a size like "500-1000 employees", "50+", "1.2k" or "1200".
+
+    Ranges give their geometric midpoint. Returns None when there is no number.
+    """
+    counts = []
+    for match in _NUMBER.findall(size or ""):
+        text = match.strip().replace(",", "")
+        multiplier = {"k": 1e3, "m": 1e6}.get(text[-1].lower(), 1)
+        try:
+            counts.append(float(text.rstrip("kKmM")) * multiplier)
+        except ValueError:
+            continue
+    counts = [count for count in counts if count > 0]
+    if not counts:
+        return None
+    return math.sqrt(min(counts) * max(counts))
+
+
+def _industry_bucket(industry: str) -> int:
+    return zlib.crc32(industry.strip().lower().encode("utf-8")) % INDUSTRY_BUCKETS
+
+
+class ProspectSegmenter:
+    """Streaming mini-batch k-means over prospect firmographics."""
+
+    def __init__(self, radius: float = 0.5, max_clusters: int = 100, batch_size: int = 256,
+                 company_store: Any = None):
+        if radius < 0:
+            raise ValueError("radius must be >= 0")
+        self.radius = radius
+        self.max_clusters = max_clusters
+        self.batch_size = batch_size
+        self.company_store = company_store
+        # Industry buckets, log10(employees) and an unknown-size flag
+        self.dimensions = INDUSTRY_BUCKETS + 2
+        self.centers = np.zeros((0, self.dimensions))
+        self.counts = np.zeros(0)
+        self._industries: List[Counter] = []
+        self.assigned = 0
+        self.batches = 0
+        self.enriched = 0
+        self.seconds = 0.0
+
+    # ------------------------------------------------------------------------
+    # FEATURES
+    # ------------------------------------------------------------------------
+
+    def _profiles(self, prospects: List[Any]) -> List[Dict[str, str]]:
+        """Industry and size per prospect, from the prospect or else its company record."""
+        profiles = []
+        missing = []
+        for i, prospect in enumerate(prospects):
+            extra = getattr(prospect, "extra", None) or {}
+            profile = {
+                "industry": getattr(prospect, "industry", "") or "",
+                "size": extra.get("size") or extra.get("employees") or "",
+            }
+            profiles.append(profile)
+            if (not profile["industry"] or not profile["size"]) and getattr(prospect, "company", ""):
+                missing.append(i)
+
+        if missing:
+            store = self.company_store
+            if store is None:
+                from company_store import get_company_store
+                store = self.company_store = get_company_store()
+            records = store.lookup_many([prospects[i].company for i in missing])
+            for i, record in zip(missing, records):
+                if record:
+                    profiles[i]["industry"] = profiles[i]["industry"] or record.get("industry", "")
+                    profiles[i]["size"] = profiles[i]["size"] or record.get("size", "")
+                    self.enriched += 1
+        return profiles
+
+    def encode(self, profiles: List[Dict[str, str]]) -> np.ndarray:
+        """Feature matrix (one row per profile)."""
+        features = np.zeros((len(profiles), self.dimensions))
+        rows = np.arange(len(profiles))
+        buckets = [_industry_bucket(p["industry"]) if p["industry"] else -1 for p in profiles]
+        employees = np.array([parse_employees(p["size"]) or np.nan for p in profiles])
+        known = [b >= 0 for b in buckets]
+        features[rows[known], np.array(buckets)[known]] = 1.0
+        unknown_size = np.isnan(employees)
+        features[:, INDUSTRY_BUCKETS] = np.where(unknown_size, 0.0, np.log10(np.maximum(employees, 1))) * SIZE_WEIGHT
+        features[:, INDUSTRY_BUCKETS + 1] = unknown_size
+        return features
+
+    # ------------------------------------------------------------------------
+    # CLUSTERING
+    # ------------------------------------------------------------------------
+
+    def _new_cluster(self, point: np.ndarray) -> int:
+        self.centers = np.vstack([self.centers, point])
+        self.counts = np.append(self.counts, 0.0)
+        self._industries.append(Counter())
+        return len(self.counts) - 1
+
+    def assign(self, features: np.ndarray) -> np.ndarray:
+        """Cluster index per row; creates clusters for outliers and moves centers toward their members."""
+        labels = np.zeros(len(features), dtype=np.int64)
+        if len(self.centers):
+            # ||x - c||² = ||x||² - 2x·c + ||c||², one matrix product for the whole batch
+            distances = ((features ** 2).sum(axis=1)[:, None] - 2 * features @ self.centers.T
+                         + (self.centers ** 2).sum(axis=1)[None, :])
+            labels = distances.argmin(axis=1)
+            far = distances[np.arange(len(features)), labels] > self.radius ** 2
+        else:
+            far = np.ones(len(features), dtype=bool)
+
+        # Outliers one at a time, so a batch of similar newcomers starts one cluster, not many
+        for i in np.flatnonzero(far):
+            if len(self.centers):
+                distances = ((self.centers - features[i]) ** 2).sum(axis=1)
+                nearest = int(distances.argmin())
+                if distances[nearest] <= self.radius ** 2 or len(self.centers) >= self.max_clusters:
+                    labels[i] = nearest
+                    continue
+            labels[i] = self._new_cluster(features[i])
+
+        # Mini-batch k-means update: each center becomes the running mean of its members
+        batch_counts = np.bincount(labels, minlength=len(self.centers)).astype(np.float64)
+        sums = np.zeros_like(self.centers)
+        np.add.at(sums, labels, features)
+        self.counts += batch_counts
+        updated = batch_counts > 0
+        self.centers[updated] += (sums[updated] - batch_counts[updated, None] * self.centers[updated]) \
+            / self.counts[updated, None]
+        return labels
+
+    def stream(self, prospects: Iterable[Any]) -> Iterator[Any]:
+        """
+        Yield prospects in order, each with a `segment` attribute ("c0", "c1", ...).
+
+        Reads ahead at most `batch_size` prospects.
+        """
+        batch: List[Any] = []
+        for prospect in prospects:
+            batch.append(prospect)
+            if len(batch) >= self.batch_size:
+                yield from self._segment_batch(batch)
+                batch = []
+        if batch:
+            yield from self._segment_batch(batch)
+
+    def _segment_batch(self, batch: List[Any]) -> List[Any]:
+        start = time.perf_counter()
+        profiles = self._profiles(batch)
+        labels = self.assign(self.encode(profiles))
+        for prospect, profile, label in zip(batch, profiles, labels):
+            prospect.segment = f"c{label}"
+            if profile["industry"]:
+                self._industries[label][profile["industry"]] += 1
+        self.assigned += len(batch)
+        self.batches += 1
+        self.seconds += time.perf_counter() - start
+        return batch
+
+    # ------------------------------------------------------------------------
+    # CLUSTER INFORMATION
+    # ------------------------------------------------------------------------
+
+    @staticmethod
+    def segment_of(prospect: Any) -> str:
+        return getattr(prospect, "segment", "")
+
+    def describe(self, segment: str) -> str:
+        """Audience description of a cluster for the drafting prompt, e.g. "SaaS companies with about 70 employees"."""
+        index = int(segment.lstrip("c"))
+        industries = self._industries[index]
+        industry = industries.most_common(1)[0][0] if industries else ""
+        center = self.centers[index]
+        audience = f"{industry} companies" if industry else "companies"
+        if center[INDUSTRY_BUCKETS + 1] < 0.5:
+            employees = 10 ** (center[INDUSTRY_BUCKETS] / SIZE_WEIGHT)
+            audience += f" with about {float(f'{employees:.1g}'):,.0f} employees"
+        return f"decision makers at {audience}"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clusters": len(self.counts),
+            "assigned": self.assigned,
+            "batches": self.batches,
+            "enriched": self.enriched,
+            "seconds": self.seconds,
+            "members_per_cluster": self.assigned / len(self.counts) if len(self.counts) else 0.0,
+        }
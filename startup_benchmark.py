@@ -0,0 +1,184 @@
+"""
+Startup Benchmark
+
+Measures the cold-start cost of our scripts in fresh interpreters, the way a
+short-lived job container pays it:
+- Interpreter startup (launch until the first line of Python runs)
+- Import time of each script module
+- Time to first request: launch until the Sales Manager's first model call,
+  which includes building the agent graph (no request is actually sent)
+
+Each measurement runs in its own process, so nothing is served from modules
+already imported by an earlier trial. Results are JSON that can be compared
+across commits, like benchmark.py.
+
+Usage:
+    python startup_benchmark.py --trials 10
+    python startup_benchmark.py --modules automated_sdr,campaign --output startup.json
+    python startup_benchmark.py --output new.json --compare startup.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from typing import Any, Dict, List, Optional, Sequence
+
+from benchmark import summarize
+
+
+DEFAULT_MODULES = ("automated_sdr", "campaign", "tool_usage", "basic_sales_agent", "parallel_execution")
+
+# Run in the child: report seconds since launch for each startup phase. The
+# first model call raises instead of reaching the network.
+CHILD_SCRIPT = r"""
+import sys, time
+launched = float(sys.argv[1])
+started = time.time()
+import json, asyncio, importlib
+importlib.import_module(sys.argv[2])
+imported = time.time()
+result = {"startup": started - launched, "import": imported - started}
+
+if sys.argv[3] == "1":
+    from agents.models.interface import Model, ModelProvider
+    import model_replay
+
+    class FirstRequest(Exception):
+        pass
+
+    class StopModel(Model):
+        async def get_response(self, *args, **kwargs):
+            raise FirstRequest(time.time())
+
+        def stream_response(self, *args, **kwargs):
+            raise FirstRequest(time.time())
+
+    class StopProvider(ModelProvider):
+        def get_model(self, model_name):
+            return StopModel()
+
+    model_replay.set_model_provider(StopProvider())
+    from automated_sdr import run_sales_manager
+    try:
+        asyncio.run(run_sales_manager("Send out a cold sales email addressed to Dear CEO from Alice"))
+    except FirstRequest as e:
+        result["first_request"] = e.args[0] - launched
+
+print(json.dumps(result))
+"""
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def measure_once(module: str, first_request: bool = False) -> Dict[str, float]:
+    """Launch a fresh interpreter and return its startup phases in seconds."""
+    env = {**os.environ, "OPENAI_AGENTS_DISABLE_TRACING": "1", "METRICS_ENABLED": "0"}
+    env.setdefault("OPENAI_API_KEY", "startup-benchmark")
+    launched = time.time()
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, repr(launched), module, "1" if first_request else "0"],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    total = time.time() - launched
+    if completed.returncode != 0:
+        raise RuntimeError(f"{module} failed to start:\n{completed.stderr.strip()}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["total"] = total
+    return result
+
+
+def run_startup_benchmark(modules: Sequence[str] = DEFAULT_MODULES, trials: int = 10) -> Dict[str, Any]:
+    """
+    Measure import time per module, and time to first request for the SDR.
+
+    Returns:
+        Dictionary with run metadata and one result entry per module
+    """
+    results = []
+    for module in modules:
+        first_request = module == "automated_sdr"
+        print(f"⏱️  {module} ({trials} trials{', with first request' if first_request else ''})")
+        samples: Dict[str, List[float]] = {}
+        for _ in range(trials):
+            for phase, seconds in measure_once(module, first_request).items():
+                samples.setdefault(phase, []).append(seconds)
+        results.append({"module": module, **{phase: summarize(values) for phase, values in samples.items()}})
+    return {"meta": _metadata(trials), "results": results}
+
+
+def _metadata(trials: int) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "trials": trials,
+    }
+
+
+# ============================================================================
+# REPORTING
+# ============================================================================
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    """Print p50/p95 per phase, with the change in p50 import time versus a baseline."""
+    previous = {r["module"]: r for r in baseline["results"]} if baseline else {}
+
+    def cell(result: Dict[str, Any], phase: str, stat: str) -> str:
+        return f"{result[phase][stat]:.3f}s" if phase in result else "-"
+
+    print(f"\n{'='*86}")
+    print(f"{'module':<20} {'startup':>8} {'import p50':>11} {'p95':>8} "
+          f"{'1st req p50':>12} {'p95':>8} {'total p50':>10} {'vs base':>8}")
+    print(f"{'='*86}")
+    for r in report["results"]:
+        change = "-"
+        old = previous.get(r["module"])
+        if old and old["import"]["p50"] > 0:
+            change = f"{(r['import']['p50'] / old['import']['p50'] - 1) * 100:+.1f}%"
+        print(f"{r['module'][:20]:<20} {cell(r, 'startup', 'p50'):>8} {cell(r, 'import', 'p50'):>11} "
+              f"{cell(r, 'import', 'p95'):>8} {cell(r, 'first_request', 'p50'):>12} "
+              f"{cell(r, 'first_request', 'p95'):>8} {cell(r, 'total', 'p50'):>10} {change:>8}")
+    print()
+
+
+def main():
+    """Run the startup benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="Benchmark script import and time to first request")
+    parser.add_argument("--modules", default=",".join(DEFAULT_MODULES),
+                        help=f"Comma-separated modules to import (default: {','.join(DEFAULT_MODULES)})")
+    parser.add_argument("--trials", type=int, default=10, help="Fresh interpreters per module")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    args = parser.parse_args()
+
+    modules = [module.strip() for module in args.modules.split(",") if module.strip()]
+    report = run_startup_benchmark(modules, args.trials)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Adaptive Style Selection (Thompson Sampling)
+
+Decides which sales_agent styles to draft for a prospect, instead of always
+drafting all three and running a picker:
+- One Beta-Bernoulli arm per (segment, style); the segment is the
+  prospect's industry, which stays stable across campaigns (clusters from
+  segmentation.py are numbered per run)
+- Each prospect gets the style with the highest sampled reply rate, so a
+  style that keeps winning a segment is drafted almost every time while the
+  others are still tried now and then
+- With probability `explore_rate` all styles are drafted and the picker
+  chooses (full fan-out), which keeps quality control in the loop
+- Reward per send: 1 for a reply, OPEN_REWARD for an open or click. Sends
+  are kept per (campaign, recipient), so a prospect emailed again in a later
+  campaign is a new pull, and an outcome is credited to the recipient's
+  latest send unless the campaign is given
+- State is a local SQLite (WAL) file updated incrementally: a pull when an
+  email is sent, a reward when an outcome is recorded; several processes can
+  share it
+
+Steady-state cost drops from three drafts and a selection per email to about
+one draft.
+
+Environment:
+    STYLE_BANDIT_DB         SQLite file with the bandit state (default: off,
+                            every style is drafted)
+    STYLE_EXPLORE_RATE      Share of prospects that get a full fan-out (default: 0.1)
+
+Usage:
+    python campaign.py prospects.csv --pipeline --style-bandit .cache/styles.sqlite3
+    python style_bandit.py outcomes .cache/styles.sqlite3 sendgrid_events.csv replies.csv
+    python style_bandit.py outcomes .cache/styles.sqlite3 replies.csv --campaign q3-followup
+    python style_bandit.py show .cache/styles.sqlite3
+"""
+
+import os
+import csv
+import json
+import random
+import sqlite3
+import hashlib
+import argparse
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+
+OPEN_REWARD = 0.25
+OPEN_EVENTS = ("open", "click")
+REPLY_EVENTS = ("reply", "replied")
+
+
+def recipient_key(email: str) -> str:
+    return hashlib.sha256(email.strip().lower().encode("utf-8")).hexdigest()
+
+
+def segment_of(prospect: Any) -> str:
+    """Bandit segment of a prospect: its industry, or "" (everyone) when unknown."""
+    return (getattr(prospect, "industry", "") or "").strip().lower()
+
+
+class StyleBandit:
+    """Thompson sampling over draft styles, per segment, persisted in SQLite."""
+
+    def __init__(self, path: str, styles: Sequence[str], explore_rate: float = 0.1,
+                 seed: Optional[int] = None, campaign: str = ""):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.styles = tuple(styles)
+        self.explore_rate = explore_rate
+        self.campaign = campaign  # Sends are recorded under this campaign id
+        self._random = random.Random(seed)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS arms ("
+            "segment TEXT NOT NULL, style TEXT NOT NULL, pulls INTEGER NOT NULL DEFAULT 0, "
+            "reward REAL NOT NULL DEFAULT 0, PRIMARY KEY (segment, style))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sends ("
+            "campaign TEXT NOT NULL, recipient TEXT NOT NULL, segment TEXT NOT NULL, style TEXT NOT NULL, "
+            "opened INTEGER NOT NULL DEFAULT 0, replied INTEGER NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (campaign, recipient))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sends_recipient ON sends (recipient)")
+        self._db.commit()
+        self.single = 0
+        self.explored = 0
+
+    # ------------------------------------------------------------------------
+    # SELECTION
+    # ------------------------------------------------------------------------
+
+    def arms(self, segment: str) -> Dict[str, Tuple[int, float]]:
+        """(pulls, reward) per style of a segment; styles never sent have (0, 0)."""
+        arms = {style: (0, 0.0) for style in self.styles}
+        for style, pulls, reward in self._db.execute(
+            "SELECT style, pulls, reward FROM arms WHERE segment = ?", (segment,)
+        ):
+            if style in arms:
+                arms[style] = (pulls, reward)
+        return arms
+
+    def choose(self, segment: str = "") -> Tuple[str, ...]:
+        """Styles to draft for a prospect of `segment`: one, or all of them when exploring."""
+        if len(self.styles) > 1 and self._random.random() < self.explore_rate:
+            self.explored += 1
+            return self.styles
+        self.single += 1
+        samples = {
+            style: self._random.betavariate(1 + reward, 1 + max(pulls - reward, 0))
+            for style, (pulls, reward) in self.arms(segment).items()
+        }
+        return (max(samples, key=samples.get),)
+
+    # ------------------------------------------------------------------------
+    # UPDATES
+    # ------------------------------------------------------------------------
+
+    def record_send(self, email: str, segment: str, style: str) -> None:
+        """Count a pull for the style an email was sent with; a re-send in the same campaign is not counted."""
+        with self._db:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO sends (campaign, recipient, segment, style) VALUES (?, ?, ?, ?)",
+                (self.campaign, recipient_key(email), segment, style),
+            )
+            if cursor.rowcount:
+                self._db.execute(
+                    "INSERT INTO arms (segment, style, pulls) VALUES (?, ?, 1) "
+                    "ON CONFLICT (segment, style) DO UPDATE SET pulls = pulls + 1",
+                    (segment, style),
+                )
+
+    def record_outcome(self, email: str, event: str, campaign: Optional[str] = None) -> bool:
+        """
+        Credit an open/click or reply to the style the recipient was sent.
+
+        Each send earns at most OPEN_REWARD for opening and 1 in total once it
+        is replied to, however many events arrive. The send is the one in
+        `campaign`, or the recipient's latest send when it is None.
+
+        Returns:
+            True if the event changed the reward
+        """
+        event = event.strip().lower()
+        if event not in OPEN_EVENTS + REPLY_EVENTS:
+            return False
+        key = recipient_key(email)
+        query = "SELECT rowid, segment, style, opened, replied FROM sends WHERE recipient = ?"
+        params: Tuple[str, ...] = (key,)
+        if campaign is not None:
+            query += " AND campaign = ?"
+            params += (campaign,)
+        with self._db:
+            row = self._db.execute(query + " ORDER BY rowid DESC LIMIT 1", params).fetchone()
+            if row is None:
+                return False
+            rowid, segment, style, opened, replied = row
+            if replied or (opened and event in OPEN_EVENTS):
+                return False
+            if event in OPEN_EVENTS:
+                reward, columns = OPEN_REWARD, "opened = 1"
+            else:
+                reward, columns = 1.0 - (OPEN_REWARD if opened else 0.0), "opened = 1, replied = 1"
+            self._db.execute(f"UPDATE sends SET {columns} WHERE rowid = ?", (rowid,))
+            self._db.execute("UPDATE arms SET reward = reward + ? WHERE segment = ? AND style = ?",
+                             (reward, segment, style))
+        return True
+
+    def record_outcomes(self, events: Iterable[Tuple[str, str]], campaign: Optional[str] = None) -> int:
+        """Record (email, event) pairs; returns how many changed a reward."""
+        return sum(self.record_outcome(email, event, campaign) for email, event in events)
+
+    # ------------------------------------------------------------------------
+    # STATISTICS
+    # ------------------------------------------------------------------------
+
+    def summary(self, samples: int = 2000) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Per segment and style: pulls, reward, mean reward and the probability of being the best style."""
+        segments: Dict[str, Dict[str, Tuple[int, float]]] = {}
+        for segment, style, pulls, reward in self._db.execute(
+            "SELECT segment, style, pulls, reward FROM arms ORDER BY segment, style"
+        ):
+            segments.setdefault(segment, {})[style] = (pulls, reward)
+        result = {}
+        for segment, arms in segments.items():
+            wins = dict.fromkeys(arms, 0)
+            for _ in range(samples):
+                draws = {style: self._random.betavariate(1 + reward, 1 + max(pulls - reward, 0))
+                         for style, (pulls, reward) in arms.items()}
+                wins[max(draws, key=draws.get)] += 1
+            result[segment] = {
+                style: {"pulls": pulls, "reward": reward, "mean": (1 + reward) / (2 + pulls),
+                        "p_best": wins[style] / samples}
+                for style, (pulls, reward) in arms.items()
+            }
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        choices = self.single + self.explored
+        drafts = self.single + self.explored * len(self.styles)
+        return {
+            "single": self.single,
+            "explored": self.explored,
+            "drafts_per_email": drafts / choices if choices else 0.0,
+        }
+
+    def close(self) -> None:
+        self._db.close()
+
+
+_bandit: Optional[StyleBandit] = None
+_configured = False
+
+
+def get_style_bandit() -> Optional[StyleBandit]:
+    """The bandit in STYLE_BANDIT_DB over the SDR's draft styles, or None when not configured."""
+    global _bandit, _configured
+    if not _configured:
+        _configured = True
+        path = os.environ.get('STYLE_BANDIT_DB')
+        if path:
+            from automated_sdr import DRAFT_AGENTS
+            _bandit = StyleBandit(path, DRAFT_AGENTS, float(os.environ.get('STYLE_EXPLORE_RATE', 0.1)))
+    return _bandit
+
+
+def set_style_bandit(bandit: Optional[StyleBandit]) -> None:
+    global _bandit, _configured
+    _bandit = bandit
+    _configured = True
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def read_events(path: str) -> Iterator[Tuple[str, str]]:
+    """(email, event) pairs from a CSV with email/event columns or SendGrid event JSON (lines or array)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            for row in csv.DictReader(f):
+                row = {str(key).strip().lower(): (value or "") for key, value in row.items()}
+                yield row.get("email", ""), row.get("event", "")
+            return
+        text = f.read().strip()
+    records = json.loads(text) if text.startswith("[") else [json.loads(line) for line in text.splitlines() if line.strip()]
+    for record in records:
+        yield record.get("email", ""), record.get("event", "")
+
+
+def main():
+    """Record outcomes into, and inspect, a style bandit from the command line."""
+    from automated_sdr import DRAFT_AGENTS
+
+    parser = argparse.ArgumentParser(description="Manage the adaptive style selector")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    outcomes = commands.add_parser("outcomes", help="Credit opens, clicks and replies to the styles that earned them")
+    outcomes.add_argument("db")
+    outcomes.add_argument("files", nargs="+", help="CSV (email,event) or SendGrid event webhook JSON files")
+    outcomes.add_argument("--campaign", help="Credit sends of this campaign (default: each recipient's latest send)")
+
+    show = commands.add_parser("show", help="Show pulls, rewards and win probabilities per segment")
+    show.add_argument("db")
+
+    args = parser.parse_args()
+    bandit = StyleBandit(args.db, DRAFT_AGENTS)
+    try:
+        if args.command == "outcomes":
+            recorded = sum(bandit.record_outcomes(read_events(path), args.campaign) for path in args.files)
+            print(f"✅ Recorded {recorded:,} outcomes")
+        else:
+            for segment, arms in bandit.summary().items():
+                print(f"🎯 {segment or '(all prospects)'}")
+                for style, arm in arms.items():
+                    print(f"   {style:<14} {arm['pulls']:>7} sent  reward {arm['reward']:>8.2f}  "
+                          f"mean {arm['mean']:.3f}  P(best) {arm['p_best']:.0%}")
+    finally:
+        bandit.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Batched Subject Line Generation
+
+Writes subjects for many email bodies with a single structured-output model
+call instead of one subject_writer round trip per email.
+
+- `generate_subjects()` takes N bodies and returns N subjects (None where the
+  model skipped or failed an email), chunked to stay within context limits
+- `SubjectBatcher` coalesces concurrent subject requests (e.g. from many
+  campaign prospects) into those batched calls
+"""
+
+import asyncio
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from pydantic import BaseModel
+from agents import Agent
+
+from agent_runtime import run_agent
+
+
+BATCH_SUBJECT_INSTRUCTIONS = """You write subjects for cold sales emails. \
+You are given several numbered emails. For each email, write a subject that is likely to get a response. \
+Return exactly one subject per email, using the email's number as its index."""
+
+
+class BatchSubject(BaseModel):
+    index: int
+    subject: str
+
+
+class SubjectBatch(BaseModel):
+    subjects: List[BatchSubject]
+
+
+batch_subject_writer = Agent(
+    name="Batch Email Subject Writer",
+    instructions=BATCH_SUBJECT_INSTRUCTIONS,
+    output_type=SubjectBatch,
+    model="gpt-4o-mini"
+)
+
+
+# ============================================================================
+# BATCH API
+# ============================================================================
+
+def chunk_bodies(bodies: List[str], max_items: int = 25, max_chars: int = 24000) -> Iterator[List[int]]:
+    """Yield lists of body indexes whose combined size fits one model call."""
+    chunk: List[int] = []
+    size = 0
+    for index, body in enumerate(bodies):
+        if chunk and (len(chunk) >= max_items or size + len(body) > max_chars):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(index)
+        size += len(body)
+    if chunk:
+        yield chunk
+
+
+async def _subjects_for_chunk(bodies: List[str]) -> Dict[int, str]:
+    """One structured-output call for a chunk; returns subjects by chunk-local index."""
+    prompt = "\n\n".join(f"### Email {i}\n{body}" for i, body in enumerate(bodies))
+    result = await run_agent(batch_subject_writer, prompt, hedge=True)
+    subjects = {}
+    for item in result.final_output.subjects:
+        subject = item.subject.strip()
+        if 0 <= item.index < len(bodies) and subject:
+            subjects[item.index] = subject
+    return subjects
+
+
+async def generate_subjects(
+    bodies: List[str],
+    max_items: int = 25,
+    max_chars: int = 24000,
+) -> List[Optional[str]]:
+    """
+    Write a subject for every body using as few model calls as possible.
+
+    Args:
+        bodies: Email bodies
+        max_items: Maximum emails per model call
+        max_chars: Maximum combined body length per model call
+
+    Returns:
+        Subjects aligned with `bodies`; None for any email whose chunk failed
+        or that the model left out, so callers can fall back per email
+    """
+    subjects: List[Optional[str]] = [None] * len(bodies)
+    chunks = list(chunk_bodies(bodies, max_items, max_chars))
+    results = await asyncio.gather(
+        *[_subjects_for_chunk([bodies[i] for i in chunk]) for chunk in chunks],
+        return_exceptions=True,
+    )
+    for chunk, result in zip(chunks, results):
+        if isinstance(result, Exception):
+            print(f"⚠️  Subject batch of {len(chunk)} failed: {result}")
+            continue
+        for local_index, subject in result.items():
+            subjects[chunk[local_index]] = subject
+    return subjects
+
+
+# ============================================================================
+# COALESCING
+# ============================================================================
+
+class SubjectBatcher:
+    """Collects subject requests for a short window and answers them in batches."""
+
+    def __init__(self, max_latency: float = 0.25, max_items: int = 25, max_chars: int = 24000):
+        self.max_latency = max_latency
+        self.max_items = max_items
+        self.max_chars = max_chars
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    async def submit(self, body: str) -> Optional[str]:
+        """Queue one body; returns its subject, or None if the batch couldn't produce one."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((body, future))
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_latency, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._answer(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _answer(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            subjects = await generate_subjects([body for body, _ in batch], self.max_items, self.max_chars)
+        except Exception:
+            subjects = [None] * len(batch)
+        for (_, future), subject in zip(batch, subjects):
+            if not future.done():
+                future.set_result(subject)
+
+    async def aclose(self) -> None:
+        """Answer anything still queued and wait for in-flight batches."""
+        self._flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+
+_batcher: Optional[SubjectBatcher] = None
+
+
+def get_subject_batcher() -> Optional[SubjectBatcher]:
+    """The active batcher, set while a campaign is running."""
+    return _batcher
+
+
+def set_subject_batcher(batcher: Optional[SubjectBatcher]) -> None:
+    global _batcher
+    _batcher = batcher
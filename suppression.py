@@ -0,0 +1,398 @@
+"""
+Suppression Index
+
+Answers "may we email this address?" for unsubscribe, bounce and
+already-contacted lists with tens of millions of entries, before any tokens
+are spent on a prospect.
+
+Layout (one directory):
+- A sorted array of 64-bit address hashes, memory-mapped, so startup is
+  instant and lookups are an O(log n) binary search touching a few pages
+- An optional Bloom filter in front of it, so most non-suppressed addresses
+  are answered with a handful of bit probes
+- An append-only delta file for incremental additions; `compact()` merges it
+  into a new sorted array and swaps it in atomically. Additions are fsynced
+  per call, or, with `add(..., sync=False)`, once by `sync()` for a whole
+  batch (they reach the OS at once, so only a machine crash can lose them)
+
+Addresses are normalised (trimmed, lower-cased) and hashed with BLAKE2b, so
+the index holds no plain addresses.
+
+Environment:
+    SUPPRESSION_INDEX   Directory of the index consulted by the SDR (default: off)
+
+Usage:
+    python suppression.py build .cache/suppression unsubscribes.csv bounces.txt
+    python suppression.py add .cache/suppression contacted.csv
+    python suppression.py compact .cache/suppression
+    python suppression.py check .cache/suppression someone@example.com
+"""
+
+import os
+import csv
+import json
+import hashlib
+import argparse
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import numpy as np
+
+
+META_FILE = "meta.json"
+DELTA_FILE = "delta.u64"
+HASH_DTYPE = np.dtype("<u8")
+CHUNK_SIZE = 1_000_000
+
+
+class SuppressedError(RuntimeError):
+    """Raised when the SDR is asked to work on a suppressed address."""
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def email_hash(email: str) -> int:
+    """64-bit hash of a normalised address."""
+    digest = hashlib.blake2b(normalize_email(email).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def hash_emails(emails: Iterable[str]) -> np.ndarray:
+    return np.fromiter((email_hash(email) for email in emails), dtype=HASH_DTYPE)
+
+
+def read_addresses(path: str) -> Iterator[str]:
+    """Addresses from a CSV with an `email` column, or a file with one address per line."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            for row in csv.DictReader(f):
+                email = {str(key).strip().lower(): value for key, value in row.items()}.get("email")
+                if email and email.strip():
+                    yield email
+        else:
+            for line in f:
+                if line.strip() and not line.startswith("#"):
+                    yield line
+
+
+# ============================================================================
+# BLOOM FILTER
+# ============================================================================
+
+class BloomFilter:
+    """Bloom filter over precomputed 64-bit hashes, using double hashing for the probes."""
+
+    def __init__(self, bits: np.ndarray, num_hashes: int):
+        self.bits = bits
+        self.num_bits = len(bits) * 8
+        self.num_hashes = num_hashes
+        self._steps = np.arange(num_hashes, dtype=np.uint64)
+
+    @classmethod
+    def for_capacity(cls, count: int, bits_per_item: int = 10) -> "BloomFilter":
+        num_bits = max(64, count * bits_per_item)
+        num_hashes = max(1, round(bits_per_item * 0.693))
+        return cls(np.zeros((num_bits + 7) // 8, dtype=np.uint8), num_hashes)
+
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        first = hashes & np.uint64(0xFFFFFFFF)
+        second = (hashes >> np.uint64(32)) | np.uint64(1)
+        return (first[:, None] + self._steps[None, :] * second[:, None]) % np.uint64(self.num_bits)
+
+    def add(self, hashes: np.ndarray) -> None:
+        positions = self._positions(hashes).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3),
+                         (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+
+    def might_contain(self, hashes: np.ndarray) -> np.ndarray:
+        """Boolean array; False means definitely absent."""
+        positions = self._positions(hashes)
+        probes = self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)
+        return (probes & 1).all(axis=1)
+
+    def might_contain_one(self, value: int) -> bool:
+        """Scalar version of `might_contain`, avoiding array overhead for single lookups."""
+        bits, num_bits = self.bits, self.num_bits
+        first, second = value & 0xFFFFFFFF, (value >> 32) | 1
+        for step in range(self.num_hashes):
+            position = (first + step * second) % num_bits
+            if not (bits[position >> 3] >> (position & 7)) & 1:
+                return False
+        return True
+
+    def false_positive_rate(self, count: int) -> float:
+        if not count:
+            return 0.0
+        return (1 - np.exp(-self.num_hashes * count / self.num_bits)) ** self.num_hashes
+
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+class SuppressionIndex:
+    """Memory-mapped sorted hash array + Bloom filter + append-only delta."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._delta_file = None
+        self._unsynced = False
+        self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load(self) -> None:
+        meta_path = self._path(META_FILE)
+        self.meta: Dict[str, Any] = {"generation": 0, "count": 0}
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                self.meta = json.load(f)
+
+        count = self.meta["count"]
+        if count:
+            self._hashes = np.memmap(self._path(self.meta["hashes"]), dtype=HASH_DTYPE, mode="r", shape=(count,))
+        else:
+            self._hashes = np.zeros(0, dtype=HASH_DTYPE)
+
+        self.bloom: Optional[BloomFilter] = None
+        if self.meta.get("bloom"):
+            bits = np.memmap(self._path(self.meta["bloom"]), dtype=np.uint8, mode="r")
+            self.bloom = BloomFilter(bits, self.meta["bloom_hashes"])
+
+        delta_path = self._path(DELTA_FILE)
+        self._delta = set()
+        if os.path.exists(delta_path):
+            # Ignore a torn trailing write from a crash mid-append
+            usable = os.path.getsize(delta_path) // HASH_DTYPE.itemsize
+            self._delta = set(np.fromfile(delta_path, dtype=HASH_DTYPE, count=usable).tolist())
+
+    def __len__(self) -> int:
+        return len(self._hashes) + len(self._delta)
+
+    # ------------------------------------------------------------------------
+    # LOOKUPS
+    # ------------------------------------------------------------------------
+
+    def _in_base(self, value: int) -> bool:
+        if self.bloom is not None and not self.bloom.might_contain_one(value):
+            return False
+        position = int(np.searchsorted(self._hashes, np.uint64(value)))
+        return position < len(self._hashes) and int(self._hashes[position]) == value
+
+    def __contains__(self, email: str) -> bool:
+        value = email_hash(email)
+        return value in self._delta or self._in_base(value)
+
+    def contains_many(self, emails: List[str]) -> np.ndarray:
+        """Vectorized membership test; returns a boolean array aligned with `emails`."""
+        return self._contains_hashes(hash_emails(emails))
+
+    def _contains_hashes(self, hashes: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(hashes), dtype=bool)
+        if self._delta:
+            found |= np.isin(hashes, np.fromiter(self._delta, dtype=HASH_DTYPE, count=len(self._delta)))
+        candidates = ~found
+        if self.bloom is not None and candidates.any():
+            candidates[candidates] = self.bloom.might_contain(hashes[candidates])
+        if len(self._hashes) and candidates.any():
+            probe = hashes[candidates]
+            positions = np.minimum(np.searchsorted(self._hashes, probe), len(self._hashes) - 1)
+            found[candidates] = self._hashes[positions] == probe
+        return found
+
+    # ------------------------------------------------------------------------
+    # UPDATES
+    # ------------------------------------------------------------------------
+
+    def add(self, emails: Iterable[str], sync: bool = True) -> int:
+        """
+        Append addresses to the delta; returns how many were new.
+
+        With `sync=False` the append is written but not fsynced; call `sync()`
+        once the batch is done (e.g. at the end of a campaign).
+        """
+        hashes = np.unique(hash_emails(emails))
+        added = hashes[~self._contains_hashes(hashes)].tolist()
+        if added:
+            if self._delta_file is None:
+                self._delta_file = open(self._path(DELTA_FILE), "ab")
+            np.asarray(added, dtype=HASH_DTYPE).tofile(self._delta_file)
+            self._delta_file.flush()
+            self._unsynced = True
+            self._delta.update(added)
+            if sync:
+                self.sync()
+        return len(added)
+
+    def sync(self) -> None:
+        """fsync delta appends made with `sync=False`."""
+        if self._unsynced and self._delta_file is not None:
+            os.fsync(self._delta_file.fileno())
+        self._unsynced = False
+
+    def close(self) -> None:
+        """Sync pending appends and close the delta file."""
+        self.sync()
+        if self._delta_file is not None:
+            self._delta_file.close()
+            self._delta_file = None
+
+    def compact(self, bloom_bits_per_item: Optional[int] = None) -> None:
+        """Merge the delta into a new sorted array and Bloom filter, then swap them in."""
+        if bloom_bits_per_item is None:
+            bloom_bits_per_item = self.meta.get("bloom_bits_per_item", 10)
+        delta = np.fromiter(self._delta, dtype=HASH_DTYPE, count=len(self._delta))
+        merged = np.union1d(np.asarray(self._hashes), delta).astype(HASH_DTYPE)
+        self._write_generation(merged, bloom_bits_per_item)
+
+    @classmethod
+    def build(cls, directory: str, emails: Iterable[str], bloom_bits_per_item: int = 10) -> "SuppressionIndex":
+        """Build (or rebuild) an index from scratch, hashing addresses in chunks."""
+        chunks = []
+        batch: List[str] = []
+        for email in emails:
+            batch.append(email)
+            if len(batch) >= CHUNK_SIZE:
+                chunks.append(np.unique(hash_emails(batch)))
+                batch = []
+        if batch:
+            chunks.append(np.unique(hash_emails(batch)))
+        hashes = np.unique(np.concatenate(chunks)) if chunks else np.zeros(0, dtype=HASH_DTYPE)
+
+        index = cls(directory)
+        index._delta = set()
+        index._write_generation(hashes.astype(HASH_DTYPE), bloom_bits_per_item)
+        return index
+
+    def _write_generation(self, hashes: np.ndarray, bloom_bits_per_item: int) -> None:
+        """Write new files, then atomically point meta.json at them."""
+        generation = self.meta.get("generation", 0) + 1
+        old_files = [self.meta.get("hashes"), self.meta.get("bloom")]
+        meta: Dict[str, Any] = {
+            "generation": generation,
+            "count": int(len(hashes)),
+            "hashes": f"hashes-{generation}.u64",
+            "bloom": None,
+            "bloom_bits_per_item": bloom_bits_per_item,
+        }
+        hashes.tofile(self._path(meta["hashes"]))
+
+        if bloom_bits_per_item > 0 and len(hashes):
+            bloom = BloomFilter.for_capacity(len(hashes), bloom_bits_per_item)
+            for start in range(0, len(hashes), CHUNK_SIZE):
+                bloom.add(hashes[start:start + CHUNK_SIZE])
+            meta["bloom"] = f"bloom-{generation}.bits"
+            meta["bloom_hashes"] = bloom.num_hashes
+            bloom.bits.tofile(self._path(meta["bloom"]))
+
+        temp = self._path(META_FILE + ".tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self._path(META_FILE))
+
+        # Delta entries are now in the base; a crash before this only leaves duplicates
+        self.close()
+        open(self._path(DELTA_FILE), "wb").close()
+        self._hashes = None
+        self.bloom = None
+        for name in old_files:
+            if name and os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+        self._load()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._hashes),
+            "delta": len(self._delta),
+            "bytes": len(self._hashes) * HASH_DTYPE.itemsize,
+            "bloom_bytes": len(self.bloom.bits) if self.bloom is not None else 0,
+            "bloom_false_positive_rate": (self.bloom.false_positive_rate(len(self._hashes))
+                                          if self.bloom is not None else None),
+        }
+
+
+# ============================================================================
+# SHARED INDEX
+# ============================================================================
+
+_index: Optional[SuppressionIndex] = None
+_configured = False
+
+
+def get_suppression_index() -> Optional[SuppressionIndex]:
+    """The index in SUPPRESSION_INDEX, or None when suppression is not configured."""
+    global _index, _configured
+    if not _configured:
+        _configured = True
+        directory = os.environ.get('SUPPRESSION_INDEX')
+        if directory:
+            _index = SuppressionIndex(directory)
+    return _index
+
+
+def set_suppression_index(index: Optional[SuppressionIndex]) -> None:
+    global _index, _configured
+    _index = index
+    _configured = True
+
+
+# ============================================================================
+# COMMAND LINE
+# ============================================================================
+
+def _addresses(paths: List[str]) -> Iterator[str]:
+    for path in paths:
+        yield from read_addresses(path)
+
+
+def main():
+    """Build, update and query a suppression index from the command line."""
+    parser = argparse.ArgumentParser(description="Manage the suppression index")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Build the index from address files, replacing it")
+    build.add_argument("index")
+    build.add_argument("files", nargs="+", help="CSV files with an 'email' column or one address per line")
+    build.add_argument("--bloom-bits", type=int, default=10, help="Bloom filter bits per address; 0 disables")
+
+    add = commands.add_parser("add", help="Append addresses to the index's delta")
+    add.add_argument("index")
+    add.add_argument("files", nargs="+")
+
+    compact = commands.add_parser("compact", help="Merge the delta into the sorted array")
+    compact.add_argument("index")
+
+    check = commands.add_parser("check", help="Check whether addresses are suppressed")
+    check.add_argument("index")
+    check.add_argument("emails", nargs="+")
+
+    stats = commands.add_parser("stats", help="Show index size and Bloom filter accuracy")
+    stats.add_argument("index")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = SuppressionIndex.build(args.index, _addresses(args.files), args.bloom_bits)
+        print(f"✅ Built {args.index} with {len(index):,} addresses")
+    elif args.command == "add":
+        added = SuppressionIndex(args.index).add(_addresses(args.files))
+        print(f"✅ Added {added:,} new addresses")
+    elif args.command == "compact":
+        index = SuppressionIndex(args.index)
+        index.compact()
+        print(f"✅ Compacted {args.index}: {len(index):,} addresses")
+    elif args.command == "check":
+        index = SuppressionIndex(args.index)
+        for email, suppressed in zip(args.emails, index.contains_many(args.emails)):
+            print(f"{'🚫 suppressed' if suppressed else '✅ ok':<14} {email}")
+    else:
+        print(json.dumps(SuppressionIndex(args.index).stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
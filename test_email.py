@@ -6,9 +6,18 @@ API key and sender authentication are correctly configured.
 """
 
 import os
+import asyncio
 from dotenv import load_dotenv
-import sendgrid
-from sendgrid.helpers.mail import Mail, Email, To, Content
+
+from email_transport import EmailMessage, get_transport, close_transport
+
+
+async def _send(message: EmailMessage):
+    """Send through the shared transport and release its connections."""
+    try:
+        return await get_transport().send(message)
+    finally:
+        await close_transport()
 
 
 def send_test_email():
@@ -36,20 +45,16 @@ def send_test_email():
         return False
     
     try:
-        # Initialize SendGrid client
-        sg = sendgrid.SendGridAPIClient(api_key=api_key)
-        
         # Create email
-        from_email = Email(sender_email)
-        to_email = To(recipient_email)
-        subject = "Test Email - SendGrid Configuration"
-        content = Content("text/plain", 
-                         "This is a test email to verify your SendGrid configuration is working correctly.")
-        
-        mail = Mail(from_email, to_email, subject, content).get()
+        message = EmailMessage(
+            sender=sender_email,
+            recipient=recipient_email,
+            subject="Test Email - SendGrid Configuration",
+            content="This is a test email to verify your SendGrid configuration is working correctly.",
+        )
         
-        # Send email
-        response = sg.client.mail.send.post(request_body=mail)
+        # Send email through the shared async transport
+        response = asyncio.run(_send(message))
         
         # Check response
         if response.status_code == 202:
@@ -61,6 +66,8 @@ def send_test_email():
             return True
         else:
             print(f"⚠️  Unexpected status code: {response.status_code}")
+            if response.body:
+                print(f"   Response: {response.body[:200]}")
             return False
             
     except Exception as e:
@@ -0,0 +1,113 @@
+"""
+Function Tool Memoization
+
+Caches the results of pure function tools so repeated calls with the same
+arguments (across turns and prospects) skip the work. Apply it underneath
+`@function_tool`:
+
+    @function_tool
+    @memoize_tool(ttl=3600)
+    def get_company_info(company_name: str) -> Dict[str, str]:
+        ...
+
+- Keys are the tool name plus its canonicalized arguments (defaults applied,
+  keys sorted, run context excluded)
+- Entries expire after `ttl` seconds and the memory tier is an LRU bounded by
+  `max_entries` (storage is a DraftCache, see draft_cache.py)
+- With TOOL_CACHE_DIR set, results are also shared on disk across processes
+- Tools marked with `@side_effects` (sending email, notifications, ...) can
+  never be memoized
+- Per-tool hit/miss counters are available from `tool_cache_stats()`
+
+Environment:
+    TOOL_CACHE_DIR      Also store results on disk in this directory (default: memory only)
+"""
+
+import os
+import json
+import inspect
+import functools
+from typing import Any, Callable, Dict
+from agents import RunContextWrapper
+
+from draft_cache import DraftCache
+
+
+_caches: Dict[str, DraftCache] = {}
+
+
+def side_effects(func: Callable) -> Callable:
+    """Mark a tool as having side effects, so it can never be memoized."""
+    func.__side_effects__ = True
+    return func
+
+
+def _canonical_key(name: str, signature: inspect.Signature, args: tuple, kwargs: dict) -> str:
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = {
+        key: value for key, value in bound.arguments.items()
+        if not isinstance(value, RunContextWrapper)
+    }
+    return json.dumps([name, arguments], sort_keys=True, separators=(",", ":"), default=str)
+
+
+def memoize_tool(ttl: float = 3600, max_entries: int = 1024, shared: bool = True) -> Callable:
+    """
+    Cache a pure tool's JSON-serializable results.
+
+    Args:
+        ttl: Seconds a result stays valid
+        max_entries: Memory tier size
+        shared: Also use the on-disk tier when TOOL_CACHE_DIR is set
+
+    Raises:
+        ValueError: If the function is marked with `@side_effects`
+    """
+
+    def decorate(func: Callable) -> Callable:
+        if getattr(func, "__side_effects__", False):
+            raise ValueError(f"{func.__name__} has side effects and must not be memoized")
+
+        name = func.__name__
+        directory = os.environ.get('TOOL_CACHE_DIR') if shared else None
+        cache = DraftCache(os.path.join(directory, name) if directory else None,
+                           ttl=ttl, max_entries=max_entries)
+        _caches[name] = cache
+        signature = inspect.signature(func)
+
+        def store(key: str, result: Any) -> Any:
+            try:
+                cache.put(key, json.dumps(result))
+            except TypeError:
+                pass  # Not JSON-serializable: return it uncached
+            return result
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                key = _canonical_key(name, signature, args, kwargs)
+                cached = cache.get(key)
+                if cached is not None:
+                    return json.loads(cached)
+                return store(key, await func(*args, **kwargs))
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            key = _canonical_key(name, signature, args, kwargs)
+            cached = cache.get(key)
+            if cached is not None:
+                return json.loads(cached)
+            return store(key, func(*args, **kwargs))
+
+        return wrapper
+
+    return decorate
+
+
+def tool_cache_stats() -> Dict[str, Dict[str, float]]:
+    """Hit/miss counters per memoized tool."""
+    return {name: cache.stats() for name, cache in _caches.items()}
+
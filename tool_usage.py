@@ -4,14 +4,22 @@ Tool Usage Examples
 This script demonstrates various patterns for creating and using tools
 with the OpenAI Agents SDK, including:
 - Function tools with the @function_tool decorator
+- Batch tools that evaluate many items in one call (NumPy portfolio ROI)
+- Memoized pure tools (see tool_cache.py)
 - Converting agents to tools
 - Tool integration patterns
+
+Tools and agents are declared in the agent registry (see agent_registry.py)
+and built on first use, so importing this module doesn't import the SDK.
 """
 
 import asyncio
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
+import numpy as np
 from dotenv import load_dotenv
-from agents import Agent, Runner, trace, function_tool
+
+from agent_registry import AgentSpec, AgentToolSpec, registry
+from company_store import get_company_store
 
 
 load_dotenv(override=True)
@@ -21,90 +29,254 @@ load_dotenv(override=True)
 # EXAMPLE 1: Basic Function Tools
 # ============================================================================
 
-@function_tool
-def calculate_roi(investment: float, return_amount: float) -> Dict[str, float]:
-    """Calculate return on investment (ROI) percentage."""
-    roi = ((return_amount - investment) / investment) * 100
+def evaluate_roi_portfolio(
+    investments: List[float],
+    returns: List[float],
+    names: Optional[List[str]] = None,
+    horizon_months: Optional[List[float]] = None,
+    min_roi_percentage: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Vectorized ROI, profit, payback and ranking for a list of deals.
+    
+    Payback assumes the return arrives evenly over the deal's horizon.
+    Deals with a non-positive investment get no ROI and are ranked last.
+    """
+    invest = np.asarray(investments, dtype=np.float64)
+    ret = np.asarray(returns, dtype=np.float64)
+    if invest.shape != ret.shape or invest.ndim != 1:
+        return {"error": "investments and returns must be lists of the same length"}
+    if names is not None and len(names) != len(invest):
+        return {"error": "names must have one entry per deal"}
+    if horizon_months is not None and len(horizon_months) != len(invest):
+        return {"error": "horizon_months must have one entry per deal"}
+    
+    valid = invest > 0
+    profit = ret - invest
+    roi = np.divide(profit, invest, out=np.full_like(invest, np.nan), where=valid) * 100
+    order = np.argsort(np.where(valid, -roi, np.inf), kind="stable")
+    rank = np.empty(len(invest), dtype=np.int64)
+    rank[order] = np.arange(1, len(invest) + 1)
+    
+    payback = annualized = None
+    if horizon_months is not None:
+        months = np.asarray(horizon_months, dtype=np.float64)
+        paying = valid & (ret > 0) & (months > 0)
+        # Deals returning less than they cost never pay back
+        payback = np.where(paying & (ret >= invest), invest * months / np.where(paying, ret, 1), np.nan)
+        growth = np.divide(ret, invest, out=np.ones_like(invest), where=paying)
+        exponent = np.divide(12, months, out=np.zeros_like(months), where=paying)
+        annualized = np.where(paying, (growth ** exponent - 1) * 100, np.nan)
+    
+    passes = valid if min_roi_percentage is None else valid & (roi > min_roi_percentage)
+    
+    def column(array):
+        # Rounded, in rank order, with NaN as None (JSON null)
+        if array is None:
+            return [None] * len(order)
+        return [None if v != v else v for v in np.round(array[order], 2).tolist()]
+    
+    labels = names if names is not None else [f"Deal {i + 1}" for i in range(len(invest))]
+    deals = [
+        {
+            "name": labels[i],
+            "investment": investment,
+            "return": amount,
+            "profit": gain,
+            "roi_percentage": roi_value,
+            "annualized_roi_percentage": annualized_value,
+            "payback_months": payback_value,
+            "rank": position,
+            "meets_threshold": qualifies,
+        }
+        for i, investment, amount, gain, roi_value, annualized_value, payback_value, position, qualifies in zip(
+            order.tolist(), invest[order].tolist(), ret[order].tolist(), column(profit), column(roi),
+            column(annualized), column(payback), rank[order].tolist(), passes[order].tolist(),
+        )
+    ]
+    total_invest, total_return = float(invest[valid].sum()), float(ret[valid].sum())
     return {
-        "investment": investment,
-        "return": return_amount,
-        "roi_percentage": round(roi, 2),
-        "profit": round(return_amount - investment, 2)
+        "deals": deals,
+        "qualifying": [deal["name"] for deal in deals if deal["meets_threshold"]],
+        "total_investment": total_invest,
+        "total_return": total_return,
+        "portfolio_roi_percentage": round((total_return - total_invest) / total_invest * 100, 2)
+        if total_invest > 0 else None,
     }
 
 
-@function_tool
-def get_company_info(company_name: str) -> Dict[str, str]:
-    """Get mock company information (in production, this would query a real database)."""
-    # Mock data for demonstration
-    companies = {
-        "acme": {
-            "name": "Acme Corp",
-            "industry": "Technology",
-            "size": "500-1000 employees",
-            "website": "acme.com"
-        },
-        "techstart": {
-            "name": "TechStart Inc",
-            "industry": "SaaS",
-            "size": "50-100 employees",
-            "website": "techstart.io"
+# Tool factories: the SDK decorators run when an agent first needs the tool
+
+def _calculate_roi_tool():
+    from agents import function_tool
+    from tool_cache import memoize_tool
+
+    @function_tool
+    @memoize_tool(ttl=24 * 3600)
+    def calculate_roi(investment: float, return_amount: float) -> Dict[str, float]:
+        """Calculate return on investment (ROI) percentage."""
+        roi = ((return_amount - investment) / investment) * 100
+        return {
+            "investment": investment,
+            "return": return_amount,
+            "roi_percentage": round(roi, 2),
+            "profit": round(return_amount - investment, 2)
         }
-    }
-    
-    company_key = company_name.lower().replace(" ", "")
-    return companies.get(company_key, {"error": "Company not found"})
 
+    return calculate_roi
+
+
+def _calculate_portfolio_roi_tool():
+    from agents import function_tool
+    from tool_cache import memoize_tool
+
+    @function_tool
+    @memoize_tool(ttl=24 * 3600, max_entries=256)
+    def calculate_portfolio_roi(
+        investments: List[float],
+        returns: List[float],
+        names: Optional[List[str]] = None,
+        horizon_months: Optional[List[float]] = None,
+        min_roi_percentage: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Evaluate many deals in one call: ROI, profit, payback and ranking for each.
+        
+        Args:
+            investments: Investment per deal
+            returns: Expected return per deal, aligned with investments
+            names: Optional deal or company names
+            horizon_months: Optional months over which each return arrives (enables payback and annualized ROI)
+            min_roi_percentage: Optional threshold; deals must exceed it to qualify (e.g. 30 for "ROI > 30%")
+        """
+        return evaluate_roi_portfolio(investments, returns, names, horizon_months, min_roi_percentage)
+
+    return calculate_portfolio_roi
+
+
+def _get_company_info_tool():
+    from agents import function_tool
+    from tool_cache import memoize_tool
+
+    @function_tool
+    @memoize_tool(ttl=3600)
+    def get_company_info(company_name: str) -> Dict[str, str]:
+        """Get company information by name; partial names and small typos are matched."""
+        return get_company_store().lookup(company_name) or {"error": "Company not found"}
 
-@function_tool
-def send_notification(message: str, priority: str = "normal") -> Dict[str, str]:
-    """Send a notification (mock implementation)."""
-    print(f"\n📢 [{priority.upper()}] Notification: {message}\n")
-    return {"status": "sent", "priority": priority}
+    return get_company_info
+
+
+def _get_companies_info_tool():
+    from agents import function_tool
+    from tool_cache import memoize_tool
+
+    @function_tool
+    @memoize_tool(ttl=3600, max_entries=256)
+    def get_companies_info(company_names: List[str]) -> List[Dict[str, str]]:
+        """Get company information for several companies at once."""
+        return [record or {"error": "Company not found"} for record in get_company_store().lookup_many(company_names)]
+
+    return get_companies_info
+
+
+def _send_notification_tool():
+    from agents import function_tool
+    from tool_cache import side_effects
+
+    @function_tool
+    @side_effects
+    def send_notification(message: str, priority: str = "normal") -> Dict[str, str]:
+        """Send a notification (mock implementation)."""
+        print(f"\n📢 [{priority.upper()}] Notification: {message}\n")
+        return {"status": "sent", "priority": priority}
+
+    return send_notification
+
+
+registry.add_tool("calculate_roi", _calculate_roi_tool)
+registry.add_tool("calculate_portfolio_roi", _calculate_portfolio_roi_tool)
+registry.add_tool("get_company_info", _get_company_info_tool)
+registry.add_tool("get_companies_info", _get_companies_info_tool)
+registry.add_tool("send_notification", _send_notification_tool)
+
+ANALYSIS_TOOLS = ("calculate_roi", "calculate_portfolio_roi", "get_company_info", "get_companies_info",
+                  "send_notification")
 
 
 # ============================================================================
 # EXAMPLE 2: Agents as Tools
 # ============================================================================
 
-research_agent = Agent(
+registry.add_agent("tool_usage.research_agent", AgentSpec(
     name="Research Assistant",
     instructions="You are a research assistant. Provide concise, factual information about topics.",
-    model="gpt-4o-mini"
-)
+))
 
-writer_agent = Agent(
+registry.add_agent("tool_usage.writer_agent", AgentSpec(
     name="Content Writer",
     instructions="You are a content writer. Create engaging, well-structured content.",
-    model="gpt-4o-mini"
-)
+))
 
 # Convert agents to tools
-research_tool = research_agent.as_tool(
-    tool_name="research_assistant",
-    tool_description="Research information about a topic"
-)
+registry.add_tool("research_assistant", AgentToolSpec(
+    agent="tool_usage.research_agent",
+    description="Research information about a topic",
+))
+
+registry.add_tool("content_writer", AgentToolSpec(
+    agent="tool_usage.writer_agent",
+    description="Write content based on information",
+))
 
-writer_tool = writer_agent.as_tool(
-    tool_name="content_writer",
-    tool_description="Write content based on information"
-)
+registry.add_agent("tool_usage.content_coordinator", AgentSpec(
+    name="Content Coordinator",
+    instructions="""You coordinate content creation. First use the research_assistant 
+    to gather information, then use the content_writer to create engaging content 
+    based on that research.""",
+    tools=("research_assistant", "content_writer"),
+))
 
 
 # ============================================================================
 # EXAMPLE 3: Agent with Multiple Tools
 # ============================================================================
 
-sales_analyzer = Agent(
+registry.add_agent("tool_usage.sales_analyzer", AgentSpec(
     name="Sales Analyzer",
     instructions="""You are a sales analysis assistant. You can:
-    - Calculate ROI for investments
+    - Calculate ROI for investments (use calculate_portfolio_roi to evaluate several deals in one call)
     - Look up company information
     - Send notifications about important findings
     Use these tools to help analyze sales opportunities.""",
-    tools=[calculate_roi, get_company_info, send_notification],
-    model="gpt-4o-mini"
-)
+    tools=ANALYSIS_TOOLS,
+))
+
+registry.add_agent("tool_usage.business_analyst", AgentSpec(
+    name="Business Analyst",
+    instructions="""You are a business analyst. Analyze companies and opportunities.
+    Look up company information, calculate potential ROI, and notify about good opportunities.
+    A good opportunity has ROI > 30%. When comparing several deals, evaluate them all with a
+    single calculate_portfolio_roi call instead of one calculate_roi call per deal.""",
+    tools=ANALYSIS_TOOLS,
+))
+
+# Names the tools and agents used to be importable under; built on first access
+_TOOL_ATTRIBUTES = {
+    "calculate_roi": "calculate_roi", "calculate_portfolio_roi": "calculate_portfolio_roi",
+    "get_company_info": "get_company_info", "get_companies_info": "get_companies_info",
+    "send_notification": "send_notification",
+    "research_tool": "research_assistant", "writer_tool": "content_writer",
+}
+_AGENT_ATTRIBUTES = {"research_agent", "writer_agent", "sales_analyzer"}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _AGENT_ATTRIBUTES:
+        return registry.agent(f"tool_usage.{name}")
+    if name in _TOOL_ATTRIBUTES:
+        return registry.tool(_TOOL_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ============================================================================
@@ -113,14 +285,17 @@ sales_analyzer = Agent(
 
 async def demo_function_tools():
     """Demonstrate basic function tools."""
+    from agents import trace
+    from agent_runtime import run_agent
+
     print("=" * 60)
     print("Demo 1: Function Tools")
     print("=" * 60)
     print()
     
     with trace("Function Tools Demo"):
-        result = await Runner.run(
-            sales_analyzer,
+        result = await run_agent(
+            registry.agent("tool_usage.sales_analyzer"),
             "Calculate the ROI if we invest $10,000 and get back $15,000. "
             "If the ROI is above 40%, send a high priority notification."
         )
@@ -131,23 +306,17 @@ async def demo_function_tools():
 
 async def demo_agent_tools():
     """Demonstrate agents as tools."""
+    from agents import trace
+    from agent_runtime import run_agent
+
     print("=" * 60)
     print("Demo 2: Agents as Tools")
     print("=" * 60)
     print()
     
-    coordinator = Agent(
-        name="Content Coordinator",
-        instructions="""You coordinate content creation. First use the research_assistant 
-        to gather information, then use the content_writer to create engaging content 
-        based on that research.""",
-        tools=[research_tool, writer_tool],
-        model="gpt-4o-mini"
-    )
-    
     with trace("Agent Tools Demo"):
-        result = await Runner.run(
-            coordinator,
+        result = await run_agent(
+            registry.agent("tool_usage.content_coordinator"),
             "Create a brief article about the benefits of AI in business"
         )
     
@@ -157,23 +326,17 @@ async def demo_agent_tools():
 
 async def demo_complex_workflow():
     """Demonstrate complex workflow with multiple tool types."""
+    from agents import trace
+    from agent_runtime import run_agent
+
     print("=" * 60)
     print("Demo 3: Complex Workflow")
     print("=" * 60)
     print()
     
-    business_analyst = Agent(
-        name="Business Analyst",
-        instructions="""You are a business analyst. Analyze companies and opportunities.
-        Look up company information, calculate potential ROI, and notify about good opportunities.
-        A good opportunity has ROI > 30%.""",
-        tools=[get_company_info, calculate_roi, send_notification],
-        model="gpt-4o-mini"
-    )
-    
     with trace("Complex Workflow Demo"):
-        result = await Runner.run(
-            business_analyst,
+        result = await run_agent(
+            registry.agent("tool_usage.business_analyst"),
             "Analyze TechStart as a potential client. Our service costs $50,000 "
             "and typically provides $80,000 in value. Should we pursue this opportunity?"
         )
@@ -189,6 +352,9 @@ async def demo_tool_inspection():
     print("=" * 60)
     print()
     
+    calculate_roi = registry.tool("calculate_roi")
+    research_tool = registry.tool("research_assistant")
+    
     print("Function Tool Definition:")
     print("-" * 60)
     print(f"Name: {calculate_roi.name}")
@@ -205,6 +371,9 @@ async def demo_tool_inspection():
 
 async def main():
     """Run all demonstrations."""
+    from metrics import get_metrics
+    from tool_cache import tool_cache_stats
+
     print("\n")
     print("*" * 60)
     print("TOOL USAGE EXAMPLES")
@@ -222,9 +391,16 @@ async def main():
     print()
     print("Key Learnings:")
     print("- @function_tool decorator converts functions to tools")
-    print("- agent.as_tool() converts agents to tools")
+    print("- agent_tool() converts agents to tools (like agent.as_tool())")
     print("- Tools enable agents to take actions and access data")
     print("- Multiple tools can be combined for complex workflows")
+    print()
+    metrics = get_metrics()
+    if metrics is not None:
+        print("Local metrics:")
+        metrics.print_summary()
+    for name, stats in tool_cache_stats().items():
+        print(f"Tool cache {name}: {stats['memory_hits'] + stats['disk_hits']} hits, {stats['misses']} misses")
     print("\nCheck traces at: https://platform.openai.com/traces")
     print()
 